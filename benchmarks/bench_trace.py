@@ -0,0 +1,75 @@
+"""Tracing benchmarks over the scaled PlantGL scenes and seeded synthetic canopies (pytest-benchmark).
+
+Cold start, warm calls (with rays per second) and peak memory are reported as separate benchmarks. Cold start and
+peak memory need a fresh interpreter and are measured in subprocesses.
+
+    pip install -e .[benchmark]
+    pytest benchmarks                                        # 1e3 to 1e5 triangle canopies
+    pytest benchmarks --canopy-sizes 1e3 1e4 1e5 1e6 1e7     # full range
+    pytest benchmarks --benchmark-compare --benchmark-compare-fail=min:10%
+
+Each run is saved under benchmarks/.benchmarks with the commit it was run on, 'pytest-benchmark compare'
+lists the history of a benchmark across commits.
+"""
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from scenes import scene_xrange, scene_yrange, load_scene
+
+benchmarks_folder = os.path.dirname(os.path.abspath(__file__))
+
+
+def run_isolated(call):
+    """Evaluate a call to the 'scenes' module in a fresh interpreter and return its JSON result"""
+    code = f"import json, sys; sys.path.insert(0, {benchmarks_folder!r}); import scenes; print(json.dumps(scenes.{call}))"
+    output = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+@pytest.fixture(scope="module")
+def tracer():
+    from openalea.pyRTVPL import pyRTVPL
+    return pyRTVPL(scene_xrange=scene_xrange, scene_yrange=scene_yrange)
+
+
+def test_cold_start(benchmark):
+    """Fresh interpreter to the end of the first trace of a small canopy, including Julia startup"""
+    result = benchmark.pedantic(run_isolated, args=("trace_once('canopy:1000')",), rounds=3, iterations=1)
+    benchmark.extra_info.update(first_trace_time=result["first_trace_time"])
+
+
+def test_warm_call(benchmark, request, tracer, scene):
+    """Direct and diffuse trace once the runtime is compiled.
+
+    Rays per second count the rays emitted by the sun and the sky dome over the trace stage of a profiled call, so
+    that the scene build and the conversions are not counted, they are stored with the timings in extra_info.
+    """
+    triangles, tau, rho = load_scene(scene)
+    tracer(triangles, tau, rho, direct_PAR=400., diffuse_PAR=200.) # compilation and first allocations
+    benchmark.pedantic(tracer, args=(triangles, tau, rho), kwargs=dict(direct_PAR=400., diffuse_PAR=200.),
+                       rounds=request.config.getoption("trace_rounds"), iterations=1)
+    _, record = tracer(triangles, tau, rho, direct_PAR=400., diffuse_PAR=200., profile=True)
+    benchmark.extra_info.update(n_triangles=triangles.shape[0], rays=record["rays"]["emitted"],
+                                trace_time=record["stages"]["trace"]["time"], rays_per_second=record["rays_per_second"])
+
+
+def test_peak_memory(benchmark, scene):
+    """Peak resident memory of a process tracing the scene once, and the part added by the trace itself"""
+    result = benchmark.pedantic(run_isolated, args=(f"trace_once({scene!r})",), rounds=1, iterations=1)
+    if result["peak_rss"] is None:
+        pytest.skip("peak memory is not available on this platform")
+    benchmark.extra_info.update(n_triangles=result["n_triangles"], peak_rss=result["peak_rss"],
+                                trace_rss=result["peak_rss"] - result["peak_rss_before"])
+
+
+def test_peak_memory_low_memory(benchmark, scene):
+    """Peak resident memory of the same trace in the tracer's low_memory mode, from float32 triangles"""
+    result = benchmark.pedantic(run_isolated, args=(f"trace_once({scene!r}, low_memory=True)",), rounds=1, iterations=1)
+    if result["peak_rss"] is None:
+        pytest.skip("peak memory is not available on this platform")
+    benchmark.extra_info.update(n_triangles=result["n_triangles"], peak_rss=result["peak_rss"],
+                                trace_rss=result["peak_rss"] - result["peak_rss_before"])
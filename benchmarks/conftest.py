@@ -0,0 +1,18 @@
+import importlib.util
+
+from scenes import bgeom_scenes
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("pyRTVPL benchmarks")
+    group.addoption("--canopy-sizes", nargs="+", type=float, default=[1e3, 1e4, 1e5],
+                    help="Triangles of the synthetic canopies, up to 1e7 for a full run")
+    group.addoption("--trace-rounds", type=int, default=3, help="Timed warm calls per scene")
+
+
+def pytest_generate_tests(metafunc):
+    if "scene" in metafunc.fixturenames:
+        # the bundled scenes need PlantGL to be tesselated, the synthetic canopies only numpy
+        scenes = bgeom_scenes() if importlib.util.find_spec("openalea.plantgl") is not None else []
+        scenes += [f"canopy:{int(n)}" for n in metafunc.config.getoption("canopy_sizes")]
+        metafunc.parametrize("scene", scenes, scope="module")
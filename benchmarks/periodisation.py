@@ -0,0 +1,76 @@
+"""Speed and accuracy of the "light" periodisation mode against the default "sky" replicated grid.
+
+Direct light only, over a range of sun zenith angles on a seeded synthetic canopy. Accuracy is measured against a
+reference traced with a replicated grid covering a 2 degree elevation, as the relative error of the absorbed fraction
+of the canopy, of its vertical profile (absorbed power per height layer) and of the per-triangle Erel (mean absolute
+difference relative to the mean reference Erel).
+
+"light" mode only replicates the scene along the sun azimuth, the light scattered across it is lost. Reflections are
+traced (--maxiter, at least 1) with transmitting and reflecting leaves so that this bias shows in the errors.
+
+    python benchmarks/periodisation.py --triangles 10000 --zeniths 0 20 40 60 75 --maxiter 4 --repeat 3
+"""
+import argparse
+import time
+
+import numpy as np
+
+from scenes import scene_xrange, scene_yrange, synthetic_canopy
+
+
+def layer_profile(absorbed, triangles, n_layers=5):
+    z = triangles[:, :, 2].mean(axis=1)
+    layers = np.minimum((n_layers * (z - z.min()) / np.ptp(z)).astype(int), n_layers - 1)
+    return np.bincount(layers, weights=absorbed, minlength=n_layers)
+
+
+def absorbed_power(tracer, triangles, tau, rho, theta, phi):
+    """Absorbed power and Erel of each triangle"""
+    PARa, Erel, areas = tracer(triangles, tau, rho, direct_PAR=500., diffuse_PAR=0., theta_dir=theta, phi_dir=phi)
+    return PARa * areas[:triangles.shape[0]], Erel.copy()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--triangles", type=int, default=10_000)
+    parser.add_argument("--zeniths", type=float, nargs="+", default=[0., 20., 40., 60., 75.], help="sun zenith angles in degrees")
+    parser.add_argument("--azimuth", type=float, default=30., help="sun azimuth in degrees")
+    parser.add_argument("--maxiter", type=int, default=4, help="reflections traced, at least 1")
+    parser.add_argument("--tau", type=float, default=0.1, help="leaf transmittance")
+    parser.add_argument("--rho", type=float, default=0.1, help="leaf reflectance")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    if args.maxiter < 1:
+        parser.error("--maxiter must be at least 1, the bias of the light mode comes from the scattered light")
+
+    from openalea.pyRTVPL import pyRTVPL
+    triangles = synthetic_canopy(args.triangles)
+    tau, rho = np.full(args.triangles, args.tau), np.full(args.triangles, args.rho)
+    phi = np.deg2rad(args.azimuth)
+    tracers = {mode: pyRTVPL(scene_xrange=scene_xrange, scene_yrange=scene_yrange, periodisation_mode=mode, maxiter=args.maxiter)
+               for mode in ("sky", "light")}
+    reference = pyRTVPL(scene_xrange=scene_xrange, scene_yrange=scene_yrange, maxiter=args.maxiter)
+    reference.minimal_zenith = np.deg2rad(2.)
+    reference.nrays_dir = 10 * reference.nrays_dir
+    incident = 500. * scene_xrange * scene_yrange
+
+    print(f"{'zenith':>7}{'mode':>7}{'nx':>5}{'ny':>5}{'time (s)':>10}{'speedup':>9}{'fraction err':>14}{'profile err':>13}{'Erel err':>10}")
+    for zenith in args.zeniths:
+        theta = np.deg2rad(zenith)
+        ref, ref_Erel = absorbed_power(reference, triangles, tau, rho, theta, phi)
+        ref_profile = layer_profile(ref, triangles)
+        timings = {}
+        for mode, tracer in tracers.items():
+            absorbed_power(tracer, triangles, tau, rho, theta, phi) # compilation
+            runs = []
+            for _ in range(args.repeat):
+                t0 = time.perf_counter()
+                absorbed, Erel = absorbed_power(tracer, triangles, tau, rho, theta, phi)
+                runs.append(time.perf_counter() - t0)
+            timings[mode] = min(runs)
+            nx, ny = tracer.periodisation(tracer.canopy_depth(triangles), theta_dir=theta, phi_dir=phi, diffuse=False)
+            fraction_error = abs(absorbed.sum() - ref.sum()) / incident
+            profile_error = np.abs(layer_profile(absorbed, triangles) - ref_profile).sum() / ref_profile.sum()
+            Erel_error = np.abs(Erel - ref_Erel).mean() / ref_Erel.mean()
+            print(f"{zenith:>7.0f}{mode:>7}{nx:>5}{ny:>5}{timings[mode]:>10.3f}{timings['sky'] / timings[mode]:>9.2f}"
+                  f"{fraction_error:>14.4f}{profile_error:>13.4f}{Erel_error:>10.4f}")
@@ -0,0 +1,61 @@
+"""Cost of geometry updates on a persistent scene against building a new scene from the arrays.
+
+Persistent scenes rebuild their mesh and accelerated structure from scratch at the first trace after an update, the
+BVH is not refitted (see pyRTVPLScene). This measures, on seeded synthetic canopies, the time of building and
+accelerating a new scene from the full arrays, and the time of 'set_vertices' or 'append' on a share of the triangles
+followed by the rebuild. Updates save the transfer of the unchanged triangles and of their optics, the rebuild itself
+still scales with the whole scene whatever the share of changed triangles, which is why updates are best batched
+between traces.
+
+    python benchmarks/scene_updates.py --triangles 10000 100000 --shares 0.001 0.01 0.1 --repeat 3
+"""
+import argparse
+import time
+
+import numpy as np
+
+from scenes import scene_xrange, scene_yrange, synthetic_canopy
+
+
+def best_time(function, repeat):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - t0)
+    return min(times)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--triangles", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--shares", type=float, nargs="+", default=[0.001, 0.01, 0.1], help="shares of the triangles updated")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    from openalea.pyRTVPL import pyRTVPL
+    tracer = pyRTVPL(scene_xrange=scene_xrange, scene_yrange=scene_yrange)
+
+    print(f"{'triangles':>10}{'share':>8}{'new scene (s)':>15}{'set_vertices (s)':>18}{'append (s)':>12}")
+    for n in args.triangles:
+        triangles = synthetic_canopy(n)
+        tau, rho = np.full(n, 0.05), np.full(n, 0.1)
+        tracer.build_scene(triangles, tau, rho) # compilation
+        build = best_time(lambda: tracer.build_scene(triangles, tau, rho), args.repeat)
+        scene = tracer.build_scene(triangles, tau, rho)
+        for share in args.shares:
+            k = max(1, int(share * n))
+            ids = np.arange(k)
+            moved = triangles[:k] + [0., 0., 0.01]
+
+            def set_vertices():
+                scene.set_vertices(ids, moved)
+                scene._refresh()
+
+            def append():
+                scene.append(moved, tau[:k], rho[:k])
+                scene._refresh()
+
+            updated = best_time(set_vertices, args.repeat)
+            appended = best_time(append, args.repeat)
+            print(f"{n:>10}{share:>8.3f}{build:>15.3f}{updated:>18.3f}{appended:>12.3f}")
@@ -0,0 +1,104 @@
+"""Benchmark scenes : the bundled scaled PlantGL scenes and seeded synthetic canopies of any size.
+
+Scenes are named 'bgeom:<file name>' or 'canopy:<number of triangles>' so that benchmark ids stay comparable
+across commits.
+"""
+import glob
+import os
+import sys
+import time
+
+import numpy as np
+
+scenes_folder = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "test", "inputs", "test_scaled_scenes")
+scene_xrange, scene_yrange = 0.56, 0.56 # specific to this set of scenes, also used for the synthetic canopies
+min_bgeom_size = 10_000 # bytes, smaller files of the folder hold an empty scene
+
+
+def load_bgeom(path):
+    """(N, 3, 3) triangles of a PlantGL scene"""
+    from openalea.pyRTVPL import TriangleScene
+    return TriangleScene.from_plantgl(path).triangles
+
+
+def synthetic_canopy(n_triangles: int, seed: int = 0, leaf_area_index: float = 3., height: float = 0.6,
+                     dx: float = scene_xrange, dy: float = scene_yrange):
+    """Randomly oriented equilateral leaves scattered in the plot, with a leaf area index independent of their number
+
+    Args:
+        n_triangles (int): number of triangles
+        seed (int, optional): random seed, the same seed always gives the same canopy. Defaults to 0.
+        leaf_area_index (float, optional): one-sided leaf area per ground area. Defaults to 3.
+        height (float, optional): canopy height in m. Defaults to 0.6.
+
+    Returns:
+        np.ndarray: (n_triangles, 3, 3) float64 triangles
+    """
+    rng = np.random.default_rng(seed)
+    side = np.sqrt(4. * leaf_area_index * dx * dy / (np.sqrt(3.) * n_triangles))
+    origins = rng.random((n_triangles, 3)) * (dx, dy, height)
+    # random orthonormal pair spanning each leaf plane
+    e1 = rng.standard_normal((n_triangles, 3))
+    e1 /= np.linalg.norm(e1, axis=1, keepdims=True)
+    e2 = rng.standard_normal((n_triangles, 3))
+    e2 -= np.sum(e1 * e2, axis=1, keepdims=True) * e1
+    e2 /= np.linalg.norm(e2, axis=1, keepdims=True)
+    triangles = np.empty((n_triangles, 3, 3))
+    triangles[:, 0] = origins
+    triangles[:, 1] = origins + side * e1
+    triangles[:, 2] = origins + side * (0.5 * e1 + np.sqrt(3.) / 2. * e2)
+    return triangles
+
+
+def bgeom_files():
+    """Paths of the bundled PlantGL scenes that hold triangles"""
+    paths = sorted(glob.glob(os.path.join(scenes_folder, "*.bgeom")))
+    return [path for path in paths if os.path.getsize(path) > min_bgeom_size]
+
+
+def bgeom_scenes():
+    return [f"bgeom:{os.path.basename(path)}" for path in bgeom_files()]
+
+
+def load_scene(name):
+    """(N, 3, 3) triangles, (N,) tau, (N,) rho of a named benchmark scene"""
+    kind, value = name.split(":", 1)
+    if kind == "bgeom":
+        triangles = load_bgeom(os.path.join(scenes_folder, value))
+    elif kind == "canopy":
+        triangles = synthetic_canopy(int(float(value)))
+    else:
+        raise ValueError(f"Unknown benchmark scene {name}")
+    n = triangles.shape[0]
+    return triangles, np.full(n, 0.05), np.full(n, 0.1)
+
+
+def peak_rss():
+    """Peak resident memory of the current process in bytes, None where the resource module is not available"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024 # KiB on Linux
+
+
+def trace_once(name, **tracer_kwargs):
+    """Load a scene and trace it once in this process, for measurements that need a fresh interpreter
+
+    Returns:
+        dict: scene loading and first trace times, peak memory before and after the trace
+    """
+    from openalea.pyRTVPL import pyRTVPL
+    rt = pyRTVPL(scene_xrange=scene_xrange, scene_yrange=scene_yrange, **tracer_kwargs)
+    rt.VPL # starts Julia so that its own memory is not attributed to the scene
+    t0 = time.perf_counter()
+    triangles, tau, rho = load_scene(name)
+    if rt.low_memory:
+        triangles = triangles.astype(np.float32)
+    t1 = time.perf_counter()
+    rss_before = peak_rss() # Julia and the input arrays, the difference is the tracing overhead
+    rt(triangles, tau, rho, direct_PAR=400., diffuse_PAR=200.)
+    t2 = time.perf_counter()
+    return dict(scene=name, n_triangles=triangles.shape[0], load_time=t1 - t0, first_trace_time=t2 - t1,
+                peak_rss_before=rss_before, peak_rss=peak_rss())
@@ -0,0 +1,69 @@
+"""Variance reduction of the importance sampled sky against the default uniform sampling, at equal ray count.
+
+Each scene is traced several times with different seeds in both modes, without soil so that the emission footprint
+restriction applies too (see pyRTVPL.__call__). The Monte Carlo variance of the absorbed power of each triangle is
+estimated over the repeats and summed over the canopy. The reported reduction is the ratio of uniform to importance
+variance, i.e. how many times more rays the uniform sampling would need for the same noise. The mean difference of
+the absorbed fraction checks that both modes estimate the same quantity. Sparse canopies gain the most.
+
+    python benchmarks/sky_sampling.py --scenes canopy:10000 --leaf-area-index 0.5 --repeats 10
+"""
+import argparse
+import time
+
+import numpy as np
+
+from scenes import scene_xrange, scene_yrange, bgeom_scenes, load_scene, synthetic_canopy
+
+
+def repeated_traces(tracer, triangles, tau, rho, light, repeats):
+    absorbed, times = [], []
+    for seed in range(repeats):
+        tracer.seed = seed
+        t0 = time.perf_counter()
+        PARa, _, areas = tracer(triangles, tau, rho, **light)
+        times.append(time.perf_counter() - t0)
+        absorbed.append(PARa * areas[:triangles.shape[0]])
+    return np.array(absorbed), min(times)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenes", nargs="+", default=None, help="benchmark scene names, defaults to the PlantGL scenes and a sparse 1e4 canopy")
+    parser.add_argument("--leaf-area-index", type=float, default=0.5, help="leaf area index of the 'canopy:N' scenes")
+    parser.add_argument("--direct", type=float, default=0.)
+    parser.add_argument("--diffuse", type=float, default=300.)
+    parser.add_argument("--zenith", type=float, default=40., help="sun zenith angle in degrees")
+    parser.add_argument("--repeats", type=int, default=10)
+    parser.add_argument("--nrays-dif", type=int, default=200_000)
+    args = parser.parse_args()
+
+    try:
+        import openalea.plantgl # noqa: F401
+        default_scenes = bgeom_scenes() + ["canopy:10000"]
+    except ImportError:
+        default_scenes = ["canopy:10000"]
+
+    from openalea.pyRTVPL import pyRTVPL
+    tracer = pyRTVPL(scene_xrange=scene_xrange, scene_yrange=scene_yrange, generate_soil=False)
+    tracer.nrays_dif = args.nrays_dif
+    light = dict(direct_PAR=args.direct, diffuse_PAR=args.diffuse, theta_dir=np.deg2rad(args.zenith), phi_dir=0.)
+    incident = (args.direct + args.diffuse) * scene_xrange * scene_yrange
+
+    print(f"{'scene':>32}{'mode':>12}{'time (s)':>10}{'fraction':>10}{'variance':>12}{'reduction':>11}")
+    for scene in args.scenes or default_scenes:
+        if scene.startswith("canopy:"):
+            triangles = synthetic_canopy(int(float(scene.split(":")[1])), leaf_area_index=args.leaf_area_index)
+            tau, rho = np.full(triangles.shape[0], 0.05), np.full(triangles.shape[0], 0.1)
+        else:
+            triangles, tau, rho = load_scene(scene)
+        tracer(triangles, tau, rho, **light) # compilation
+        variances = {}
+        for sampling in ("uniform", "importance"):
+            tracer.sky_sampling = sampling
+            absorbed, best = repeated_traces(tracer, triangles, tau, rho, light, args.repeats)
+            variances[sampling] = absorbed.var(axis=0, ddof=1).sum()
+            fraction = absorbed.sum(axis=1).mean() / incident
+            print(f"{scene:>32}{sampling:>12}{best:>10.3f}{fraction:>10.4f}{variances[sampling]:>12.4g}"
+                  f"{variances['uniform'] / variances[sampling]:>11.2f}")
+        tracer.sky_sampling = "uniform"
@@ -0,0 +1,65 @@
+"""Trace throughput against the number of Julia threads on the bundled scaled scenes.
+
+Julia threads are fixed when the runtime starts, so every thread count is measured in a fresh Python process.
+
+    python benchmarks/thread_scaling.py --threads 1 2 4 8 --repeat 3
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from scenes import scene_xrange, scene_yrange, bgeom_files, load_bgeom
+
+
+def measure(threads, paths, repeat, parallel):
+    from openalea.pyRTVPL.julia_runtime import configure_threads
+    configure_threads(threads)
+    from openalea.pyRTVPL import pyRTVPL
+
+    rt = pyRTVPL(scene_xrange=scene_xrange, scene_yrange=scene_yrange, periodize=True, maxiter=1, generate_soil=False, parallel=parallel)
+    records = []
+    for path in paths:
+        triangles = load_bgeom(path)
+        tau, rho = np.full(triangles.shape[0], 0.05), np.full(triangles.shape[0], 0.1)
+        rt(triangles, tau, rho, direct_PAR=0., diffuse_PAR=600.) # compilation
+        timings, profiles = [], []
+        for _ in range(repeat):
+            t1 = time.perf_counter()
+            _, record = rt(triangles, tau, rho, direct_PAR=0., diffuse_PAR=600., profile=True)
+            timings.append(time.perf_counter() - t1)
+            profiles.append(record)
+        # rays per second over the trace stage only, the scene build does not scale the same way
+        fastest = min(profiles, key=lambda record: record["stages"]["trace"]["time"])
+        records.append(dict(scene=os.path.basename(path), threads=threads, parallel=parallel, n_triangles=triangles.shape[0],
+                            time=min(timings), rays_per_second=fastest["rays_per_second"]))
+    return records
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--scenes", nargs="+", default=bgeom_files())
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        records = measure(args.threads[0], args.scenes, args.repeat, parallel=args.threads[0] > 1)
+        print(json.dumps(records))
+        sys.exit(0)
+
+    results = []
+    for threads in args.threads:
+        output = subprocess.run([sys.executable, __file__, "--worker", "--threads", str(threads), "--repeat", str(args.repeat), "--scenes", *args.scenes],
+                                check=True, capture_output=True, text=True).stdout
+        results += json.loads(output.strip().splitlines()[-1])
+
+    reference = {r["scene"]: r["time"] for r in results if r["threads"] == args.threads[0]}
+    print(f"{'scene':<32}{'triangles':>10}{'threads':>8}{'time (s)':>10}{'rays/s':>12}{'speedup':>9}")
+    for r in results:
+        print(f"{r['scene']:<32}{r['n_triangles']:>10}{r['threads']:>8}{r['time']:>10.3f}{r['rays_per_second']:>12.3g}{reference[r['scene']] / r['time']:>9.2f}")
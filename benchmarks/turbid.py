@@ -0,0 +1,69 @@
+"""Speed and accuracy of the turbid medium engine against the ray tracer.
+
+Direct and diffuse light on the scaled PlantGL scenes (when PlantGL is available) and on seeded synthetic canopies.
+Accuracy is measured against the ray tracer as the relative error of the absorbed fraction of the canopy, of its
+vertical profile (absorbed power per height layer) and of the area weighted absorbed PAR of each triangle.
+
+    python benchmarks/turbid.py --scenes canopy:1000 canopy:10000 canopy:100000 --voxel-sizes 0.056 0.028 --repeat 3
+"""
+import argparse
+import time
+
+import numpy as np
+
+from periodisation import layer_profile
+from scenes import scene_xrange, scene_yrange, bgeom_scenes, load_scene
+
+
+def best_time(call, repeat):
+    call() # compilation and first allocations
+    runs = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = call()
+        runs.append(time.perf_counter() - t0)
+    return result, min(runs)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenes", nargs="+", default=None, help="benchmark scene names, defaults to the PlantGL scenes and a 1e4 canopy")
+    parser.add_argument("--voxel-sizes", type=float, nargs="+", default=[None], help="voxel edges in m, default a twentieth of the plot side")
+    parser.add_argument("--direct", type=float, default=400.)
+    parser.add_argument("--diffuse", type=float, default=200.)
+    parser.add_argument("--zenith", type=float, default=40., help="sun zenith angle in degrees")
+    parser.add_argument("--azimuth", type=float, default=30., help="sun azimuth in degrees")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    try:
+        import openalea.plantgl # noqa: F401
+        default_scenes = bgeom_scenes() + ["canopy:10000"]
+    except ImportError:
+        default_scenes = ["canopy:10000"]
+
+    from openalea.pyRTVPL import pyRTVPL
+    tracer = pyRTVPL(scene_xrange=scene_xrange, scene_yrange=scene_yrange)
+    light = dict(direct_PAR=args.direct, diffuse_PAR=args.diffuse, theta_dir=np.deg2rad(args.zenith), phi_dir=np.deg2rad(args.azimuth))
+    incident = (args.direct + args.diffuse) * scene_xrange * scene_yrange
+
+    print(f"{'scene':>32}{'voxel (m)':>11}{'time (s)':>10}{'speedup':>9}{'fraction err':>14}{'profile err':>13}{'triangle rrmse':>16}")
+    for scene in args.scenes or default_scenes:
+        triangles, tau, rho = load_scene(scene)
+        n = triangles.shape[0]
+        (PARa, _, areas), ray_time = best_time(lambda: tracer(triangles, tau, rho, **light), args.repeat)
+        ref = PARa * areas[:n]
+        ref_profile = layer_profile(ref, triangles)
+        print(f"{scene:>32}{'ray tracer':>11}{ray_time:>10.3f}{1.:>9.2f}{0.:>14.4f}{0.:>13.4f}{0.:>16.4f}")
+        for voxel_size in args.voxel_sizes:
+            tracer.turbid_voxel_size = voxel_size
+            (PARa_turbid, _, _), turbid_time = best_time(lambda: tracer(triangles, tau, rho, engine="turbid", **light), args.repeat)
+            absorbed = PARa_turbid * areas[:n]
+            fraction_error = abs(absorbed.sum() - ref.sum()) / incident
+            profile_error = np.abs(layer_profile(absorbed, triangles) - ref_profile).sum() / ref_profile.sum()
+            weights = areas[:n] / areas[:n].sum()
+            rrmse = np.sqrt(np.sum(weights * (PARa_turbid - PARa) ** 2)) / np.sum(weights * PARa)
+            voxel = f"{voxel_size:.3f}" if voxel_size else "default"
+            print(f"{'':>32}{voxel:>11}{turbid_time:>10.3f}{ray_time / turbid_time:>9.2f}"
+                  f"{fraction_error:>14.4f}{profile_error:>13.4f}{rrmse:>16.4f}")
+        tracer.turbid_voxel_size = None
@@ -0,0 +1,51 @@
+# Build the VPLBridge system image loaded by pyRTVPL (import_image=True)
+#
+# usage : julia build_sysimage.jl [sysimage_path]
+# or from Python : openalea.pyRTVPL.julia_runtime.build_sysimage()
+#
+# The build environment is instantiated as committed : its Manifest records VPLBridge by its relative path so that the
+# build does not depend on where the repository was cloned, and is not resolved again. PackageCompiler only drives the
+# build and lives in the stacked 'compiler' environment, whose Manifest is resolved on the first build and not
+# committed. The methods compiled while running precompile_workload.jl are stored in the image, the first trace of a
+# session then does not JIT compile.
+#
+# PYRTVPL_PYTHON_PROJECT, set by 'build_sysimage()' to the juliacall environment, adds PythonCall to the image with the
+# version juliacall uses, so that the workload also compiles the entries for the PyArray arguments sent from NumPy.
+# The image must then be rebuilt when juliacall updates PythonCall.
+using Pkg
+
+const BUILD_ENV = @__DIR__
+const BRIDGE = normpath(joinpath(BUILD_ENV, ".."))
+const COMPILER_ENV = joinpath(BUILD_ENV, "compiler")
+const PYTHON_PROJECT = get(ENV, "PYRTVPL_PYTHON_PROJECT", "")
+
+Pkg.activate(COMPILER_ENV)
+Pkg.instantiate()
+push!(LOAD_PATH, COMPILER_ENV)
+Pkg.activate(BUILD_ENV)
+Pkg.instantiate()
+
+using PackageCompiler
+
+project, packages = BUILD_ENV, ["VPLBridge"]
+if !isempty(PYTHON_PROJECT)
+    # PythonCall is added to a copy of the build environment, the committed Manifest is left as is
+    python_manifest = Pkg.TOML.parsefile(joinpath(PYTHON_PROJECT, "Manifest.toml"))
+    pythoncall = only(python_manifest["deps"]["PythonCall"])
+    project = mktempdir()
+    cp(joinpath(BUILD_ENV, "Project.toml"), joinpath(project, "Project.toml"))
+    manifest = read(joinpath(BUILD_ENV, "Manifest.toml"), String)
+    write(joinpath(project, "Manifest.toml"), replace(manifest, "path = \"..\"" => "path = $(repr(BRIDGE))"))
+    Pkg.activate(project)
+    Pkg.add(name="PythonCall", version=pythoncall["version"], preserve=Pkg.PRESERVE_ALL)
+    push!(packages, "PythonCall")
+end
+
+sysimage = length(ARGS) >= 1 ? ARGS[1] : joinpath(BRIDGE, "vplbridge_sysimage." * Base.Libc.Libdl.dlext)
+
+create_sysimage(packages;
+                sysimage_path=sysimage,
+                project=project,
+                precompile_execution_file=joinpath(BUILD_ENV, "precompile_workload.jl"))
+
+println("VPLBridge system image written to ", sysimage)
@@ -0,0 +1,116 @@
+# Precompile workload executed by build_sysimage.jl while PackageCompiler records the compiled methods.
+# Unlike the @compile_workload of VPLBridge, it follows the calls made by pyRTVPL on a real canopy : periodised scene,
+# soil, direct and diffuse light, several reflections and enough rays for every tracing branch to be taken.
+using VPLBridge
+using Random
+
+# ---------- Synthetic canopy ----------
+# 400 small leaves scattered in a 1 x 1 m plot up to 0.6 m, fixed seed so that every build traces the same scene
+function canopy(ntri::Int; dx::Float64=1.0, dy::Float64=1.0, height::Float64=0.6, size::Float64=0.05)
+    rng = MersenneTwister(1234)
+    tris = zeros(Float64, ntri, 3, 3)
+    for i in 1:ntri
+        origin = (rand(rng) * dx, rand(rng) * dy, rand(rng) * height)
+        for v in 1:3, k in 1:3
+            tris[i, v, k] = origin[k] + (v == 1 ? 0.0 : size * (rand(rng) - 0.5))
+        end
+    end
+    return tris
+end
+
+const NTRI = 400
+const tris = canopy(NTRI)
+const buf = vec(permutedims(tris, (3, 2, 1))) # flat C ordered buffer as sent from NumPy
+const τ = fill(0.1, NTRI)
+const ρ = fill(0.1, NTRI)
+const organ_index = Int32.(collect(0:NTRI-1) .÷ 8)
+
+# Settings matching the pyRTVPL defaults, periodisation as computed by 'pyRTVPL.periodisation' for a 0.6 m canopy
+const common = (nx=3, ny=3, dx=1.0, dy=1.0, generate_soil=true, tau_soil=0.0, rho_soil=0.15, maxiter=4, pkill=0.9)
+const rays = (nrays_dir=10_000, nrays_dif=20_000, ntheta=8, nphi=6)
+
+nout = NTRI + 2 # soil triangles are appended to the areas only
+PARa, Erel, areas = zeros(NTRI), zeros(NTRI), zeros(nout)
+
+# ---------- Stateless entries (pyRTVPL.__call__) ----------
+trace_absorbed_incident(tris, τ, ρ, 600.0, 200.0, 0.8, 3.1416; common..., rays...)
+trace_absorbed_incident!(PARa, Erel, areas, buf, τ, ρ, 600.0, 200.0, 0.8, 3.1416; common..., rays...)
+trace_absorbed_incident!(PARa, Erel, areas, buf, τ, ρ, 600.0, 0.0, 0.8, 3.1416; common..., rays..., seed=1)
+trace_absorbed_incident!(PARa, Erel, areas, buf, τ, ρ, 0.0, 200.0, 0.8, 3.1416; common..., rays...)
+# Importance sampled sky, with the emission footprint restricted when there is no soil
+trace_absorbed_incident!(PARa, Erel, areas, buf, τ, ρ, 600.0, 200.0, 0.8, 3.1416; common..., rays..., sampling="importance")
+trace_absorbed_incident!(PARa, Erel, zeros(NTRI), buf, τ, ρ, 600.0, 200.0, 0.8, 3.1416; common..., rays..., generate_soil=false, sampling="importance")
+# PAR, red, far-red and NIR traced together
+τb, ρb = repeat([0.05 0.04 0.3 0.4], NTRI), repeat([0.1 0.08 0.45 0.45], NTRI)
+trace_absorbed_incident!(zeros(NTRI, 4), zeros(NTRI, 4), areas, buf, τb, ρb, [400.0, 90.0, 80.0, 300.0], [150.0, 30.0, 30.0, 100.0], 0.8, 3.1416;
+                         common..., rays...)
+norgans = maximum(organ_index) + 1
+trace_organs_incident!(zeros(norgans), zeros(norgans), zeros(norgans), zeros(norgans), organ_index, buf, τ, ρ,
+                       600.0, 200.0, 0.8, 3.1416; common..., rays...)
+without_gil(trace_absorbed_incident!, PARa, Erel, areas, buf, τ, ρ, 600.0, 200.0, 0.8, 3.1416; common..., rays...)
+
+# ---------- Persistent scenes (pyRTVPLScene) ----------
+scene = build_scene(buf, τ, ρ; common..., parallel=true)
+trace_scene!(PARa, Erel, scene, 600.0, 200.0, 0.8, 3.1416; rays...)
+trace_scene!(PARa, Erel, scene, 600.0, 200.0, 0.8, 3.1416; rays..., cache_diffuse=true)
+trace_scene!(scene, 600.0, 200.0, 0.8, 3.1416; rays..., parallel=false)
+trace_scene_series!(scene, [0.0, 300.0, 600.0], [0.0, 100.0, 200.0], [1.6, 1.2, 0.8], [1.5, 2.3, 3.1]; rays..., cache_diffuse=true)
+trace_scene_adaptive!(zeros(NTRI), zeros(NTRI), zeros(NTRI), scene, 600.0, 200.0, 0.8, 3.1416;
+                      rays..., min_batches=4, max_rays=200_000)
+direct_response_table(scene, [0.4, 0.8], [0.0, 3.1416]; nrays_dir=rays.nrays_dir)
+
+# Geometry updates between traces, positions are 0-based as sent by pyRTVPLScene
+append_triangles!(scene, vec(permutedims(canopy(20), (3, 2, 1))), fill(0.1, 20), fill(0.1, 20))
+set_vertices!(scene, Int64[0, 1], vec(permutedims(tris[1:2, :, :], (3, 2, 1))))
+remove_triangles!(scene, Int64[NTRI + 19, 3])
+refresh_scene!(scene; nx=2, ny=2)
+trace_scene!(scene, 600.0, 200.0, 0.8, 3.1416; rays...)
+
+# Other accelerated structures and the saved structure cache
+build_scene(buf, τ, ρ; common..., rule="AvgSplit")
+build_scene(buf, τ, ρ; common..., acceleration="Naive")
+
+# Low memory mode : float32 vertices, a scene fed by chunks and accelerated once
+buf32 = Float32.(buf)
+trace_absorbed_incident!(PARa, Erel, areas, buf32, τ, ρ, 600.0, 200.0, 0.8, 3.1416; common..., rays..., low_memory=true)
+scene_chunks = build_scene(buf32[1:9*(NTRI÷2)], τ[1:NTRI÷2], ρ[1:NTRI÷2]; common..., low_memory=true, accelerate=false)
+append_triangles!(scene_chunks, buf32[9*(NTRI÷2)+1:end], τ[NTRI÷2+1:end], ρ[NTRI÷2+1:end])
+refresh_scene!(scene_chunks)
+trace_scene!(scene_chunks, 600.0, 200.0, 0.8, 3.1416; rays...)
+peak_rss()
+
+cache_file = joinpath(mktempdir(), "scene.jls")
+build_scene(buf, τ, ρ; common..., cache_file=cache_file)
+trace_scene!(build_scene(buf, τ, ρ; common..., cache_file=cache_file), 600.0, 200.0, 0.8, 3.1416; rays...)
+
+# ---------- Arguments as sent by pyRTVPL through juliacall ----------
+# NumPy arrays reach the entries as PythonCall.PyArray, which are other specialisations than the Julia arrays above.
+# PythonCall is only available when build_sysimage.jl is given the juliacall environment.
+const WITH_PYTHON = Base.find_package("PythonCall") !== nothing
+WITH_PYTHON && @eval using PythonCall
+
+if WITH_PYTHON
+    np = PythonCall.pyimport("numpy")
+    # C ordered copies, as pyRTVPL sends them, wrapped the way juliacall wraps NumPy arguments
+    py(a) = PythonCall.PyArray(np.ascontiguousarray(a))
+    pybuf, pyτ, pyρ = py(buf), py(τ), py(ρ)
+    pyPARa, pyErel, pyareas = py(zeros(NTRI)), py(zeros(NTRI)), py(zeros(nout))
+
+    trace_absorbed_incident!(pyPARa, pyErel, pyareas, pybuf, pyτ, pyρ, 600.0, 200.0, 0.8, 3.1416; common..., rays...)
+    without_gil(trace_absorbed_incident!, pyPARa, pyErel, pyareas, pybuf, pyτ, pyρ, 600.0, 200.0, 0.8, 3.1416; common..., rays...)
+    trace_absorbed_incident!(py(zeros(NTRI, 4)), py(zeros(NTRI, 4)), pyareas, pybuf, py(τb), py(ρb),
+                             py([400.0, 90.0, 80.0, 300.0]), py([150.0, 30.0, 30.0, 100.0]), 0.8, 3.1416; common..., rays...)
+    trace_organs_incident!(py(zeros(norgans)), py(zeros(norgans)), py(zeros(norgans)), py(zeros(norgans)), py(organ_index),
+                           pybuf, pyτ, pyρ, 600.0, 200.0, 0.8, 3.1416; common..., rays...)
+
+    pyscene = build_scene(pybuf, pyτ, pyρ; common..., parallel=true)
+    trace_scene!(pyPARa, pyErel, pyscene, 600.0, 200.0, 0.8, 3.1416; rays...)
+    trace_scene_series!(pyscene, py([0.0, 600.0]), py([0.0, 200.0]), py([1.6, 0.8]), py([1.5, 3.1]); rays...)
+    trace_scene_adaptive!(pyPARa, pyErel, py(zeros(NTRI)), pyscene, 600.0, 200.0, 0.8, 3.1416;
+                          rays..., min_batches=4, max_rays=200_000)
+    direct_response_table(pyscene, py([0.4, 0.8]), py([0.0, 3.1416]); nrays_dir=rays.nrays_dir)
+    append_triangles!(pyscene, py(vec(permutedims(canopy(20), (3, 2, 1)))), py(fill(0.1, 20)), py(fill(0.1, 20)))
+    set_vertices!(pyscene, py(Int64[0, 1]), py(vec(permutedims(tris[1:2, :, :], (3, 2, 1)))))
+    remove_triangles!(pyscene, py(Int64[NTRI + 19, 3]))
+    refresh_scene!(pyscene)
+end
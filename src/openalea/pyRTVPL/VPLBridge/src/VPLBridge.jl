@@ -5,109 +5,725 @@ using PlantGeomPrimitives
 using PlantRayTracer
 using SkyDomes
 using PrecompileTools
+using Serialization
+using Random
 
 # export mesh_from_numpy, accelerate_for_sky,
 #        sky_sources_from_PAR,
 #        trace_absorbed, trace_absorbed_incident
-export trace_absorbed_incident
+export trace_absorbed_incident, trace_absorbed_incident!, trace_organs_incident!, without_gil,
+       build_scene, trace_scene!,
+       trace_scene_series!,
+       direct_response_table, trace_scene_adaptive!,
+       refresh_scene!, append_triangles!, remove_triangles!, set_vertices!,
+       save_acceleration, load_acceleration!, peak_rss
        
 
 # 1) Build mesh from triangles, build soil and return materials
-function mesh_from_numpy(tris::AbstractArray{<:Real,3},
-                         τ::AbstractVector{<:Real},
-                         ρ::AbstractVector{<:Real}; generate_soil=true, dx=1.0, dy=1.0, tau_soil=0.0, rho_soil=0.15)
+# Vertices are stored as Float64, or Float32 in low memory mode (half the vertex and mesh memory)
+vertex_type(FT) = typeof(PlantGeomPrimitives.Vec(zero(FT), zero(FT), zero(FT)))
+coordinate_type(verts) = eltype(eltype(verts))
+
+function vertices_from_numpy(tris::AbstractArray{<:Real,3}, FT=Float64)
     ntri = size(tris,1)
     @assert size(tris,2)==3 && size(tris,3)==3 "tris must be (ntri,3,3)"
-    @assert length(τ)==ntri && length(ρ)==ntri "τ, ρ must have length ntri"
 
-    V = typeof(PlantGeomPrimitives.Vec(0.0,0.0,0.0))
+    V = vertex_type(FT)
     verts = Vector{V}(undef, 3*ntri)
     k = 1
     @inbounds for i in 1:ntri
-        verts[k] = V(Float64(tris[i,1,1]), Float64(tris[i,1,2]), Float64(tris[i,1,3])); k+=1
-        verts[k] = V(Float64(tris[i,2,1]), Float64(tris[i,2,2]), Float64(tris[i,2,3])); k+=1
-        verts[k] = V(Float64(tris[i,3,1]), Float64(tris[i,3,2]), Float64(tris[i,3,3])); k+=1
+        verts[k] = V(FT(tris[i,1,1]), FT(tris[i,1,2]), FT(tris[i,1,3])); k+=1
+        verts[k] = V(FT(tris[i,2,1]), FT(tris[i,2,2]), FT(tris[i,2,3])); k+=1
+        verts[k] = V(FT(tris[i,3,1]), FT(tris[i,3,2]), FT(tris[i,3,3])); k+=1
     end
+    return verts
+end
 
-    mesh = PlantGeomPrimitives.Mesh(verts)
+# Flat buffer of a C ordered (ntri,3,3) NumPy array : x1,y1,z1,x2,... for each triangle in turn
+function vertices_from_numpy(buf::AbstractVector{<:Real}, FT=Float64)
+    @assert length(buf) % 9 == 0 "flat triangle buffer must hold 9 coordinates per triangle"
+    verts = Vector{vertex_type(FT)}(undef, div(length(buf), 3))
+    copyto!(reinterpret(FT, verts), buf) # bulk copy, converting the input precision on the fly
+    return verts
+end
+
+# Vertices sharing the memory of a contiguous Float64 NumPy buffer, only valid while Python holds the array
+function vertex_view(buf::AbstractVector{Float64})
+    @assert length(buf) % 9 == 0 "flat triangle buffer must hold 9 coordinates per triangle"
+    if applicable(pointer, buf) && applicable(strides, buf) && strides(buf) == (1,)
+        V = typeof(PlantGeomPrimitives.Vec(0.0,0.0,0.0))
+        return unsafe_wrap(Array, Ptr{V}(pointer(buf)), div(length(buf), 3))
+    end
+    return vertices_from_numpy(buf)
+end
+vertex_view(tris) = vertices_from_numpy(tris)
+
+ntriangles(tris::AbstractArray{<:Real,3}) = size(tris,1)
+ntriangles(buf::AbstractVector{<:Real}) = div(length(buf), 9)
+
+# One Lambertian per triangle (band 1 = PAR)
+# PlantRayTracer accumulates absorbed power inside each material object, triangles sharing a material would have
+# their absorption merged. A table of unique optics indexed per triangle was tried and dropped : each triangle still
+# needed its own Lambertian, so it saved no tracer memory and only shortened the optics sent by Python
+materials_from_numpy(τ, ρ) = [PlantRayTracer.Lambertian(τ=Float64(τ[i]), ρ=Float64(ρ[i])) for i in eachindex(τ)]
 
-    # One Lambertian per triangle (band 1 = PAR)
-    mats = [PlantRayTracer.Lambertian(τ=Float64(τ[i]), ρ=Float64(ρ[i])) for i in 1:ntri]
+# Several wavebands traced with the same rays : (ntri, nbands) optics, one tuple per material
+band_tuple(A, i) = ntuple(b -> Float64(A[i, b]), size(A, 2))
+
+materials_from_numpy(τ::AbstractMatrix, ρ::AbstractMatrix) =
+    [PlantRayTracer.Lambertian(τ=band_tuple(τ, i), ρ=band_tuple(ρ, i)) for i in axes(τ, 1)]
+
+nbands(τ) = size(τ, 2)
+
+# Soil optics and light intensities given once or per band
+band_values(x::Real, nbands) = nbands == 1 ? Float64(x) : ntuple(_ -> Float64(x), nbands)
+band_values(x, nbands) = nbands == 1 ? Float64(only(x)) : Tuple(Float64.(x))
+
+function check_optics(tris, τ, ρ)
+    @assert size(τ)==size(ρ) "τ, ρ must have the same shape"
+    @assert size(τ, 1)==ntriangles(tris) "τ, ρ must have length ntri"
+end
+
+function mesh_from_vertices(verts, mats; generate_soil=true, dx=1.0, dy=1.0, tau_soil=0.0, rho_soil=0.15, nbands=1)
+    mesh = PlantGeomPrimitives.Mesh(verts)
 
     # Attach materials using the function in your PGP
     PlantGeomPrimitives.add_property!(mesh, :materials, mats)
 
     if generate_soil
-        soil = PlantGeomPrimitives.Rectangle(length = dx, width = dy) ## Vertical plane initialized in x = 0, centered in y = 0, upward in z
-        PlantGeomPrimitives.rotatey!(soil, π/2) ## Rotate in the xy plane
-        PlantGeomPrimitives.translate!(soil, Vec(0.0, dy/2, 0.0)) ## Corner at (0, 0, 0)
-        soil_material = PlantRayTracer.Lambertian(τ = tau_soil, ρ = rho_soil)
+        FT = coordinate_type(verts) # the soil shares the precision of the scene vertices
+        soil = PlantGeomPrimitives.Rectangle(length = FT(dx), width = FT(dy)) ## Vertical plane initialized in x = 0, centered in y = 0, upward in z
+        PlantGeomPrimitives.rotatey!(soil, FT(π/2)) ## Rotate in the xy plane
+        PlantGeomPrimitives.translate!(soil, Vec(zero(FT), FT(dy/2), zero(FT))) ## Corner at (0, 0, 0)
+        soil_material = PlantRayTracer.Lambertian(τ = band_values(tau_soil, nbands), ρ = band_values(rho_soil, nbands))
         PlantGeomPrimitives.add!(mesh, soil, materials = soil_material)
     end
 
+    return mesh
+end
+
+function mesh_from_numpy(tris::AbstractArray{<:Real},
+                         τ::AbstractVecOrMat{<:Real},
+                         ρ::AbstractVecOrMat{<:Real}; generate_soil=true, dx=1.0, dy=1.0, tau_soil=0.0, rho_soil=0.15,
+                         low_memory=false)
+    check_optics(tris, τ, ρ)
+
+    # The mesh only lives for one call, it can share the caller's memory. In low memory mode Float32 inputs are
+    # copied as Float32 rather than widened to Float64
+    verts = low_memory && eltype(tris) == Float32 ? vertices_from_numpy(tris, Float32) : vertex_view(tris)
+    mats = materials_from_numpy(τ, ρ)
+    mesh = mesh_from_vertices(verts, mats; generate_soil=generate_soil, dx=dx, dy=dy, tau_soil=tau_soil, rho_soil=rho_soil, nbands=nbands(τ))
     return mesh, mats
 end
 
 
-# 2) Accelerate (creates grid cloner = periodize)
+# 2) Accelerate (creates grid cloner = periodize). The structure is a BVH built with a SAH or AvgSplit rule,
+# or Naive (no structure, every triangle tested by every ray) for very small scenes
+function split_rule(rule, rule_bins, rule_min_triangles, rule_max_levels)
+    rule == "SAH" && return PlantRayTracer.SAH{Int(rule_bins)}(rule_min_triangles, rule_max_levels)
+    rule == "AvgSplit" && return PlantRayTracer.AvgSplit(rule_min_triangles, rule_max_levels)
+    throw(ArgumentError("unknown split rule $rule, expected SAH or AvgSplit"))
+end
+
 function accelerate_for_sky(mesh; nx=5, ny=5, dx=0.0, dy=0.0,
-                            parallel=true, maxiter=4, pkill=0.9)
+                            parallel=true, maxiter=4, pkill=0.9,
+                            acceleration="BVH", rule="SAH", rule_bins=3, rule_min_triangles=1, rule_max_levels=5)
     settings = PlantRayTracer.RTSettings(nx=nx, ny=ny, dx=dx, dy=dy,
                                          parallel=parallel, maxiter=maxiter, pkill=pkill)
-    acc_mesh = PlantRayTracer.accelerate(mesh; settings=settings,
-                                         acceleration=PlantRayTracer.BVH,
-                                         rule=PlantRayTracer.SAH{3}(1,5))
+    if acceleration == "BVH"
+        acc_mesh = PlantRayTracer.accelerate(mesh; settings=settings,
+                                             acceleration=PlantRayTracer.BVH,
+                                             rule=split_rule(rule, rule_bins, rule_min_triangles, rule_max_levels))
+    elseif acceleration == "Naive"
+        acc_mesh = PlantRayTracer.accelerate(mesh; settings=settings, acceleration=PlantRayTracer.Naive)
+    else
+        throw(ArgumentError("unknown acceleration structure $acceleration, expected BVH or Naive"))
+    end
     return acc_mesh, settings
 end
 
 
 # 3) build the sky dome
-function sky_sources_from_PAR(acc_mesh, ; direct_PAR::Real, diffuse_PAR::Real,
+# Intensities are numbers, or one value per band when the materials have several bands
+function sky_sources_from_PAR(acc_mesh, ; direct_PAR, diffuse_PAR,
                               theta_dir::Real, phi_dir::Real,
                               nrays_dir=100_000, nrays_dif=1_000_000,
                               ntheta=9, nphi=12)
     
     return SkyDomes.sky(acc_mesh;
-        Idir=direct_PAR, nrays_dir=nrays_dir, theta_dir=theta_dir, phi_dir=phi_dir,
-        Idif=diffuse_PAR, nrays_dif=nrays_dif,
+        Idir=band_values(direct_PAR, length(direct_PAR)), nrays_dir=nrays_dir, theta_dir=theta_dir, phi_dir=phi_dir,
+        Idif=band_values(diffuse_PAR, length(diffuse_PAR)), nrays_dif=nrays_dif,
         sky_model=SkyDomes.StandardSky, dome_method=SkyDomes.equal_solid_angles, # method equalizing each sky subdivision area
         ntheta=ntheta, nphi=nphi
     )
 end
 
 
-# 4) Trace and read power from the materials
-function trace_absorbed(acc_mesh, mats, settings, sources)
+# 3b) Importance sampled sky : rays are shared among the sectors of the standard overcast dome in proportion to the
+# irradiance they bring, and only emitted above the plot tiles where they can reach the canopy. Every source keeps
+# the power of its own area and direction, so that the absorbed power stays unbiased whatever its number of rays.
+# Sectors have equal solid angles, the irradiance of a ring between cos θ = μ1 and μ2 is the exact integral of the
+# standard overcast radiance (1 + 2 cos θ) / 3 times cos θ.
+function sky_sectors(ntheta, nphi)
+    ring(μ) = μ^2 / 2 + 2 * μ^3 / 3
+    rings = [ring(1 - (i - 1) / ntheta) - ring(1 - i / ntheta) for i in 1:ntheta]
+    weights = rings ./ (nphi * sum(rings))
+    return [(θ = acos(1 - (i - 0.5) / ntheta), Φ = (j - 0.5) * 2π / nphi, weight = weights[i]) for i in 1:ntheta for j in 1:nphi]
+end
+
+# Plot tiles crossed by the light going down to the canopy along (θ, Φ) : each triangle is moved up to the emission
+# height along the light direction and its bounding box marks the tiles it covers. The scene repeats every (dx, dy),
+# the copies of the box falling on the emission box (x0, y0, x1, y1) mark their tiles as well. The exact slope is
+# used, low suns being left to the full emission box by 'directional_sources!'
+function footprint_tiles(verts, ntri, θ, Φ, ztop; box, dx, dy, ntiles)
+    x0, y0, x1, y1 = box
+    occupied = falses(ntiles, ntiles)
+    slope = tan(θ)
+    ux, uy = slope * cos(Φ), slope * sin(Φ)
+    wx, wy = (x1 - x0) / ntiles, (y1 - y0) / ntiles
+    tile(u, u0, w) = clamp(floor(Int, (u - u0) / w), 0, ntiles - 1) + 1
+    @inbounds for t in 1:ntri
+        xmin = ymin = Inf
+        xmax = ymax = -Inf
+        for k in 1:3
+            v = verts[3 * (t - 1) + k]
+            h = ztop - v[3]
+            x, y = v[1] + h * ux, v[2] + h * uy
+            xmin, xmax, ymin, ymax = min(xmin, x), max(xmax, x), min(ymin, y), max(ymax, y)
+        end
+        for kx in ceil(Int, (x0 - xmax) / dx):floor(Int, (x1 - xmin) / dx), ky in ceil(Int, (y0 - ymax) / dy):floor(Int, (y1 - ymin) / dy)
+            occupied[tile(xmin + kx * dx, x0, wx):tile(xmax + kx * dx, x0, wx), tile(ymin + ky * dy, y0, wy):tile(ymax + ky * dy, y0, wy)] .= true
+        end
+    end
+    return occupied
+end
+
+# Past the point where the light runs across the emission box while crossing the canopy depth, the footprint covers
+# most of the box and its copies, rays are then emitted above the whole box. This also avoids the infinite slope of a
+# sun on the horizon
+function directional_sources!(sources, verts, ntri, θ, Φ, radiosity, nrays, zmin, ztop; box, dx, dy, footprint, ntiles)
+    nrays <= 0 && return sources
+    x0, y0, x1, y1 = box
+    grazing = θ >= π / 2 || (ztop - zmin) * tan(θ) > max(x1 - x0, y1 - y0)
+    if !footprint || grazing
+        aabb = PlantRayTracer.AABB(Vec(x0, y0, zmin), Vec(x1, y1, ztop))
+        push!(sources, PlantRayTracer.DirectionalSource(aabb; θ=θ, Φ=Φ, radiosity=radiosity, nrays=nrays))
+        return sources
+    end
+    occupied = footprint_tiles(verts, ntri, θ, Φ, ztop; box=box, dx=dx, dy=dy, ntiles=ntiles)
+    ntile_rays = max(1, round(Int, nrays / max(1, count(occupied))))
+    wx, wy = (x1 - x0) / ntiles, (y1 - y0) / ntiles
+    for ix in 1:ntiles, iy in 1:ntiles
+        occupied[ix, iy] || continue
+        aabb = PlantRayTracer.AABB(Vec(x0 + (ix - 1) * wx, y0 + (iy - 1) * wy, zmin), Vec(x0 + ix * wx, y0 + iy * wy, ztop))
+        push!(sources, PlantRayTracer.DirectionalSource(aabb; θ=θ, Φ=Φ, radiosity=radiosity, nrays=ntile_rays))
+    end
+    return sources
+end
+
+# verts holds the canopy vertices first (soil vertices, if any, are ignored). The footprint restriction is only
+# unbiased when the light missing the canopy never comes back to it, that is without soil or with a black soil.
+# Light is emitted above the bounds of the canopy, and of the plot when the soil is generated, as the uniform sky
+# of 'sky_sources_from_PAR' spans the whole mesh
+function importance_sources(verts, ntri; direct_PAR, diffuse_PAR, theta_dir::Real, phi_dir::Real,
+                            nrays_dir=100_000, nrays_dif=1_000_000, ntheta=9, nphi=12,
+                            dx=1.0, dy=1.0, soil=true, footprint=true, ntiles=8)
+    x0, y0, x1, y1 = soil ? (0.0, 0.0, dx, dy) : (Inf, Inf, -Inf, -Inf)
+    zmin, ztop = 0.0, 0.0
+    @inbounds for k in 1:3 * ntri
+        v = verts[k]
+        x0, y0, x1, y1 = min(x0, v[1]), min(y0, v[2]), max(x1, v[1]), max(y1, v[2])
+        zmin, ztop = min(zmin, v[3]), max(ztop, v[3])
+    end
+    box = (x0, y0, max(x1, x0 + 1e-6), max(y1, y0 + 1e-6)) # vertical canopies have no width along one axis
+    ztop += 1e-6
+    nb = length(direct_PAR)
+    sources = []
+    if nrays_dir > 0
+        directional_sources!(sources, verts, ntri, theta_dir, phi_dir, band_values(direct_PAR, nb), nrays_dir, zmin, ztop;
+                             box=box, dx=dx, dy=dy, footprint=footprint, ntiles=ntiles)
+    end
+    if nrays_dif > 0
+        Idif = band_values(diffuse_PAR, nb)
+        for s in sky_sectors(ntheta, nphi)
+            # every sector keeps at least one ray, its power would be lost otherwise
+            directional_sources!(sources, verts, ntri, s.θ, s.Φ, Idif .* s.weight, max(1, round(Int, nrays_dif * s.weight)), zmin, ztop;
+                                 box=box, dx=dx, dy=dy, footprint=footprint, ntiles=ntiles)
+        end
+    end
+    return [s for s in sources] # concrete element type when all sources share it
+end
+
+
+# 4) Trace and read power from the materials into a flat per-triangle array
+function trace_absorbed!(absorbed, acc_mesh, mats, settings, sources)
+    rt = PlantRayTracer.RayTracer(acc_mesh, sources; settings=settings)
+    PlantRayTracer.trace!(rt)
+    @inbounds for i in eachindex(mats)
+        absorbed[i] = PlantRayTracer.power(mats[i])[1]  # absorbed PAR per triangle
+    end
+    return absorbed
+end
+
+# Every band of every material, absorbed being (ntri, nbands)
+function trace_absorbed!(absorbed::AbstractMatrix, acc_mesh, mats, settings, sources)
     rt = PlantRayTracer.RayTracer(acc_mesh, sources; settings=settings)
     PlantRayTracer.trace!(rt)
-    return [PlantRayTracer.power(m)[1] for m in mats]  # absorbed PAR per triangle
-end
-
-# 5) Assembly function to get inputs from Python and send results to Python
-function trace_absorbed_incident(tris, τ, ρ, direct_PAR, diffuse_PAR, theta_dir, phi_dir;
-                                 nx=5, ny=5, dx=1.0, dy=1.0,
-                                 parallel=true, generate_soil=true, tau_soil=0.0, rho_soil=0.15,  maxiter=4, pkill=0.9,
-                                 nrays_dir=100_000, nrays_dif=1_000_000,
-                                 ntheta=9, nphi=12)
-    total_PAR = direct_PAR + diffuse_PAR
-    mesh, mats = mesh_from_numpy(tris, τ, ρ, dx=dx, dy=dy, generate_soil=generate_soil, tau_soil=tau_soil, rho_soil=rho_soil)
-    areas = PlantGeomPrimitives.areas(mesh)
-    acc_mesh, settings = accelerate_for_sky(mesh; nx=nx, ny=ny, dx=dx, dy=dy,
-                                            parallel=parallel, maxiter=maxiter, pkill=pkill)
-    sources = sky_sources_from_PAR(acc_mesh;
-        direct_PAR=direct_PAR, diffuse_PAR=diffuse_PAR,
-        theta_dir=theta_dir, phi_dir=phi_dir, nrays_dir=nrays_dir, nrays_dif=nrays_dif,
-        ntheta=ntheta, nphi=nphi)
-    absorbed = trace_absorbed(acc_mesh, mats, settings, sources)
-    Erel = similar(absorbed)
-    PARa = similar(absorbed)
+    @inbounds for i in eachindex(mats)
+        p = PlantRayTracer.power(mats[i])
+        for b in axes(absorbed, 2)
+            absorbed[i, b] = p[b]
+        end
+    end
+    return absorbed
+end
+
+trace_absorbed(acc_mesh, mats, settings, sources) = trace_absorbed!(Vector{Float64}(undef, length(mats)), acc_mesh, mats, settings, sources)
+trace_absorbed(acc_mesh, mats, settings, sources, nbands) = nbands == 1 ? trace_absorbed(acc_mesh, mats, settings, sources) :
+    trace_absorbed!(Matrix{Float64}(undef, length(mats), nbands), acc_mesh, mats, settings, sources)
+
+# 5) Convert absorbed power into PAR density and relative absorption, in place for caller provided buffers
+function absorbed_to_outputs!(PARa, Erel, absorbed, areas, total_PAR)
+    @assert length(PARa)==length(absorbed) && length(Erel)==length(absorbed) "output buffers must have length ntri"
     @inbounds for i in eachindex(absorbed)
         Erel[i] = (absorbed[i] / areas[i]) / total_PAR
         PARa[i] = absorbed[i] / areas[i]
     end
+    return PARa, Erel
+end
+
+# Area weighted aggregation per organ, organ_index being 0-based in 0:norgans-1. Without light Erel is zero
+function aggregate_organs!(PARa, Erel, power, area, absorbed, areas, organ_index, total_PAR)
+    @assert length(organ_index)==length(absorbed) "organ_index must have length ntri"
+    fill!(power, 0.0)
+    fill!(area, 0.0)
+    @inbounds for i in eachindex(organ_index)
+        o = organ_index[i] + 1
+        power[o] += absorbed[i]
+        area[o] += areas[i]
+    end
+    @inbounds for o in eachindex(power)
+        PARa[o] = power[o] / area[o]
+        Erel[o] = total_PAR > 0 ? PARa[o] / total_PAR : 0.0
+    end
+    return PARa, Erel
+end
+
+# Band outputs, total_PAR holding the incident light of each band. Bands without light get zero relative absorption
+function absorbed_to_outputs!(PARa, Erel, absorbed::AbstractMatrix, areas, total_PAR)
+    @assert size(PARa)==size(absorbed) && size(Erel)==size(absorbed) "output buffers must have shape (ntri, nbands)"
+    @inbounds for b in axes(absorbed, 2), i in axes(absorbed, 1)
+        PARa[i, b] = absorbed[i, b] / areas[i]
+        Erel[i, b] = total_PAR[b] > 0 ? PARa[i, b] / total_PAR[b] : 0.0
+    end
+    return PARa, Erel
+end
+
+function absorbed_to_outputs(absorbed, areas, total_PAR)
+    PARa, Erel = absorbed_to_outputs!(similar(absorbed), similar(absorbed), absorbed, areas, total_PAR)
     return (PARa=PARa, Erel=Erel, areas=areas)
 end
 
+# 6) Assembly function to get inputs from Python and send results to Python
+# 'profile' is nothing, or a Dict filled with the timings and statistics of the call, see 'new_profile'
+function absorbed_incident(tris, τ, ρ, direct_PAR, diffuse_PAR, theta_dir, phi_dir;
+                           nx=5, ny=5, dx=1.0, dy=1.0,
+                           parallel=true, generate_soil=true, tau_soil=0.0, rho_soil=0.15,  maxiter=4, pkill=0.9,
+                           nrays_dir=100_000, nrays_dif=1_000_000,
+                           ntheta=9, nphi=12, profile=nothing,
+                           acceleration="BVH", rule="SAH", rule_bins=3, rule_min_triangles=1, rule_max_levels=5,
+                           low_memory=false, seed=nothing, sampling="uniform", footprint_tiles=8)
+    mesh, mats, areas = timed_stage!(profile, "mesh") do
+        mesh, mats = mesh_from_numpy(tris, τ, ρ, dx=dx, dy=dy, generate_soil=generate_soil, tau_soil=tau_soil, rho_soil=rho_soil,
+                                     low_memory=low_memory)
+        mesh, mats, PlantGeomPrimitives.areas(mesh)
+    end
+    acc_mesh, settings = timed_stage!(profile, "accelerate") do
+        accelerate_for_sky(mesh; nx=nx, ny=ny, dx=dx, dy=dy,
+                           parallel=parallel, maxiter=maxiter, pkill=pkill,
+                           acceleration=acceleration, rule=rule, rule_bins=rule_bins,
+                           rule_min_triangles=rule_min_triangles, rule_max_levels=rule_max_levels)
+    end
+    if low_memory
+        # the accelerated structure holds its own copy of the triangles, the mesh is released before tracing
+        mesh = nothing
+        GC.gc()
+    end
+    # tasks spawned by the tracer derive their random streams from the seeded parent task, results are
+    # reproducible for a given seed and number of threads
+    seed === nothing || Random.seed!(seed)
+    sources = timed_stage!(profile, "sources") do
+        if sampling == "importance"
+            footprint = !generate_soil || all(iszero, rho_soil)
+            importance_sources(vertex_view(tris), ntriangles(tris);
+                direct_PAR=direct_PAR, diffuse_PAR=diffuse_PAR,
+                theta_dir=theta_dir, phi_dir=phi_dir, nrays_dir=nrays_dir, nrays_dif=nrays_dif,
+                ntheta=ntheta, nphi=nphi, dx=dx, dy=dy, soil=generate_soil, footprint=footprint, ntiles=footprint_tiles)
+        elseif sampling == "uniform"
+            sky_sources_from_PAR(acc_mesh;
+                direct_PAR=direct_PAR, diffuse_PAR=diffuse_PAR,
+                theta_dir=theta_dir, phi_dir=phi_dir, nrays_dir=nrays_dir, nrays_dif=nrays_dif,
+                ntheta=ntheta, nphi=nphi)
+        else
+            throw(ArgumentError("unknown sky sampling $sampling, expected uniform or importance"))
+        end
+    end
+    absorbed = timed_stage!(profile, "trace") do
+        trace_absorbed(acc_mesh, mats, settings, sources, nbands(τ))
+    end
+    if profile !== nothing
+        profile["rays"] = ray_statistics(sources, absorbed, (sum(direct_PAR) + sum(diffuse_PAR)) * dx * dy, maxiter, pkill)
+        profile["acceleration"] = acceleration_statistics(acc_mesh)
+        profile["peak_rss"] = peak_rss()
+    end
+    return absorbed, areas
+end
+
+function trace_absorbed_incident(tris, τ, ρ, direct_PAR, diffuse_PAR, theta_dir, phi_dir; kwargs...)
+    absorbed, areas = absorbed_incident(tris, τ, ρ, direct_PAR, diffuse_PAR, theta_dir, phi_dir; kwargs...)
+    return absorbed_to_outputs(absorbed, areas, direct_PAR + diffuse_PAR)
+end
+
+# Results written into caller provided NumPy buffers, areas has 2 more elements when the soil is generated.
+# With (ntri, nbands) optics, direct_PAR and diffuse_PAR hold one value per band and PARa, Erel are (ntri, nbands).
+# Returns the profile record when profile=true, nothing otherwise
+function trace_absorbed_incident!(PARa, Erel, areas_out, tris, τ, ρ, direct_PAR, diffuse_PAR, theta_dir, phi_dir; profile=false, kwargs...)
+    record = profile ? new_profile() : nothing
+    absorbed, areas = absorbed_incident(tris, τ, ρ, direct_PAR, diffuse_PAR, theta_dir, phi_dir; profile=record, kwargs...)
+    timed_stage!(record, "outputs") do
+        copyto!(areas_out, areas)
+        absorbed_to_outputs!(PARa, Erel, absorbed, areas, direct_PAR .+ diffuse_PAR)
+    end
+    return record
+end
+
+# Organ level results only, per-triangle values never leave Julia
+function trace_organs_incident!(PARa, Erel, power, area, organ_index, tris, τ, ρ, direct_PAR, diffuse_PAR, theta_dir, phi_dir; profile=false, kwargs...)
+    record = profile ? new_profile() : nothing
+    absorbed, areas = absorbed_incident(tris, τ, ρ, direct_PAR, diffuse_PAR, theta_dir, phi_dir; profile=record, kwargs...)
+    timed_stage!(record, "outputs") do
+        aggregate_organs!(PARa, Erel, power, area, absorbed, areas, organ_index, direct_PAR + diffuse_PAR)
+    end
+    return record
+end
+
+
+# 7) Persistent scene : mesh, materials and accelerated structure are built once and reused between traces
+mutable struct TraceScene
+    verts                                         # 3 vertices per triangle, edited in place by geometry updates
+    mats
+    areas
+    acc_mesh
+    settings
+    absorbed::Vector{Float64}                     # flat absorbed power buffer reused by every trace
+    build::NamedTuple                             # mesh and acceleration options reused when rebuilding
+    dirty::Bool                                   # geometry changed since the last acceleration
+    diffuse_unit::Union{Nothing, Vector{Float64}} # absorbed power per triangle for a unit diffuse PAR
+    diffuse_key::Union{Nothing, Tuple}            # dome discretisation the cached response was traced with
+end
+
+# Scenes hold single band materials, their soil and results have one band
+check_scene_optics(τ, ρ) = ndims(τ) == 1 && ndims(ρ) == 1 ||
+    throw(ArgumentError("persistent scenes trace a single band, τ and ρ must be vectors"))
+
+# With a cache_file, the areas and accelerated structure are loaded from it when it exists and saved to it otherwise.
+# The caller names the file after everything the structure depends on (geometry, optics and build options)
+function build_scene(tris, τ, ρ;
+                     nx=5, ny=5, dx=1.0, dy=1.0,
+                     parallel=true, generate_soil=true, tau_soil=0.0, rho_soil=0.15, maxiter=4, pkill=0.9,
+                     acceleration="BVH", rule="SAH", rule_bins=3, rule_min_triangles=1, rule_max_levels=5,
+                     low_memory=false, cache_file=nothing, accelerate=true)
+    check_scene_optics(τ, ρ)
+    check_optics(tris, τ, ρ)
+    build = (nx=nx, ny=ny, dx=dx, dy=dy, parallel=parallel, generate_soil=generate_soil,
+             tau_soil=tau_soil, rho_soil=rho_soil, maxiter=maxiter, pkill=pkill,
+             acceleration=acceleration, rule=rule, rule_bins=rule_bins,
+             rule_min_triangles=rule_min_triangles, rule_max_levels=rule_max_levels, low_memory=low_memory)
+    scene = TraceScene(vertices_from_numpy(tris, low_memory ? Float32 : Float64), materials_from_numpy(τ, ρ),
+                       nothing, nothing, nothing, Float64[], build, true, nothing, nothing)
+    if cache_file !== nothing && isfile(cache_file)
+        return load_acceleration!(scene, cache_file)
+    end
+    # a scene fed by chunks is only accelerated once all its triangles are appended
+    accelerate || return scene
+    refresh_scene!(scene)
+    cache_file === nothing || save_acceleration(cache_file, scene)
+    return scene
+end
+
+# Rebuild mesh, areas and accelerated structure once after any number of geometry updates. The rebuild is a full
+# one, its cost scales with the scene size whatever the number of changed triangles
+function refresh_scene!(scene::TraceScene; nx=scene.build.nx, ny=scene.build.ny)
+    if scene.dirty || nx != scene.build.nx || ny != scene.build.ny
+        b = scene.build = merge(scene.build, (nx=nx, ny=ny))
+        # The mesh is built on the scene vertices rather than on a copy and only lives until accelerated, the
+        # accelerated structure holding its own triangles. The soil vertices it may have appended are dropped
+        scene.acc_mesh = nothing
+        mesh = mesh_from_vertices(scene.verts, scene.mats; generate_soil=b.generate_soil, dx=b.dx, dy=b.dy,
+                                  tau_soil=b.tau_soil, rho_soil=b.rho_soil)
+        scene.areas = PlantGeomPrimitives.areas(mesh)
+        scene.acc_mesh, scene.settings = accelerate_for_sky(mesh; nx=b.nx, ny=b.ny, dx=b.dx, dy=b.dy,
+                                                            parallel=b.parallel, maxiter=b.maxiter, pkill=b.pkill,
+                                                            acceleration=b.acceleration, rule=b.rule, rule_bins=b.rule_bins,
+                                                            rule_min_triangles=b.rule_min_triangles, rule_max_levels=b.rule_max_levels)
+        mesh = nothing
+        resize!(scene.verts, 3 * length(scene.mats))
+        b.low_memory && GC.gc()
+        resize!(scene.absorbed, length(scene.mats))
+        scene.diffuse_unit = nothing
+        scene.diffuse_key = nothing
+        scene.dirty = false
+    end
+    return scene
+end
+
+# The accelerated structure references the materials, both are serialised together so that the loaded structure
+# still accumulates power into the scene materials. Files are only valid for the Julia and package versions that wrote them
+function save_acceleration(path, scene::TraceScene)
+    scene.dirty && refresh_scene!(scene)
+    tmp = path * ".tmp"
+    serialize(tmp, (mats=scene.mats, areas=scene.areas, acc_mesh=scene.acc_mesh))
+    mv(tmp, path; force=true)
+    return path
+end
+
+function load_acceleration!(scene::TraceScene, path)
+    saved = deserialize(path)
+    @assert length(saved.mats) == length(scene.mats) "the saved structure holds $(length(saved.mats)) triangles, the scene $(length(scene.mats))"
+    scene.mats, scene.areas = saved.mats, saved.areas
+    scene.acc_mesh = saved.acc_mesh
+    b = scene.build
+    scene.settings = PlantRayTracer.RTSettings(nx=b.nx, ny=b.ny, dx=b.dx, dy=b.dy,
+                                               parallel=b.parallel, maxiter=b.maxiter, pkill=b.pkill)
+    resize!(scene.absorbed, length(scene.mats))
+    scene.diffuse_unit = nothing
+    scene.diffuse_key = nothing
+    scene.dirty = false
+    return scene
+end
+
+# Geometry updates only edit vertices and materials, their cost scales with the number of changed triangles.
+# The accelerated structure is then rebuilt from scratch by 'refresh_scene!'
+function append_triangles!(scene::TraceScene, tris, τ, ρ)
+    check_scene_optics(τ, ρ)
+    check_optics(tris, τ, ρ)
+    append!(scene.verts, vertices_from_numpy(tris, coordinate_type(scene.verts)))
+    append!(scene.mats, materials_from_numpy(τ, ρ))
+    scene.dirty = true
+    return scene
+end
+
+# positions are 0-based and sorted in decreasing order, the last triangle is moved into each freed slot
+function remove_triangles!(scene::TraceScene, positions)
+    for p in positions
+        i, last = p + 1, length(scene.mats)
+        if i != last
+            scene.mats[i] = scene.mats[last]
+            for k in 1:3
+                scene.verts[3*(i-1)+k] = scene.verts[3*(last-1)+k]
+            end
+        end
+        pop!(scene.mats)
+        resize!(scene.verts, 3*(last-1))
+    end
+    scene.dirty = true
+    return scene
+end
+
+function set_vertices!(scene::TraceScene, positions, tris)
+    @assert length(positions)==ntriangles(tris) "positions must have length ntri"
+    verts = vertices_from_numpy(tris, coordinate_type(scene.verts))
+    for (j, p) in enumerate(positions)
+        for k in 1:3
+            scene.verts[3*p+k] = verts[3*(j-1)+k]
+        end
+    end
+    scene.dirty = true
+    return scene
+end
+
+# Absorbed power per triangle for a unit diffuse PAR, traced once per geometry and dome discretisation
+function diffuse_response!(scene::TraceScene; nrays_dif=1_000_000, ntheta=9, nphi=12)
+    key = (nrays_dif, ntheta, nphi)
+    if scene.diffuse_key != key
+        foreach(PlantRayTracer.reset!, scene.mats)
+        sources = sky_sources_from_PAR(scene.acc_mesh;
+            direct_PAR=0.0, diffuse_PAR=1.0,
+            theta_dir=0.0, phi_dir=0.0, nrays_dir=0, nrays_dif=nrays_dif,
+            ntheta=ntheta, nphi=nphi)
+        scene.diffuse_unit = trace_absorbed(scene.acc_mesh, scene.mats, scene.settings, sources)
+        scene.diffuse_key = key
+    end
+    return scene.diffuse_unit
+end
+
+# Only the power accumulators and the light sources are renewed at each call
+# With cache_diffuse, the diffuse part is obtained by rescaling the cached unit response, only direct light is traced
+# Settings of the accelerated scene, with threading switched for one call when parallel is given
+function scene_settings(scene::TraceScene, parallel)
+    (parallel === nothing || parallel == scene.build.parallel) && return scene.settings
+    b = scene.build
+    return PlantRayTracer.RTSettings(nx=b.nx, ny=b.ny, dx=b.dx, dy=b.dy,
+                                     parallel=parallel, maxiter=b.maxiter, pkill=b.pkill)
+end
+
+function scene_absorbed!(scene::TraceScene, direct_PAR, diffuse_PAR, theta_dir, phi_dir;
+                         nrays_dir=100_000, nrays_dif=1_000_000,
+                         ntheta=9, nphi=12, cache_diffuse=false, parallel=nothing)
+    scene.dirty && refresh_scene!(scene)
+    use_cache = cache_diffuse && diffuse_PAR > 0
+    if use_cache
+        unit = diffuse_response!(scene; nrays_dif=nrays_dif, ntheta=ntheta, nphi=nphi)
+    end
+    if !use_cache || direct_PAR > 0
+        foreach(PlantRayTracer.reset!, scene.mats)
+        sources = sky_sources_from_PAR(scene.acc_mesh;
+            direct_PAR=direct_PAR, diffuse_PAR=use_cache ? 0.0 : diffuse_PAR,
+            theta_dir=theta_dir, phi_dir=phi_dir, nrays_dir=nrays_dir, nrays_dif=use_cache ? 0 : nrays_dif,
+            ntheta=ntheta, nphi=nphi)
+        absorbed = trace_absorbed!(scene.absorbed, scene.acc_mesh, scene.mats, scene_settings(scene, parallel), sources)
+    else
+        absorbed = fill!(scene.absorbed, 0.0)
+    end
+    if use_cache
+        absorbed .+= diffuse_PAR .* unit
+    end
+    return absorbed
+end
+
+function trace_scene!(scene::TraceScene, direct_PAR, diffuse_PAR, theta_dir, phi_dir; kwargs...)
+    absorbed = scene_absorbed!(scene, direct_PAR, diffuse_PAR, theta_dir, phi_dir; kwargs...)
+    return absorbed_to_outputs(absorbed, scene.areas, direct_PAR + diffuse_PAR)
+end
+
+# Results written into caller provided NumPy buffers
+function trace_scene!(PARa, Erel, scene::TraceScene, direct_PAR, diffuse_PAR, theta_dir, phi_dir; kwargs...)
+    absorbed = scene_absorbed!(scene, direct_PAR, diffuse_PAR, theta_dir, phi_dir; kwargs...)
+    absorbed_to_outputs!(PARa, Erel, absorbed, scene.areas, direct_PAR + diffuse_PAR)
+    return nothing
+end
+
+# 8) Time series of light conditions traced on one persistent scene, results are stored as (ntri, nsteps)
+function trace_scene_series!(scene::TraceScene, direct_PAR, diffuse_PAR, theta_dir, phi_dir;
+                             nrays_dir=100_000, nrays_dif=1_000_000,
+                             ntheta=9, nphi=12, cache_diffuse=false)
+    nsteps = length(direct_PAR)
+    @assert length(diffuse_PAR)==nsteps && length(theta_dir)==nsteps && length(phi_dir)==nsteps "light inputs must have the same length"
+    ntri = length(scene.mats)
+    PARa = zeros(Float64, ntri, nsteps)
+    Erel = zeros(Float64, ntri, nsteps)
+    for t in 1:nsteps
+        dir, dif = Float64(direct_PAR[t]), Float64(diffuse_PAR[t])
+        dir + dif > 0 || continue # night steps stay at zero
+        out = trace_scene!(scene, dir, dif, theta_dir[t], phi_dir[t];
+                           nrays_dir=dir > 0 ? nrays_dir : 0, nrays_dif=dif > 0 ? nrays_dif : 0,
+                           ntheta=ntheta, nphi=nphi, cache_diffuse=cache_diffuse)
+        PARa[:, t] .= out.PARa
+        Erel[:, t] .= out.Erel
+    end
+    return (PARa=PARa, Erel=Erel, areas=scene.areas)
+end
+
+# 9) Absorbed PAR per unit direct PAR over a set of sun directions, stored compactly as (ntri, ndirections)
+function direct_response_table(scene::TraceScene, theta_dir, phi_dir; nrays_dir=100_000)
+    @assert length(theta_dir)==length(phi_dir) "theta_dir, phi_dir must have the same length"
+    table = zeros(Float32, length(scene.mats), length(theta_dir))
+    for j in eachindex(theta_dir)
+        out = trace_scene!(scene, 1.0, 0.0, theta_dir[j], phi_dir[j];
+                           nrays_dir=nrays_dir, nrays_dif=0)
+        table[:, j] .= out.PARa
+    end
+    return table
+end
+
+# 10) Adaptive ray budget : independent batches are traced until the relative standard error of the mean absorbed
+# power, per triangle or per organ, falls below tolerance for the given quantile of the lit elements
+function trace_scene_adaptive!(PARa, Erel, rel_se, scene::TraceScene, direct_PAR, diffuse_PAR, theta_dir, phi_dir;
+                               nrays_dir=10_000, nrays_dif=100_000, ntheta=9, nphi=12,
+                               tolerance=0.05, quantile=0.95, min_batches=4, max_rays=typemax(Int), max_time=Inf,
+                               organ_index=nothing)
+    nunits = length(PARa)
+    mean_power, m2 = zeros(nunits), zeros(nunits)
+    power = organ_index === nothing ? nothing : zeros(nunits)
+    area = organ_index === nothing ? scene.areas : zeros(nunits)
+    batch_rays = nrays_dir + nrays_dif
+    nbatches, criterion = 0, Inf
+    t0 = time()
+    while true
+        absorbed = scene_absorbed!(scene, direct_PAR, diffuse_PAR, theta_dir, phi_dir;
+                                   nrays_dir=nrays_dir, nrays_dif=nrays_dif, ntheta=ntheta, nphi=nphi)
+        if organ_index !== nothing
+            aggregate_organs!(PARa, Erel, power, area, absorbed, scene.areas, organ_index, direct_PAR + diffuse_PAR)
+            absorbed = power
+        end
+        # Welford running mean and variance over batches
+        nbatches += 1
+        @inbounds for i in 1:nunits
+            delta = absorbed[i] - mean_power[i]
+            mean_power[i] += delta / nbatches
+            m2[i] += delta * (absorbed[i] - mean_power[i])
+        end
+        if nbatches >= max(min_batches, 2)
+            lit = 0
+            @inbounds for i in 1:nunits
+                if mean_power[i] > 0
+                    rel_se[i] = sqrt(m2[i] / (nbatches - 1) / nbatches) / mean_power[i]
+                    lit += 1
+                else
+                    rel_se[i] = NaN
+                end
+            end
+            errors = sort!(filter(!isnan, rel_se))
+            criterion = lit == 0 ? 0.0 : errors[clamp(ceil(Int, quantile * lit), 1, lit)]
+            (criterion <= tolerance || (nbatches + 1) * batch_rays > max_rays || time() - t0 >= max_time) && break
+        end
+    end
+    absorbed_to_outputs!(PARa, Erel, mean_power, area, direct_PAR + diffuse_PAR)
+    return (nbatches=nbatches, nrays=nbatches * batch_rays, criterion=criterion, elapsed=time() - t0)
+end
+
+# 11) Run an entry with the Python GIL released, so that other Python threads keep running while Julia traces.
+# PythonCall is looked up among the loaded modules since it is provided by juliacall rather than by this environment
+const PYTHONCALL = Base.PkgId(Base.UUID("6099a3de-0909-46bc-b1f4-468b9a2dfc0d"), "PythonCall")
+
+function without_gil(f, args...; kwargs...)
+    PythonCall = get(Base.loaded_modules, PYTHONCALL, nothing)
+    if PythonCall === nothing || !isdefined(PythonCall, :GIL)
+        return f(args...; kwargs...)
+    end
+    return PythonCall.GIL.unlock(() -> f(args...; kwargs...))
+end
+
+
+# 12) Profiling : wall time, allocations and GC time of each stage of a call, ray and acceleration statistics
+new_profile() = Dict{String,Any}("stages" => Dict{String,Any}[])
+
+# Peak resident memory of the whole process in bytes, Python and Julia included
+peak_rss() = Int(Sys.maxrss())
+
+function timed_stage!(f, profile, name)
+    profile === nothing && return f()
+    t = @timed f()
+    push!(profile["stages"], Dict{String,Any}("stage" => name, "time" => t.time, "bytes" => t.bytes, "gctime" => t.gctime))
+    return t.value
+end
+
+# PlantRayTracer does not count rays by fate, the emitted rays are read from the sources and the rest is an energy
+# balance : what is not absorbed by the scene either escaped, reached the soil or was killed by the roulette (pkill)
+function ray_statistics(sources, absorbed, incident_power, maxiter, pkill)
+    emitted = sum(s -> hasproperty(s, :nrays) ? Int(s.nrays) : 0, sources; init=0)
+    absorbed_power = sum(absorbed; init=0.0)
+    fraction = incident_power > 0 ? absorbed_power / incident_power : NaN
+    return Dict{String,Any}("emitted" => emitted, "sources" => length(sources),
+                            "absorbed_power" => absorbed_power, "incident_power" => incident_power,
+                            "absorbed_fraction" => fraction, "not_absorbed_fraction" => 1 - fraction,
+                            "max_depth_allowed" => maxiter, "pkill" => pkill)
+end
+
+# Type of the accelerated structure only. PlantRayTracer keeps its nodes private and gives no way to count them,
+# node, leaf and depth counts are not reported rather than guessed from its internal layout
+acceleration_statistics(acc_mesh) = Dict{String,Any}("type" => string(nameof(typeof(acc_mesh))))
+
 
 # ---------- Precompile workload ----------
 @setup_workload begin
@@ -119,11 +735,28 @@ end
     τ = Float64[0.0]
     ρ = Float64[0.15]
 
+    buf = vec(permutedims(tris, (3, 2, 1))) # flat C ordered buffer as sent from NumPy
+    PARa, Erel, areas = zeros(1), zeros(1), zeros(1)
+
     @compile_workload begin
         # exercise the high-level entry
         trace_absorbed_incident(tris, τ, ρ, 600.0, 0.0, 1.4486,  3.1416;
             nx=1, ny=1, dx=1.0, dy=1.0, generate_soil=false, tau_soil=0.0, rho_soil=0.15,
         maxiter=1, pkill=0.9, nrays_dir=1, nrays_dif=1, ntheta=8, nphi=6)
+        trace_absorbed_incident!(PARa, Erel, areas, buf, τ, ρ, 600.0, 200.0, 1.4486,  3.1416;
+            nx=1, ny=1, dx=1.0, dy=1.0, generate_soil=false, maxiter=1, pkill=0.9, nrays_dir=1, nrays_dif=1, ntheta=8, nphi=6)
+        trace_organs_incident!(PARa, Erel, zeros(1), zeros(1), Int32[0], buf, τ, ρ, 600.0, 200.0, 1.4486,  3.1416;
+            nx=1, ny=1, dx=1.0, dy=1.0, generate_soil=false, maxiter=1, pkill=0.9, nrays_dir=1, nrays_dif=1, ntheta=8, nphi=6)
+        trace_absorbed_incident!(PARa, Erel, areas, buf, τ, ρ, 600.0, 200.0, 1.4486,  3.1416;
+            nx=1, ny=1, dx=1.0, dy=1.0, generate_soil=false, maxiter=1, pkill=0.9, nrays_dir=1, nrays_dif=1, ntheta=8, nphi=6, profile=true)
+        # exercise the persistent scene entry
+        scene = build_scene(tris, τ, ρ; nx=1, ny=1, dx=1.0, dy=1.0, generate_soil=false, maxiter=1, pkill=0.9)
+        trace_scene!(scene, 600.0, 0.0, 1.4486, 3.1416; nrays_dir=1, nrays_dif=1, ntheta=8, nphi=6)
+        trace_scene!(PARa, Erel, build_scene(buf, τ, ρ; nx=1, ny=1, generate_soil=false, maxiter=1), 600.0, 0.0, 1.4486, 3.1416; nrays_dir=1, nrays_dif=1, ntheta=8, nphi=6)
+        trace_scene!(scene, 600.0, 200.0, 1.4486, 3.1416; nrays_dir=1, nrays_dif=1, ntheta=8, nphi=6, cache_diffuse=true)
+        trace_scene_adaptive!(zeros(1), zeros(1), zeros(1), scene, 600.0, 200.0, 1.4486, 3.1416; nrays_dir=1, nrays_dif=1, ntheta=8, nphi=6, min_batches=2, max_rays=4)
+        trace_scene_series!(scene, [600.0, 0.0], [200.0, 0.0], [1.4486, 1.4486], [3.1416, 3.1416]; nrays_dir=1, nrays_dif=1, ntheta=8, nphi=6)
+        trace_scene!(build_scene(Float32.(buf), τ, ρ; nx=1, ny=1, generate_soil=false, maxiter=1, low_memory=true), 600.0, 0.0, 1.4486, 3.1416; nrays_dir=1, nrays_dif=1, ntheta=8, nphi=6)
     end
 
 end
@@ -1 +1,6 @@
-from openalea.pyRTVPL.pyRTVPL_api import pyRTVPL
\ No newline at end of file
+from openalea.pyRTVPL.pyRTVPL_api import pyRTVPL, pyRTVPLScene
+from openalea.pyRTVPL.direct_table import DirectResponseTable
+from openalea.pyRTVPL.scene_io import TriangleScene
+from openalea.pyRTVPL.julia_runtime import configure_threads, start_background, build_sysimage
+from openalea.pyRTVPL.server import TraceServer, TraceClient
+from openalea.pyRTVPL.cache import TraceCache
\ No newline at end of file
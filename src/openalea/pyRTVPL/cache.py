@@ -0,0 +1,152 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from openalea.pyRTVPL.julia_runtime import manifest_hash
+
+
+tuple_names = ("PARa", "Erel", "areas")
+
+
+def result_nbytes(result):
+    values = result.values() if isinstance(result, dict) else result
+    return sum(np.asarray(value).nbytes for value in values)
+
+
+def copy_result(result):
+    """Copy of a 'pyRTVPL.__call__' result, so that cached arrays are never shared with the caller"""
+    if isinstance(result, dict):
+        return {key: np.array(value) for key, value in result.items()}
+    return tuple(np.array(value) for value in result)
+
+
+def trace_key(arrays: dict, parameters: dict):
+    """Content hash of a trace : every input array (dtype, shape and bytes) and the JSON of every trace parameter,
+    with the Julia environment hash since results depend on the package versions
+
+    Args:
+        arrays (dict): {name: array or None}
+        parameters (dict): JSON serialisable trace parameters (light, sun position, tracer options, seed...)
+
+    Returns:
+        str: hexadecimal key
+    """
+    h = hashlib.blake2b(digest_size=20)
+    for name in sorted(arrays):
+        array = arrays[name]
+        h.update(name.encode())
+        if array is None:
+            continue
+        array = np.ascontiguousarray(array)
+        h.update(str((array.dtype.str, array.shape)).encode())
+        h.update(array.data)
+    h.update(json.dumps(parameters, sort_keys=True, default=str).encode())
+    h.update(manifest_hash().encode())
+    return h.hexdigest()
+
+
+class TraceCache:
+    """Results of identical traces, kept in memory with least recently used eviction by byte size, and optionally on disk
+
+    Keys are content hashes of the inputs and of every trace parameter, see 'trace_key'. Without a seed, a cached
+    result is one Monte Carlo sample reused for every identical call. The disk tier holds one .npz file per result
+    and is not bounded, entries read from it are moved back in memory.
+
+        cache = TraceCache(max_bytes=512 * 2**20, folder="trace_cache")
+        rt = pyRTVPL(scene_xrange=0.56, scene_yrange=0.56, cache=cache, seed=1)
+        ...
+        print(cache.stats())
+    """
+
+    def __init__(self, max_bytes: int = 256 * 2**20, folder: str = None):
+        """
+        Args:
+            max_bytes (int, optional): Memory held by cached results before the least recently used are evicted. Defaults to 256 MiB.
+            folder (str, optional): Folder of the disk tier. Defaults to None, memory only.
+        """
+        self.max_bytes = max_bytes
+        self.folder = folder
+        if folder is not None:
+            os.makedirs(folder, exist_ok=True)
+        self._entries = OrderedDict() # key -> (result, nbytes), most recently used last
+        self._lock = threading.Lock()
+        self.nbytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def get(self, key: str):
+        """Copy of the cached result, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return copy_result(entry[0])
+        result = self._read(key)
+        with self._lock:
+            if result is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._store(key, result)
+        return copy_result(result)
+
+    def put(self, key: str, result):
+        """Cache a copy of a result, in memory and on disk when a folder is given"""
+        result = copy_result(result)
+        with self._lock:
+            self._store(key, result)
+        if self.folder is not None:
+            self._write(key, result)
+
+    def _store(self, key, result):
+        nbytes = result_nbytes(result)
+        if nbytes > self.max_bytes:
+            return
+        if key in self._entries:
+            self.nbytes -= self._entries.pop(key)[1]
+        self._entries[key] = (result, nbytes)
+        self.nbytes += nbytes
+        while self.nbytes > self.max_bytes:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self.nbytes -= evicted
+
+    def _path(self, key):
+        return os.path.join(self.folder, f"{key}.npz")
+
+    def _read(self, key):
+        if self.folder is None or not os.path.exists(self._path(key)):
+            return None
+        with np.load(self._path(key)) as stored:
+            if "organ_id" in stored.files:
+                return {name: stored[name] for name in stored.files}
+            return tuple(stored[name] for name in tuple_names)
+
+    def _write(self, key, result):
+        arrays = result if isinstance(result, dict) else dict(zip(tuple_names, result))
+        tmp = os.path.join(self.folder, f"{key}.{os.getpid()}.{threading.get_ident()}.tmp.npz")
+        np.savez(tmp, **arrays)
+        os.replace(tmp, self._path(key))
+
+    def clear(self, disk: bool = False):
+        """Empty the memory tier, and the disk tier when disk is True"""
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+        if disk and self.folder is not None:
+            for name in os.listdir(self.folder):
+                if name.endswith(".npz"):
+                    os.remove(os.path.join(self.folder, name))
+
+    def stats(self):
+        """Hit and miss counters, 'hit_rate' counting memory and disk hits, entries and bytes held in memory"""
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return dict(hits=self.hits, disk_hits=self.disk_hits, misses=self.misses,
+                        hit_rate=(self.hits + self.disk_hits) / lookups if lookups else None,
+                        entries=len(self._entries), nbytes=self.nbytes, max_bytes=self.max_bytes)
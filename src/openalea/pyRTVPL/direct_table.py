@@ -0,0 +1,114 @@
+import os
+import numpy as np
+
+
+class DirectResponseTable:
+    """Direct light response of a static scene tabulated over a grid of sun directions.
+
+    Unit direct PAR is traced once for every (theta, phi) node of the grid and the absorbed PAR of each triangle is
+    stored as float32. Later direct queries are answered by bilinear interpolation between the four neighbouring
+    nodes (periodic in phi) and scaled by direct_PAR, without tracing any ray. Use 'validate' on held-out
+    directions to choose the grid density.
+    """
+
+    def __init__(self, theta_grid, phi_grid, table, areas):
+        """
+        Args:
+            theta_grid (np.ndarray): (n_theta,) increasing zenith angles in radian
+            phi_grid (np.ndarray): (n_phi,) regularly spaced azimuth angles in radian, starting at 0
+            table (np.ndarray): (n_theta, n_phi, N) absorbed PAR for a unit direct PAR
+            areas (np.ndarray): (N,) triangle areas
+        """
+        self.theta_grid = np.asarray(theta_grid, dtype=np.float64)
+        self.phi_grid = np.asarray(phi_grid, dtype=np.float64)
+        self.table = table
+        self.areas = np.asarray(areas)
+
+    @classmethod
+    def build(cls, scene, n_theta: int = 10, n_phi: int = 24, theta_max: float = np.deg2rad(85.)):
+        """Trace unit direct light over the direction grid of a persistent scene
+
+        Args:
+            scene (pyRTVPLScene): persistent scene, its geometry must not change afterwards
+            n_theta (int, optional): Number of zenith nodes from 0 to theta_max. Defaults to 10.
+            n_phi (int, optional): Number of azimuth nodes over (0, 2pi). Defaults to 24.
+            theta_max (float, optional): Largest tabulated zenith, queries above it are clamped. Defaults to 85°.
+
+        Returns:
+            DirectResponseTable: the precomputed table
+        """
+        theta_grid = np.linspace(0., theta_max, n_theta)
+        phi_grid = np.arange(n_phi) * 2 * np.pi / n_phi
+        theta, phi = (np.ascontiguousarray(a.ravel()) for a in np.meshgrid(theta_grid, phi_grid, indexing="ij"))
+        tracer = scene.tracer
+        # Julia table is (N, n_theta * n_phi) column major
+        table = tracer.julia_call("direct_response_table", scene.handle, theta, phi, nrays_dir=tracer.nrays_dir,
+                                  convert=lambda table: np.ascontiguousarray(np.asarray(table).T))
+        table = table.reshape(n_theta, n_phi, scene.n_triangles)
+        return cls(theta_grid, phi_grid, table, np.array(scene.areas)[:scene.n_triangles])
+
+    def save(self, path: str):
+        """Save the table in a folder, the response array is stored as a plain .npy file to be memory mapped"""
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, "table.npy"), self.table)
+        np.savez(os.path.join(path, "grid.npz"), theta_grid=self.theta_grid, phi_grid=self.phi_grid, areas=self.areas)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True):
+        """Load a table saved with 'save', memory mapped by default so that only queried nodes are read"""
+        grid = np.load(os.path.join(path, "grid.npz"))
+        table = np.load(os.path.join(path, "table.npy"), mmap_mode="r" if mmap else None)
+        return cls(grid["theta_grid"], grid["phi_grid"], table, grid["areas"])
+
+    def query(self, direct_PAR, theta_dir, phi_dir):
+        """Interpolate the absorbed direct PAR for one or several sun positions
+
+        Args:
+            direct_PAR (float or np.ndarray): Direct PAR in µmol.m-2.s-1
+            theta_dir (float or np.ndarray): Zenith angle in radian
+            phi_dir (float or np.ndarray): Azimuth angle in radian
+
+        Returns:
+            np.ndarray: PARa, (N,) or (n_steps, N) absorbed direct PAR in µmol.m-2.s-1
+        """
+        scalar = np.ndim(direct_PAR) == np.ndim(theta_dir) == np.ndim(phi_dir) == 0
+        direct_PAR, theta_dir, phi_dir = (np.atleast_1d(a).astype(np.float64) for a in np.broadcast_arrays(direct_PAR, theta_dir, phi_dir))
+
+        theta = np.clip(theta_dir, self.theta_grid[0], self.theta_grid[-1])
+        i1 = np.clip(np.searchsorted(self.theta_grid, theta, side="right"), 1, len(self.theta_grid) - 1)
+        i0 = i1 - 1
+        wt = (theta - self.theta_grid[i0]) / (self.theta_grid[i1] - self.theta_grid[i0])
+
+        n_phi = len(self.phi_grid)
+        position = (np.mod(phi_dir, 2 * np.pi) / (2 * np.pi)) * n_phi
+        j0 = np.floor(position).astype(int) % n_phi
+        j1 = (j0 + 1) % n_phi
+        wp = position - np.floor(position)
+
+        wt, wp = wt[:, None], wp[:, None]
+        PARa = ((1 - wt) * (1 - wp) * self.table[i0, j0] + (1 - wt) * wp * self.table[i0, j1]
+                + wt * (1 - wp) * self.table[i1, j0] + wt * wp * self.table[i1, j1])
+        PARa = PARa * direct_PAR[:, None]
+        return PARa[0] if scalar else PARa
+
+    def validate(self, scene, theta_dir, phi_dir):
+        """Measure the interpolation error against a full trace on held-out sun directions
+
+        Args:
+            scene (pyRTVPLScene): the scene the table was built from
+            theta_dir (np.ndarray): (n,) held-out zenith angles in radian, preferably between grid nodes
+            phi_dir (np.ndarray): (n,) held-out azimuth angles in radian
+
+        Returns:
+            dict: per direction area weighted relative RMSE ('rrmse') and largest absolute error per unit direct PAR
+            ('max_abs'), along with their maximum over all directions ('rrmse_max')
+        """
+        theta_dir, phi_dir = np.atleast_1d(theta_dir), np.atleast_1d(phi_dir)
+        interpolated = self.query(1., theta_dir, phi_dir)
+        rrmse, max_abs = np.zeros(len(theta_dir)), np.zeros(len(theta_dir))
+        for k, (theta, phi) in enumerate(zip(theta_dir, phi_dir)):
+            reference = np.array(scene.trace(direct_PAR=1., diffuse_PAR=0., theta_dir=theta, phi_dir=phi)[0])
+            error = interpolated[k] - reference
+            rrmse[k] = np.sqrt((self.areas * error ** 2).sum() / max((self.areas * reference ** 2).sum(), 1e-30))
+            max_abs[k] = np.abs(error).max()
+        return dict(theta=theta_dir, phi=phi_dir, rrmse=rrmse, max_abs=max_abs, rrmse_max=rrmse.max())
@@ -0,0 +1,280 @@
+import functools
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import threading
+import warnings
+
+current_file_path = os.path.dirname(os.path.abspath(__file__))
+project_env = os.path.join(current_file_path, "VPLBridge")
+build_env = os.path.join(project_env, "build_env")
+
+
+def cgroup_cpu_limit():
+    """CPU quota of the process cgroup (v2 cpu.max or v1 cfs quota), None when unlimited or unknown"""
+    candidates = (("/sys/fs/cgroup/cpu.max", None),
+                  ("/sys/fs/cgroup/cpu/cpu.cfs_quota_us", "/sys/fs/cgroup/cpu/cpu.cfs_period_us"))
+    for quota_path, period_path in candidates:
+        try:
+            with open(quota_path) as f:
+                fields = f.read().split()
+            if period_path is not None:
+                with open(period_path) as f:
+                    fields.append(f.read().strip())
+        except (OSError, ValueError):
+            continue
+        if len(fields) < 2 or fields[0] in ("max", "-1"):
+            return None
+        return max(1., float(fields[0]) / float(fields[1]))
+    return None
+
+
+def available_cpus():
+    """Number of CPUs this process may actually use, honouring CPU affinity and cgroup quotas"""
+    if hasattr(os, "sched_getaffinity"):
+        n = len(os.sched_getaffinity(0))
+    else:
+        n = os.cpu_count() or 1
+    quota = cgroup_cpu_limit()
+    if quota is not None:
+        n = min(n, int(quota))
+    return max(1, n)
+
+
+def default_threads(share: float = 0.8):
+    """Julia threads used when none are configured : a share of the CPUs available to the process"""
+    return max(1, int(share * available_cpus()))
+
+
+def configure_threads(n: int = None):
+    """Set the number of Julia threads, to be called before the Julia runtime starts
+
+    Args:
+        n (int, optional): Number of threads. Defaults to None, keeps a JULIA_NUM_THREADS already set in the environment
+        as is (e.g. "auto" or "4,1" with interactive threads) and otherwise uses 'default_threads'.
+
+    Returns:
+        str: the configured JULIA_NUM_THREADS value
+    """
+    if n is None:
+        value = os.environ.get("JULIA_NUM_THREADS") or str(default_threads())
+    else:
+        value = str(n)
+    if "juliacall" in sys.modules and os.environ.get("JULIA_NUM_THREADS") != value:
+        raise RuntimeError("The Julia runtime is already started, threads must be configured before the first pyRTVPL is created")
+    os.environ["JULIA_NUM_THREADS"] = value
+    return value
+
+
+def sysimage_path():
+    ext = "dll" if sys.platform.startswith("win") else ("dylib" if sys.platform == "darwin" else "so")
+    return os.path.join(project_env, f"vplbridge_sysimage.{ext}")
+
+
+def stamp_path():
+    return os.path.join(project_env, "vplbridge_sysimage.stamp")
+
+
+@functools.lru_cache(maxsize=None)
+def manifest_hash():
+    """Hash of everything compiled into the system image : resolved environments and VPLBridge sources.
+
+    Computed once per process, as every cache key includes it. 'build_sysimage' hashes the files again.
+    """
+    h = hashlib.sha256()
+    paths = [os.path.join(project_env, "Manifest.toml"), os.path.join(build_env, "Manifest.toml")]
+    src = os.path.join(project_env, "src")
+    paths += [os.path.join(src, name) for name in sorted(os.listdir(src)) if name.endswith(".jl")]
+    for path in paths:
+        h.update(os.path.relpath(path, project_env).encode())
+        with open(path, "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+
+def sysimage_is_current():
+    """True if the system image exists and was built from the current Manifest.toml and sources"""
+    try:
+        with open(stamp_path()) as f:
+            stamp = json.load(f)
+    except (OSError, ValueError):
+        return False
+    return os.path.isfile(sysimage_path()) and stamp.get("manifest_hash") == manifest_hash()
+
+
+def julia_executable():
+    """Julia used by juliacall when available, otherwise the one on the PATH"""
+    try:
+        import juliapkg
+        return juliapkg.executable()
+    except ImportError:
+        return "julia"
+
+
+def build_environment():
+    """Environment variables of the system image build, pointing it to the juliacall environment when available
+
+    PythonCall is then added to the image with the version used by juliacall and runs with this interpreter, so that
+    the precompile workload also compiles the entries for the PyArray arguments juliacall sends.
+    """
+    env = dict(os.environ)
+    try:
+        import juliapkg
+    except ImportError:
+        return env
+    env.update(PYRTVPL_PYTHON_PROJECT=juliapkg.project(), JULIA_PYTHONCALL_EXE=sys.executable, JULIA_CONDAPKG_BACKEND="Null")
+    return env
+
+
+TIME_TO_FIRST_TRACE = """
+import time
+t0 = time.perf_counter()
+import numpy as np
+from openalea.pyRTVPL import pyRTVPL
+rng = np.random.default_rng(0)
+origins = rng.random((400, 1, 3)) * (1., 1., 0.6)
+triangles = origins + np.concatenate((np.zeros((400, 1, 3)), 0.05 * (rng.random((400, 2, 3)) - 0.5)), axis=1)
+tracer = pyRTVPL(import_image={import_image})
+tracer(triangles, np.full(400, 0.1), np.full(400, 0.1), 600., 200., 0.8, 3.1416)
+print(time.perf_counter() - t0)
+"""
+
+
+def time_to_first_trace(import_image: bool = True):
+    """Time from a fresh interpreter to the end of the first periodised, soil enabled, direct and diffuse trace
+
+    Args:
+        import_image (bool, optional): Load the system image, see 'JuliaRuntime.start'. Defaults to True.
+
+    Returns:
+        float: seconds, measured in a subprocess so that the current runtime does not bias it
+    """
+    result = subprocess.run([sys.executable, "-c", TIME_TO_FIRST_TRACE.format(import_image=import_image)],
+                            capture_output=True, text=True, check=True)
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def build_sysimage(julia: str = None, report: bool = True):
+    """Build the VPLBridge system image with PackageCompiler from 'build_env/precompile_workload.jl'
+
+    Args:
+        julia (str, optional): Julia executable. Defaults to None, the one used by juliacall.
+        report (bool, optional): Measure time-to-first-trace before and after the build, in subprocesses. Defaults to True.
+
+    Returns:
+        dict: sysimage path, build time and time-to-first-trace before/after (None when not measured or unavailable)
+    """
+    import time
+    julia = julia or julia_executable()
+    ttft_before = None
+    if report:
+        try:
+            ttft_before = time_to_first_trace(import_image=sysimage_is_current())
+        except subprocess.CalledProcessError as error:
+            warnings.warn(f"Time to first trace could not be measured before the build : {error.stderr}")
+
+    t0 = time.perf_counter()
+    subprocess.run([julia, "--startup-file=no", os.path.join(build_env, "build_sysimage.jl"), sysimage_path()], check=True,
+                   env=build_environment())
+    build_time = time.perf_counter() - t0
+    manifest_hash.cache_clear() # sources may have been edited since the first hash
+    with open(stamp_path(), "w") as f:
+        json.dump(dict(manifest_hash=manifest_hash(), build_time=build_time), f)
+
+    ttft_after = time_to_first_trace(import_image=True) if report else None
+    if report:
+        print(f"VPLBridge system image built in {build_time:.0f} s")
+        if ttft_before is not None:
+            print(f"time to first trace : {ttft_before:.1f} s before, {ttft_after:.1f} s after")
+    return dict(sysimage=sysimage_path(), build_time=build_time, ttft_before=ttft_before, ttft_after=ttft_after)
+
+
+class JuliaRuntime:
+    """Process-wide Julia runtime with the VPLBridge module loaded, shared by all pyRTVPL instances.
+
+    Julia is only started when the module is first requested, usually by the first trace. 'start_background' can
+    overlap this startup with other work, later requests then wait for it to complete.
+    """
+
+    def __init__(self):
+        self._module = None
+        self._lock = threading.Lock()
+        self._thread = None
+        self._error = None
+        self.import_image = None
+
+    @property
+    def started(self):
+        return self._module is not None
+
+    def start(self, import_image: bool = True):
+        """Start Julia and load VPLBridge if not done yet
+
+        Args:
+            import_image (bool, optional): Load the prebuilt VPLBridge system image instead of including the sources. Defaults to True.
+
+        Returns:
+            juliacall module: VPLBridge
+        """
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        with self._lock:
+            if self._error is not None:
+                raise RuntimeError("Julia runtime failed to start in the background") from self._error
+            if self._module is None:
+                self._module = self._load(import_image)
+                self.import_image = import_image
+            elif import_image != self.import_image:
+                warnings.warn(f"Julia runtime already started with import_image={self.import_image}, it is reused as is")
+        return self._module
+
+    def start_background(self, import_image: bool = True):
+        """Start Julia in a background thread so that startup overlaps with the caller's own setup
+
+        Returns:
+            threading.Thread: the initialising thread, None if the runtime was already started in the foreground
+        """
+        with self._lock:
+            if self._module is None and self._thread is None:
+                def target():
+                    try:
+                        self.start(import_image)
+                    except BaseException as error:
+                        self._error = error
+                self._thread = threading.Thread(target=target, name="pyRTVPL-julia-init", daemon=True)
+                self._thread.start()
+        return self._thread
+
+    @staticmethod
+    def _load(import_image):
+        # Assignments before importing juliacall
+        os.environ.setdefault("PYTHON_JULIACALL_HANDLE_SIGNALS", "yes")
+        if import_image and sysimage_is_current():
+            os.environ["PYTHON_JULIACALL_SYSIMAGE"] = sysimage_path()
+        elif import_image: # stale image, the precompiled package is loaded instead
+            warnings.warn("The VPLBridge system image is missing or was built from another Manifest.toml, loading the package "
+                          "instead (slower first trace). Rebuild it with 'julia_runtime.build_sysimage()'")
+        configure_threads() # keeps the user configuration, otherwise a share of the CPUs really available
+        from juliacall import Main as jl
+
+        jl.seval(fr'using Pkg; Pkg.activate(raw"{project_env}")')
+        if import_image:
+            jl.seval("using VPLBridge")
+        else:
+            jl.include(os.path.join(project_env, "src", "VPLBridge.jl"))
+        return jl.VPLBridge
+
+
+runtime = JuliaRuntime()
+
+
+def start_background(import_image: bool = True):
+    """Start the shared Julia runtime in a background thread, see 'JuliaRuntime.start_background'"""
+    return runtime.start_background(import_image)
+
+
+if __name__ == "__main__":
+    # python -m openalea.pyRTVPL.julia_runtime [julia executable]
+    build_sysimage(*sys.argv[1:2])
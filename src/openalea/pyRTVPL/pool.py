@@ -0,0 +1,203 @@
+import multiprocessing
+import sys
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+from openalea.pyRTVPL.julia_runtime import available_cpus, configure_threads
+
+
+# Scene entries handed to the workers through shared memory, the others are pickled
+shared_keys = ("triangles", "tau", "rho", "organ_ids")
+
+
+def share(array):
+    """Copy an array into a new shared memory block
+
+    Returns:
+        SharedMemory: the block, to be unlinked by the owner once done
+        tuple: (name, shape, dtype) descriptor to attach the block in another process
+    """
+    array = np.ascontiguousarray(array)
+    block = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+    return block, (block.name, array.shape, array.dtype.str)
+
+
+def attach(descriptor):
+    """Map a block created by another process, which stays the only one to unlink it"""
+    name, shape, dtype = descriptor
+    if sys.version_info >= (3, 13):
+        block = shared_memory.SharedMemory(name=name, track=False)
+    else:
+        # Attaching registers the block with the resource tracker, which would unlink it, or warn, when the process
+        # exits. Long lived workers would also pile up the names of every block they ever attached
+        register = resource_tracker.register
+
+        def register_others(name, rtype):
+            if rtype != "shared_memory":
+                register(name, rtype)
+
+        resource_tracker.register = register_others
+        try:
+            block = shared_memory.SharedMemory(name=name)
+        finally:
+            resource_tracker.register = register
+    return block, np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+
+
+# Worker side : one warmed tracer per process, created by the pool initializer
+_tracer = None
+
+
+def _init_worker(threads, init, attributes):
+    global _tracer
+    from openalea.pyRTVPL.pyRTVPL_api import pyRTVPL
+    configure_threads(threads)
+    _tracer = pyRTVPL(**init)
+    for key, value in attributes.items():
+        setattr(_tracer, key, value)
+
+    tris = np.array([[[0., 0., 0.], [1., 0., 0.], [0., 1., 0.]]])
+    _tracer.warmup(tris, np.array([0.05]), np.array([0.1]), direct_PAR=600., diffuse_PAR=200.)
+
+
+def _trace_shared(descriptors, arguments):
+    blocks = []
+    try:
+        for key, descriptor in descriptors.items():
+            block, arguments[key] = attach(descriptor)
+            blocks.append(block)
+        result = _tracer(**arguments)
+        # Results must not keep views on memory released below
+        if isinstance(result, dict):
+            return {key: np.array(value) for key, value in result.items()}
+        return tuple(np.array(value) for value in result)
+    except Exception as error:
+        # Julia errors hold juliacall objects, which either fail to pickle or start a Julia runtime where they are
+        # unpickled. Only their description is sent back
+        raise RuntimeError(repr(error)) from None
+    finally:
+        arguments.clear()
+        for block in blocks:
+            block.close()
+
+
+def map_scenes(scenes, workers: int = 2, threads_per_worker: int = None, init: dict = None, attributes: dict = None,
+               max_in_flight: int = None, max_restarts: int = 2):
+    """Trace many independent scenes in a pool of worker processes, each holding its own warmed Julia runtime
+
+    Triangle and optical arrays are handed to the workers through shared memory. Results are yielded as soon as a scene
+    is finished, in completion order. A scene raising an error yields the exception instead of its result and does
+    not stop the others. If a Julia runtime crashes and breaks the pool, unfinished scenes are resubmitted to a new
+    pool up to max_restarts times. Past that, every scene left yields the BrokenProcessPool error.
+
+    Args:
+        scenes (iterable): dicts of 'pyRTVPL.__call__' arguments (triangles, tau, rho, direct_PAR, diffuse_PAR, and optionally theta_dir, phi_dir, organ_ids)
+        workers (int, optional): Number of worker processes. Defaults to 2.
+        threads_per_worker (int, optional): Julia threads of each worker. Defaults to None, an even share of the available CPUs.
+        init (dict, optional): 'pyRTVPL' constructor arguments, see 'pyRTVPL.options'. Defaults to None.
+        attributes (dict, optional): 'pyRTVPL' attributes to override, such as nrays_dir. Defaults to None.
+        max_in_flight (int, optional): Scenes held in shared memory at once. Defaults to None, twice the number of workers.
+        max_restarts (int, optional): Number of pool restarts allowed after a worker crash. Defaults to 2.
+
+    Yields:
+        int: index of the scene in the input order
+        tuple, dict or Exception: the 'pyRTVPL.__call__' result of the scene, or the error it raised
+    """
+    threads = threads_per_worker or max(1, available_cpus() // workers)
+    max_in_flight = max_in_flight or 2 * workers
+    context = multiprocessing.get_context("spawn") # Julia runtimes must not be forked
+    scenes = enumerate(scenes)
+    retry = []
+    pending = {}
+    restarts = 0
+    dead = None # error of the last broken pool once no restart is left, yielded for every remaining scene
+
+    def new_executor():
+        return ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker,
+                                   initargs=(threads, init or {}, attributes or {}))
+
+    def release(blocks):
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+    def submit(executor, index, scene):
+        blocks, descriptors, arguments = [], {}, {}
+        try:
+            for key, value in scene.items():
+                if key in shared_keys and value is not None:
+                    block, descriptors[key] = share(value)
+                    blocks.append(block)
+                else:
+                    arguments[key] = value
+            future = executor.submit(_trace_shared, descriptors, arguments)
+        except BaseException:
+            release(blocks)
+            raise
+        pending[future] = (index, scene, blocks)
+
+    def restart(error):
+        # Every unfinished scene of the broken pool is traced again by a new pool, if any restart is left
+        nonlocal executor, restarts, dead
+        for index, scene, blocks in pending.values():
+            retry.append((index, scene))
+            release(blocks)
+        pending.clear()
+        executor.shutdown(wait=False)
+        if restarts < max_restarts:
+            restarts += 1
+            executor = new_executor()
+        else:
+            dead = error
+
+    executor = new_executor()
+    try:
+        exhausted = False
+        while True:
+            while len(pending) < max_in_flight and (retry or not exhausted):
+                if retry:
+                    item = retry.pop()
+                else:
+                    item = next(scenes, None)
+                    if item is None:
+                        exhausted = True
+                        break
+                if dead is not None:
+                    yield item[0], dead
+                    continue
+                try:
+                    submit(executor, *item)
+                except BrokenProcessPool as error:
+                    retry.append(item)
+                    restart(error)
+            if not pending:
+                break
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            broken = None
+            for future in done:
+                index, scene, blocks = pending.pop(future)
+                try:
+                    result = future.result()
+                except BrokenProcessPool as error:
+                    broken = error
+                    retry.append((index, scene))
+                    release(blocks)
+                    continue
+                except Exception as error:
+                    result = error
+                release(blocks)
+                yield index, result
+            if broken is not None:
+                restart(broken)
+    finally:
+        # Reached early when the caller stops iterating
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=True)
+        for _, _, blocks in pending.values():
+            release(blocks)
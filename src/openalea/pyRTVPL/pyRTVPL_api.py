@@ -1,16 +1,133 @@
-import os, sys
+import numpy as np 
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+import weakref
+from collections.abc import Mapping, Sequence
+from concurrent.futures import Future, ThreadPoolExecutor
 
-# Assignments before importing juliacall
-current_file_path = os.path.dirname(os.path.abspath(__file__))
-project_env = os.path.join(current_file_path, "VPLBridge")
+from openalea.pyRTVPL.julia_runtime import runtime, manifest_hash
 
-n = max(1, int(0.8 * os.cpu_count()))
-os.environ["JULIA_NUM_THREADS"] = str(n)
-os.environ["PYTHON_JULIACALL_HANDLE_SIGNALS"] = "yes"
 
-# input("Julia exe dir (Sys.BINDIR):", jl.seval("Sys.BINDIR"))
-import numpy as np 
-import os
+# Julia is entered by one Python thread at a time, see 'pyRTVPL.julia_call'
+julia_lock = threading.RLock()
+
+
+def vertex_buffer(triangles):
+    """Flat C ordered view of (N, 3, 3) triangles, read by Julia as a vertex buffer without per-element indexing.
+    Contiguous float32/float64 arrays are not copied."""
+    triangles = np.asarray(triangles)
+    if triangles.dtype not in (np.float32, np.float64):
+        triangles = triangles.astype(np.float64)
+    return np.ascontiguousarray(triangles).reshape(-1)
+
+
+def optical_buffer(values):
+    return np.ascontiguousarray(values, dtype=np.float64)
+
+
+def band_inputs(tau, rho, direct_PAR, diffuse_PAR):
+    """Optics and light of a multi-band trace, None when tau, rho and light are single band, see 'single_band'
+
+    Returns:
+        tuple: (n, n_bands) tau and rho, (n_bands,) direct and diffuse light, optics given per triangle (n,) being
+        shared by all bands and scalar light repeated in every band
+    """
+    if np.ndim(tau) < 2 and np.ndim(rho) < 2 and np.ndim(direct_PAR) == 0 and np.ndim(diffuse_PAR) == 0:
+        return None
+    n_bands = max([np.shape(a)[1] for a in (tau, rho) if np.ndim(a) == 2] +
+                  [np.size(a) for a in (direct_PAR, diffuse_PAR) if np.ndim(a) > 0])
+    if n_bands == 1:
+        return None
+    tau, rho = (np.asarray(a, dtype=np.float64) for a in (tau, rho))
+    tau, rho = (optical_buffer(np.broadcast_to(a.reshape(a.shape[0], -1), (a.shape[0], n_bands))) for a in (tau, rho))
+    direct_PAR, diffuse_PAR = (optical_buffer(np.broadcast_to(a, (n_bands,))) for a in (direct_PAR, diffuse_PAR))
+    return tau, rho, direct_PAR, diffuse_PAR
+
+
+def single_band(tau, rho, direct_PAR, diffuse_PAR):
+    """(n,) tau and rho and scalar light of a single band trace, bands given as one column or one element arrays
+    being traced as a single band"""
+    tau, rho = (np.reshape(a, -1) for a in (tau, rho))
+    direct_PAR, diffuse_PAR = (float(np.reshape(a, -1)[0]) for a in (direct_PAR, diffuse_PAR))
+    return tau, rho, direct_PAR, diffuse_PAR
+
+
+def geometry_key(triangles, tau, rho, build: dict):
+    """Hash of everything an accelerated structure depends on : vertices, optics, build options and Julia environment"""
+    h = hashlib.blake2b(digest_size=20)
+    for array in (vertex_buffer(triangles), optical_buffer(tau), optical_buffer(rho)):
+        h.update(str((array.dtype.str, array.shape)).encode())
+        h.update(array.data)
+    h.update(json.dumps({k: v for k, v in build.items() if k != "parallel"}, sort_keys=True, default=str).encode())
+    h.update(manifest_hash().encode())
+    return h.hexdigest()
+
+
+def to_python(value):
+    """Recursive copy of Julia dictionaries and vectors returned by VPLBridge into Python dicts and lists"""
+    if isinstance(value, Mapping):
+        return {str(k): to_python(v) for k, v in value.items()}
+    if isinstance(value, Sequence) and not isinstance(value, str):
+        return [to_python(v) for v in value]
+    return value
+
+
+def profile_record(julia_profile, wall_time: float, n_triangles: int, settings: dict):
+    """Structured profile of one trace from the record filled by VPLBridge
+
+    Returns:
+        dict: 'n_triangles', 'wall_time' (s) of the whole call, 'stages' mapping each stage (python, mesh, accelerate,
+        sources, trace, outputs) to its 'time' (s), allocated 'bytes' and 'gctime' (s), python being the time spent outside
+        the Julia stages (input buffers, conversions), 'rays' (emitted rays, energy balance,
+        'max_depth_allowed' the maximal reflection depth and pkill), 'rays_per_second' of the trace stage, 'acceleration'
+        (structure type), 'peak_rss' peak resident memory of the process in bytes and the tracing 'settings'
+
+    PlantRayTracer counts neither the rays by fate nor the nodes of its structures. Rays escaping the scene, reaching the
+    soil or killed by the roulette are only known together, as the not absorbed fraction of the incident power, and
+    the reflection depth actually reached is not known.
+    """
+    record = to_python(julia_profile)
+    stages = {stage.pop("stage"): stage for stage in record["stages"]}
+    julia_time = sum(stage["time"] for stage in stages.values())
+    record["stages"] = {"python": dict(time=max(0., wall_time - julia_time), bytes=None, gctime=None), **stages}
+    trace_time = stages.get("trace", {}).get("time")
+    record["rays_per_second"] = record["rays"]["emitted"] / trace_time if trace_time and record.get("rays") else None
+    record.update(n_triangles=n_triangles, wall_time=wall_time,
+                  settings={k: v for k, v in settings.items() if k != "profile"})
+    return record
+
+
+def organ_results(PARa, areas, organ_ids, total_PAR):
+    """Aggregate per-triangle results per organ in numpy, as 'trace_organs_incident!' does in Julia
+
+    Args:
+        PARa (np.ndarray): (N,) or (N, n_bands) absorbed PAR in µmol.m-2.s-1
+        areas (np.ndarray): (N,) triangle areas, soil triangles excluded
+        organ_ids (np.ndarray): (N,) integer organ id of each triangle
+        total_PAR (float): incident PAR, (n_bands,) for a multi-band trace
+
+    Returns:
+        dict: 'organ_id', 'PARa', 'Erel', 'absorbed' and 'area' arrays sorted by organ id, see 'pyRTVPL.__call__'
+    """
+    organs, organ_index = np.unique(organ_ids, return_inverse=True)
+    organ_index = organ_index.reshape(-1)
+    area = np.bincount(organ_index, weights=areas, minlength=organs.shape[0])
+    absorbed = np.zeros((organs.shape[0],) + PARa.shape[1:])
+    np.add.at(absorbed, organ_index, PARa * areas.reshape((-1,) + (1,) * (PARa.ndim - 1)))
+    organ_PARa = absorbed / area.reshape((-1,) + (1,) * (PARa.ndim - 1))
+    total_PAR = np.asarray(total_PAR, dtype=np.float64)
+    Erel = np.divide(organ_PARa, total_PAR, out=np.zeros_like(organ_PARa), where=total_PAR > 0)
+    return {"organ_id": organs, "PARa": organ_PARa, "Erel": Erel, "absorbed": absorbed, "area": area}
+
+
+def check_scene_optics(tau, rho):
+    """Persistent scenes trace a single band, their tau and rho are (N,) or (M,) arrays"""
+    if np.ndim(tau) > 1 or np.ndim(rho) > 1:
+        raise ValueError("persistent scenes trace a single band, per-band optics are only supported by 'pyRTVPL.__call__'")
 
 
 class pyRTVPL:
@@ -23,7 +140,19 @@ class pyRTVPL:
 
     minimal_zenith = np.deg2rad(9.23) # Lower zenit of Caribu 46 sky
 
-    def __init__(self, scene_xrange: float=1., scene_yrange: float=1., periodize: bool = True, maxiter: int = 4, ntheta: int = 8, nphi: int = 6, generate_soil: bool = True, import_image: bool = True):
+    acceleration = "BVH" # "BVH" or "Naive" (no structure, only for very small scenes)
+    acceleration_rule = "SAH" # BVH split rule, "SAH" (surface area heuristic) or "AvgSplit" (split at the average)
+    rule_bins = 3 # SAH bins tested per axis
+    rule_min_triangles = 1 # nodes with fewer triangles are not split
+    rule_max_levels = 5 # maximal BVH depth
+
+    sky_sampling = "uniform" # "uniform" rays per sky sector over the whole plot, or "importance" see 'pyRTVPL.__call__'
+    footprint_tiles = 8 # plot tiles per side of the "importance" emission footprint
+
+    turbid_voxel_size = None # voxel edge in m of the "turbid" engine, None for a twentieth of the largest scene side
+
+    def __init__(self, scene_xrange: float=1., scene_yrange: float=1., periodize: bool = True, maxiter: int = 4, ntheta: int = 8, nphi: int = 6, generate_soil: bool = True, import_image: bool = True, parallel: bool = True,
+                 periodisation_mode: str = "sky", low_memory: bool = False, seed: int = None, cache=None):
         """_summary_
 
         Args:
@@ -33,20 +162,18 @@ class pyRTVPL:
             maxiter (int, optional): _description_. Defaults to 4.
             ntheta (int, optional): _description_. Defaults to 8, to near Caribu's 46 sky dome.
             nphi (int, optional): _description_. Defaults to 6, to near Caribu's 46 sky dome.
-        """
-        ext = "dll" if sys.platform.startswith("win") else ("dylib" if sys.platform == "darwin" else "so")
-        if import_image: os.environ["PYTHON_JULIACALL_SYSIMAGE"]  = os.path.join(current_file_path, "VPLBridge", f"vplbridge_sysimage.{ext}")  # or .dylib/.dll
-        from juliacall import Main as jl
-
-        if import_image:    
-            jl.seval(fr'using Pkg; Pkg.activate(raw"{project_env}")')
-            jl.seval("using VPLBridge")
-        else:
-            jl.seval(fr'using Pkg; Pkg.activate(raw"{project_env}")')
-            jl.include(os.path.join(project_env, "src", "VPLBridge.jl"))
-
-        self.VPL = jl.VPLBridge
+            parallel (bool, optional): Multithreaded tracing, can be overridden per call. Threads are set once per process with 'julia_runtime.configure_threads'. Defaults to True.
+            periodisation_mode (str, optional): How scene replications are counted, see 'periodisation'. "sky" covers the lowest sky elevation in
+                every direction, "light" only the light traced by each call. Defaults to "sky".
+            low_memory (bool, optional): Memory bounded tracing for very large canopies. Julia keeps float32 vertices (from float32
+                triangles in direct calls, always in persistent scenes) and releases the mesh once accelerated, before tracing.
+                Combined with 'pyRTVPLScene.from_chunks', the full triangle array never has to exist in Python. Defaults to False.
+            seed (int, optional): Seed of the random ray generation of '__call__', results being reproducible for a given seed and
+                number of Julia threads. Defaults to None, a new sample at each call.
+            cache (TraceCache, optional): Result cache of identical calls, see 'cache.TraceCache'. Defaults to None.
 
+        The Julia runtime is shared by all instances and only started by the first trace, see 'julia_runtime.start_background' to start it earlier.
+        """
         self.scene_xrange = scene_xrange
         self.scene_yrange = scene_yrange
         self.periodize = periodize
@@ -54,40 +181,639 @@ class pyRTVPL:
         self.ntheta = ntheta
         self.nphi = nphi
         self.generate_soil = generate_soil
+        self.import_image = import_image
+        self.parallel = parallel
+        if periodisation_mode not in ("sky", "light"):
+            raise ValueError(f"periodisation_mode must be 'sky' or 'light', got {periodisation_mode!r}")
+        self.periodisation_mode = periodisation_mode
+        self.low_memory = low_memory
+        self.seed = seed
+        self.cache = cache
+        self._executor = None # background thread serving 'submit'
+        self.profile_hooks = [] # callables receiving the profile record of each '__call__', e.g. a metrics logger
+
+    @property
+    def VPL(self):
+        """VPLBridge Julia module of the shared runtime, started on first access"""
+        return runtime.start(self.import_image)
 
+    def julia_call(self, entry: str, *args, release_gil: bool = False, convert=None, **kwargs):
+        """Call a VPLBridge entry holding 'julia_lock', so that Julia is never entered by two Python threads at once
+
+        Args:
+            entry (str): name of the VPLBridge function, '!' being written '_b'
+            release_gil (bool, optional): Release the GIL while Julia runs, see 'submit'. Defaults to False.
+            convert (callable, optional): Applied to the Julia result before the lock is released, to copy it into
+                Python objects. Defaults to None, the result is returned as is.
+
+        Returns:
+            the result of the entry, converted when convert is given
+        """
+        with julia_lock:
+            function = getattr(self.VPL, entry)
+            if release_gil:
+                result = self.VPL.without_gil(function, *args, **kwargs)
+            else:
+                result = function(*args, **kwargs)
+            return result if convert is None else convert(result)
 
-    def __call__(self, triangles, tau, rho, direct_PAR: float, diffuse_PAR: float, theta_dir: float=1.4486, phi_dir: float=3.1416):
+    def options(self):
+        """Constructor arguments and ray tracing attributes needed to rebuild an equivalent tracer in another process"""
+        return dict(init=dict(scene_xrange=self.scene_xrange, scene_yrange=self.scene_yrange, periodize=self.periodize, maxiter=self.maxiter,
+                              ntheta=self.ntheta, nphi=self.nphi, generate_soil=self.generate_soil, import_image=self.import_image, parallel=self.parallel,
+                              periodisation_mode=self.periodisation_mode, low_memory=self.low_memory, seed=self.seed),
+                    attributes=dict(tau_soil=self.tau_soil, rho_soil=self.rho_soil, nrays_dir=self.nrays_dir, nrays_dif=self.nrays_dif,
+                                    minimal_zenith=self.minimal_zenith, acceleration=self.acceleration, acceleration_rule=self.acceleration_rule,
+                                    rule_bins=self.rule_bins, rule_min_triangles=self.rule_min_triangles, rule_max_levels=self.rule_max_levels,
+                                    sky_sampling=self.sky_sampling, footprint_tiles=self.footprint_tiles, turbid_voxel_size=self.turbid_voxel_size))
+
+    def map_scenes(self, scenes, workers: int = 2, threads_per_worker: int = None):
+        """Trace many independent scenes in a pool of worker processes with this tracer's settings, see 'pool.map_scenes'"""
+        from openalea.pyRTVPL.pool import map_scenes
+        return map_scenes(scenes, workers=workers, threads_per_worker=threads_per_worker, **self.options())
+
+
+    def __call__(self, triangles, tau, rho, direct_PAR: float, diffuse_PAR: float, theta_dir: float=1.4486, phi_dir: float=3.1416, organ_ids=None, out=None, release_gil: bool = False, parallel: bool = None, profile: bool = None,
+                 engine: str = "raytracer"):
         """Run method for Virtual Plant Lab raytracer interception on provided triangles set
 
         Args:
             triangles (np.ndarray): (N, 3) triangle arrays
-            tau (np.ndarray): (N,) transmitance, Caribu default is 0.05
-            rho (np.ndarray): (N,) reflectance, Caribu default is 0.1
-            direct_PAR (float): Direct PAR in µmol.m-2.s-1 . In case direct is used, 'sun_position.py' should be used to estimate input varying theta_dir and phi_dir along with PARi
-            diffuse_PAR (float): Diffuse PAR in µmol.m-2.s-1
+            tau (np.ndarray): (N,) transmitance, Caribu default is 0.05. (N, n_bands) per waveband
+            rho (np.ndarray): (N,) reflectance, Caribu default is 0.1. (N, n_bands) per waveband
+            direct_PAR (float): Direct PAR in µmol.m-2.s-1 . In case direct is used, 'sun_position.py' should be used to estimate input varying theta_dir and phi_dir along with PARi.
+                (n_bands,) array for a multi-band trace, e.g. PAR, red, far-red and NIR, all bands sharing the same rays and accelerated structure
+            diffuse_PAR (float): Diffuse PAR in µmol.m-2.s-1, (n_bands,) array for a multi-band trace. A single band given as
+                (1,) light or (N, 1) optics is traced and returned as a single band.
             theta_dir (float, optional): Zenith angle in radian Zenith angle (0 max intensity, above pi/2 bellow horizon). Defaults to 1.4486.
             phi_dir (float, optional): Azimuth angle (0, 2pi). Defaults to 3.1416.
+            organ_ids (np.ndarray, optional): (N,) integer organ / shape id of each triangle. When given, results are aggregated per organ inside the Julia call. Defaults to None.
+            out (tuple, optional): (PARa, Erel, areas) float64 buffers written in place, see 'allocate_outputs'. Not allowed with organ_ids. Defaults to None.
+            release_gil (bool, optional): Release the GIL while Julia traces, so that other Python threads keep running. Defaults to False.
+            parallel (bool, optional): Multithreaded BVH build and tracing for this call. Defaults to None, the tracer's setting.
+            profile (bool, optional): Time each stage of the call and collect ray and BVH statistics, see 'profile_record'.
+                The record is passed to every callable of 'profile_hooks' and returned along with the results when True.
+                Defaults to None, profiled only when 'profile_hooks' is not empty.
+            engine (str, optional): "raytracer" for the Virtual Plant Lab ray tracer or "turbid" for the much faster and coarser
+                numpy turbid medium approximation, see 'turbid.TurbidMedium'. Defaults to "raytracer".
 
         Returns:
-            np.ndarray: PARa, absorbed PAR in µmol.m-2.s-1
-            np.ndarray: Erel, relative absorption (adim)
+            np.ndarray: PARa, absorbed PAR in µmol.m-2.s-1, (N, n_bands) for a multi-band trace
+            np.ndarray: Erel, relative absorption (adim), (N, n_bands) for a multi-band trace
+            np.ndarray: areas, triangle areas (soil triangles last when generated)
+
+            or, when organ_ids are given, a dict of (n_organs,) arrays sorted by organ id ((n_organs, n_bands) for a multi-band trace) :
+            'organ_id', 'PARa' area weighted absorbed PAR in µmol.m-2.s-1, 'Erel' relative absorption (adim),
+            'absorbed' absorbed power in µmol.s-1 and 'area' organ area in m2
+
+            With profile=True, a (results, profile record) pair.
+
+        With a 'cache', results of identical calls are returned from it, profiled calls being always traced.
+
+        With sky_sampling = "importance", the diffuse rays are shared among the sky sectors in proportion to the irradiance
+        they bring instead of equally. Without soil or with a black soil (rho_soil = 0), rays are also only emitted above the
+        plot tiles whose projection along each light direction holds canopy triangles, the light missing the canopy never
+        coming back to it. Directions low enough to cross the whole plot within the canopy depth are
+        emitted above the whole plot. Each source carries the power of its own area and direction so that results stay unbiased,
+        only their Monte Carlo variance changes, see benchmarks/sky_sampling.py.
         """
-        canopy_height = triangles[:, :, 2].max()
-        periodise_numberx = self.n_replications(canopy_height, self.minimal_zenith, self.scene_xrange) if self.periodize else 0
-        periodise_numbery = self.n_replications(canopy_height, self.minimal_zenith, self.scene_yrange) if self.periodize else 0
-        
-        out = self.VPL.trace_absorbed_incident(triangles, tau, rho, direct_PAR, diffuse_PAR, theta_dir, phi_dir, 
-                                                 nx=periodise_numberx, ny=periodise_numbery, dx=self.scene_xrange, dy=self.scene_yrange, generate_soil=self.generate_soil, tau_soil=self.tau_soil, rho_soil=self.rho_soil, 
-                                                 maxiter=self.maxiter, nrays_dir=self.nrays_dir if direct_PAR > 0 else 0, nrays_dif=self.nrays_dif if diffuse_PAR > 0 else 0, 
-                                                 ntheta=self.ntheta, nphi=self.nphi)
-        return out
+        if out is not None and organ_ids is not None:
+            raise ValueError("out buffers hold per-triangle results, they cannot be used with organ_ids")
+        arguments = dict(organ_ids=organ_ids, release_gil=release_gil, parallel=parallel, engine=engine)
+        profiled = bool(self.profile_hooks) if profile is None else profile
+        if self.cache is None or profiled:
+            return self._trace(triangles, tau, rho, direct_PAR, diffuse_PAR, theta_dir, phi_dir, out=out, profile=profile, **arguments)
+        key = self.cache_key(triangles, tau, rho, direct_PAR, diffuse_PAR, theta_dir, phi_dir, organ_ids=organ_ids, engine=engine)
+        result = self.cache.get(key)
+        if result is None:
+            result = self._trace(triangles, tau, rho, direct_PAR, diffuse_PAR, theta_dir, phi_dir, out=out, profile=False, **arguments)
+            self.cache.put(key, result)
+        elif out is not None and isinstance(result, tuple):
+            for buffer, value in zip(out, result):
+                np.copyto(buffer, value)
+            result = out
+        return result
+
+    def _trace(self, triangles, tau, rho, direct_PAR, diffuse_PAR, theta_dir, phi_dir, organ_ids=None, out=None,
+               release_gil=False, parallel=None, profile=None, engine="raytracer"):
+        if engine not in ("raytracer", "turbid"):
+            raise ValueError(f"engine must be 'raytracer' or 'turbid', got {engine!r}")
+        t0 = time.perf_counter()
+        profiled = bool(self.profile_hooks) if profile is None else profile
+        if engine == "turbid":
+            result = self._trace_turbid(triangles, tau, rho, direct_PAR, diffuse_PAR, theta_dir, phi_dir, organ_ids, out)
+            if not profiled:
+                return result
+            wall_time = time.perf_counter() - t0
+            turbid_profile = dict(stages=[dict(stage="turbid", time=wall_time, bytes=None, gctime=None)], rays=None, acceleration=None)
+            record = profile_record(turbid_profile, wall_time, triangles.shape[0], dict(engine=engine, turbid_voxel_size=self.turbid_voxel_size,
+                                                                                       periodize=self.periodize, ntheta=self.ntheta, nphi=self.nphi))
+            for hook in self.profile_hooks:
+                hook(record)
+            return (result, record) if profile else result
+
+        settings = self.trace_settings(self.canopy_depth(triangles), direct_PAR, diffuse_PAR, parallel=parallel, theta_dir=theta_dir, phi_dir=phi_dir)
+        settings["profile"] = profiled
+        bands = band_inputs(tau, rho, direct_PAR, diffuse_PAR)
+        if bands is None:
+            tau, rho, direct_PAR, diffuse_PAR = single_band(tau, rho, direct_PAR, diffuse_PAR)
+            inputs = (vertex_buffer(triangles), optical_buffer(tau), optical_buffer(rho), direct_PAR, diffuse_PAR, theta_dir, phi_dir)
+        else:
+            tau, rho, direct_PAR, diffuse_PAR = bands
+            inputs = (vertex_buffer(triangles), tau, rho, direct_PAR, diffuse_PAR, theta_dir, phi_dir)
+
+        def julia(entry, *args, **kwargs):
+            # the profile record is copied while Julia is still locked
+            return self.julia_call(entry, *args, release_gil=release_gil, convert=to_python if profiled else None, **kwargs)
+
+        if organ_ids is not None and bands is not None:
+            # band results are aggregated from the per-triangle results
+            (PARa, Erel, areas), julia_profile = self._trace_bands(julia, triangles.shape[0], tau.shape[1], inputs, settings)
+            result = organ_results(PARa, areas[:triangles.shape[0]], organ_ids, direct_PAR + diffuse_PAR)
+        elif organ_ids is not None:
+            organs, organ_index = np.unique(organ_ids, return_inverse=True)
+            organ_out = {"organ_id": organs, "PARa": np.empty(organs.shape[0]), "Erel": np.empty(organs.shape[0]),
+                         "absorbed": np.empty(organs.shape[0]), "area": np.empty(organs.shape[0])}
+            julia_profile = julia("trace_organs_incident_b", organ_out["PARa"], organ_out["Erel"], organ_out["absorbed"], organ_out["area"],
+                                 organ_index.reshape(-1).astype(np.int32), *inputs, **settings)
+            result = organ_out
+        elif bands is not None:
+            result, julia_profile = self._trace_bands(julia, triangles.shape[0], tau.shape[1], inputs, settings, out=out)
+        else:
+            if out is None:
+                out = self.allocate_outputs(triangles.shape[0])
+            PARa, Erel, areas = out
+            julia_profile = julia("trace_absorbed_incident_b", PARa, Erel, areas, *inputs, **settings)
+            result = PARa, Erel, areas
+
+        if not profiled:
+            return result
+        record = profile_record(julia_profile, time.perf_counter() - t0, triangles.shape[0], settings)
+        for hook in self.profile_hooks:
+            hook(record)
+        return (result, record) if profile else result
+
+    def cache_key(self, triangles, tau, rho, direct_PAR, diffuse_PAR, theta_dir, phi_dir, organ_ids=None, engine="raytracer"):
+        """Content hash of a call for the result 'cache' : input arrays, light, sun position, engine and every tracer option
+        except threading, see 'cache.trace_key'"""
+        from openalea.pyRTVPL.cache import trace_key
+        options = self.options()
+        for key in ("parallel", "import_image"):
+            options["init"].pop(key)
+        light = [np.asarray(value, dtype=np.float64).tolist() for value in (direct_PAR, diffuse_PAR, theta_dir, phi_dir)]
+        return trace_key(dict(triangles=triangles, tau=tau, rho=rho, organ_ids=organ_ids),
+                         dict(light=light, engine=engine, **options))
+
+    def _trace_bands(self, julia, n_triangles, n_bands, inputs, settings, out=None):
+        if out is None:
+            out = self.allocate_outputs(n_triangles, n_bands=n_bands)
+        PARa, Erel, areas = out
+        julia_profile = julia("trace_absorbed_incident_b", PARa, Erel, areas, *inputs, **settings)
+        return (PARa, Erel, areas), julia_profile
+
+    def _trace_turbid(self, triangles, tau, rho, direct_PAR, diffuse_PAR, theta_dir, phi_dir, organ_ids=None, out=None):
+        from openalea.pyRTVPL.turbid import TurbidMedium
+        n_triangles = triangles.shape[0]
+        bands = band_inputs(tau, rho, direct_PAR, diffuse_PAR)
+        medium = TurbidMedium(triangles, self.scene_xrange, self.scene_yrange, voxel_size=self.turbid_voxel_size, periodic=self.periodize)
+        if out is None:
+            out = self.allocate_outputs(n_triangles, n_bands=None if bands is None else bands[0].shape[1])
+        PARa, Erel, areas = out
+        areas[:n_triangles] = medium.areas
+        areas[n_triangles:] = self.scene_xrange * self.scene_yrange / 2. # soil triangles
+        if bands is None:
+            tau, rho, direct_PAR, diffuse_PAR = single_band(tau, rho, direct_PAR, diffuse_PAR)
+            absorbed = medium.trace(tau, rho, direct_PAR, diffuse_PAR, theta_dir, phi_dir, ntheta=self.ntheta, nphi=self.nphi)
+        else:
+            tau, rho, direct_PAR, diffuse_PAR = bands
+            absorbed = np.column_stack([medium.trace(tau[:, b], rho[:, b], direct_PAR[b], diffuse_PAR[b], theta_dir, phi_dir,
+                                                     ntheta=self.ntheta, nphi=self.nphi) for b in range(tau.shape[1])])
+        total = np.asarray(direct_PAR + diffuse_PAR, dtype=np.float64)
+        triangle_areas = medium.areas.reshape((-1,) + (1,) * (absorbed.ndim - 1))
+        PARa[...] = np.divide(absorbed, triangle_areas, out=np.zeros_like(absorbed), where=triangle_areas > 0)
+        Erel[...] = np.divide(PARa, total, out=np.zeros_like(absorbed), where=total > 0)
+        if organ_ids is not None:
+            return organ_results(PARa, medium.areas, organ_ids, total)
+        return PARa, Erel, areas
+
+    def submit(self, *args, **kwargs) -> Future:
+        """Queue a trace without blocking the calling thread
+
+        Takes the arguments of 'pyRTVPL.__call__'. Submissions are traced one after the other by a single background
+        thread with the GIL released, so that several of them can be outstanding against the same Julia runtime.
+        Input arrays must not be modified before the future is done.
+
+        Returns:
+            concurrent.futures.Future: resolves to the 'pyRTVPL.__call__' result
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pyRTVPL")
+            # the thread is stopped with the tracer if 'close' is never called
+            self._finalizer = weakref.finalize(self, self._executor.shutdown, wait=False)
+        kwargs["release_gil"] = True
+        return self._executor.submit(self, *args, **kwargs)
+
+    def close(self):
+        """Wait for the outstanding submissions and stop the background thread of 'submit'"""
+        if self._executor is not None:
+            self._finalizer.detach()
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    async def trace_async(self, *args, **kwargs):
+        """Awaitable variant of 'submit' for asyncio event loops"""
+        return await asyncio.wrap_future(self.submit(*args, **kwargs))
+
+    def trace_settings(self, canopy_height: float, direct_PAR: float, diffuse_PAR: float, parallel: bool = None, theta_dir: float = None, phi_dir: float = None):
+        """Keyword arguments of the Julia trace entries for a canopy height and a light condition, light being given once or per band"""
+        direct_PAR, diffuse_PAR = np.sum(direct_PAR), np.sum(diffuse_PAR)
+        periodise_numberx, periodise_numbery = self.periodisation(canopy_height, theta_dir=theta_dir, phi_dir=phi_dir, diffuse=diffuse_PAR > 0)
+        return dict(parallel=self.parallel if parallel is None else parallel, nx=periodise_numberx, ny=periodise_numbery, dx=self.scene_xrange, dy=self.scene_yrange, generate_soil=self.generate_soil, tau_soil=self.tau_soil, rho_soil=self.rho_soil,
+                    maxiter=self.maxiter, nrays_dir=self.nrays_dir if direct_PAR > 0 else 0, nrays_dif=self.nrays_dif if diffuse_PAR > 0 else 0,
+                    ntheta=self.ntheta, nphi=self.nphi, low_memory=self.low_memory, seed=self.seed,
+                    sampling=self.sky_sampling, footprint_tiles=self.footprint_tiles, **self.acceleration_settings())
+
+    def acceleration_settings(self):
+        """Keyword arguments selecting the accelerated structure and its build parameters in the Julia entries"""
+        return dict(acceleration=self.acceleration, rule=self.acceleration_rule, rule_bins=self.rule_bins,
+                    rule_min_triangles=self.rule_min_triangles, rule_max_levels=self.rule_max_levels)
+
+    def allocate_outputs(self, n_triangles: int, n_bands: int = None):
+        """Output buffers for 'pyRTVPL.__call__', to be reused between calls on scenes of the same size
+
+        Args:
+            n_triangles (int): number of triangles
+            n_bands (int, optional): number of wavebands of a multi-band trace. Defaults to None, single band.
+
+        Returns:
+            tuple: (PARa, Erel, areas) float64 arrays, (N,) or (N, n_bands), areas holding the 2 soil triangles last when generated
+        """
+        n_soil = 2 if self.generate_soil else 0
+        shape = n_triangles if n_bands is None else (n_triangles, n_bands)
+        return np.empty(shape), np.empty(shape), np.empty(n_triangles + n_soil)
+
+    def build_scene(self, triangles, tau, rho, cache_diffuse: bool = False, acceleration_cache: str = None):
+        """Build a persistent scene keeping the Julia materials and accelerated structure alive between traces
+
+        Args:
+            triangles (np.ndarray): (N, 3, 3) triangle arrays
+            tau (np.ndarray): (N,) transmitance
+            rho (np.ndarray): (N,) reflectance
+            cache_diffuse (bool, optional): Trace the diffuse sky once with unit intensity and rescale it by diffuse_PAR in later traces. Defaults to False.
+            acceleration_cache (str, optional): Folder where accelerated structures are saved, named after a hash of the geometry, optics
+                and build options. A scene already built with the same inputs is loaded instead of being built again. Defaults to None.
+
+        Returns:
+            pyRTVPLScene: scene to be traced repeatedly with 'trace'
+        """
+        return pyRTVPLScene(self, triangles, tau, rho, cache_diffuse=cache_diffuse, acceleration_cache=acceleration_cache)
     
+    def build_scene_from_chunks(self, chunks, cache_diffuse: bool = False):
+        """Build a persistent scene from successive (triangles, tau, rho) blocks, see 'pyRTVPLScene.from_chunks'"""
+        return pyRTVPLScene.from_chunks(self, chunks, cache_diffuse=cache_diffuse)
+
+    def peak_rss(self):
+        """Peak resident memory of this process in bytes, Julia included, to size jobs after a representative trace"""
+        return self.julia_call("peak_rss", convert=int)
+
     def warmup(self, triangles, tau, rho, direct_PAR: float, diffuse_PAR: float, theta_dir: float=1.4486, phi_dir: float=3.1416):
-        self.VPL.trace_absorbed_incident(triangles, tau, rho, direct_PAR, diffuse_PAR, theta_dir, phi_dir, 
+        self.julia_call("trace_absorbed_incident_b", *self.allocate_outputs(triangles.shape[0]), vertex_buffer(triangles), optical_buffer(tau), optical_buffer(rho), direct_PAR, diffuse_PAR, theta_dir, phi_dir, 
                                                  nx=1, ny=1, dx=self.scene_xrange, dy=self.scene_yrange, generate_soil=self.generate_soil, tau_soil=self.tau_soil, rho_soil=self.rho_soil, 
                                                  maxiter=self.maxiter, nrays_dir=1, nrays_dif=1, 
                                                  ntheta=self.ntheta, nphi=self.nphi)
 
+    def trace_series(self, triangles, tau, rho, direct_PAR, diffuse_PAR, theta_dir, phi_dir, cache_diffuse: bool = False, chunk_size: int = None, out=None):
+        """Trace a time series of light conditions on a scene sharing the same mesh and accelerated structure
+
+        Args:
+            triangles (np.ndarray): (N, 3, 3) triangle arrays
+            tau (np.ndarray): (N,) transmitance
+            rho (np.ndarray): (N,) reflectance
+            direct_PAR (np.ndarray): (n_steps,) Direct PAR in µmol.m-2.s-1, see 'sun_position.vpl_angles_series' for matching angles
+            diffuse_PAR (np.ndarray): (n_steps,) Diffuse PAR in µmol.m-2.s-1
+            theta_dir (np.ndarray): (n_steps,) Zenith angles in radian
+            phi_dir (np.ndarray): (n_steps,) Azimuth angles in radian
+            cache_diffuse (bool, optional): Rescale a unit diffuse response instead of tracing the sky at each step. Defaults to False.
+            chunk_size (int, optional): Number of steps traced per Julia call, bounds the Julia side memory. Defaults to None, all steps at once.
+            out (tuple, optional): (PARa, Erel) pair of (n_steps, N) arrays to fill, for example numpy memmaps. Defaults to None.
+
+        Returns:
+            np.ndarray: PARa, (n_steps, N) absorbed PAR in µmol.m-2.s-1
+            np.ndarray: Erel, (n_steps, N) relative absorption (adim)
+            np.ndarray: areas, triangle areas (soil triangles last when generated)
+        """
+        scene = self.build_scene(triangles, tau, rho, cache_diffuse=cache_diffuse)
+        return scene.trace_series(direct_PAR, diffuse_PAR, theta_dir, phi_dir, chunk_size=chunk_size, out=out)
+
+    def trace_adaptive(self, triangles, tau, rho, direct_PAR: float, diffuse_PAR: float, theta_dir: float=1.4486, phi_dir: float=3.1416, **kwargs):
+        """Trace with an adaptive ray budget and per-triangle or per-organ error estimates, see 'pyRTVPLScene.trace_adaptive'"""
+        scene = self.build_scene(triangles, tau, rho)
+        return scene.trace_adaptive(direct_PAR, diffuse_PAR, theta_dir, phi_dir, **kwargs)
+
+    def periodisation(self, canopy_height, theta_dir: float = None, phi_dir: float = None, diffuse: bool = True):
+        """Number of scene replications along x and y needed for incoming rays to cross the canopy within the replicated grid
+
+        In "sky" mode, or when diffuse light is traced, replications cover the lowest sky elevation ('minimal_zenith') in every
+        direction. In "light" mode, a direct-only trace is only replicated along the sun azimuth and as far as its elevation
+        requires, never further than the lowest sky elevation. The traversal cost grows with the replication count, so
+        high suns on small plots are traced much faster.
+
+        "light" mode is biased when reflections are traced (maxiter > 0) : light scattered by the leaves leaves in every
+        direction, and what would reach the canopy through replications missing across the sun azimuth is lost. The
+        absorbed power, mostly that of the lower leaves, is underestimated all the more that the optics are
+        transmitting or reflecting and the canopy is dense. See benchmarks/periodisation.py for the Erel error against
+        the "sky" replications.
+
+        Args:
+            canopy_height (float): vertical extent crossed by the light, see 'canopy_depth'
+            theta_dir (float, optional): Sun zenith angle in radian. Defaults to None, the sky lowest elevation.
+            phi_dir (float, optional): Sun azimuth angle in radian. Defaults to None.
+            diffuse (bool, optional): The sky dome is traced too. Defaults to True.
+
+        Returns:
+            tuple: (nx, ny) replications
+        """
+        if not self.periodize:
+            return 0, 0
+        if self.periodisation_mode == "sky" or diffuse or theta_dir is None:
+            return (self.n_replications(canopy_height, self.minimal_zenith, self.scene_xrange),
+                    self.n_replications(canopy_height, self.minimal_zenith, self.scene_yrange))
+        sun_elevation = max(np.pi / 2 - theta_dir, self.minimal_zenith)
+        projected_length = canopy_height / np.tan(sun_elevation)
+        # tolerance so that a sun exactly along one axis does not replicate along the other
+        return (int(np.ceil(projected_length * abs(np.cos(phi_dir)) / self.scene_xrange - 1e-9)),
+                int(np.ceil(projected_length * abs(np.sin(phi_dir)) / self.scene_yrange - 1e-9)))
+
+    def canopy_depth(self, triangles):
+        """Vertical extent crossed by the light : canopy top to the ground (z = 0), or to the canopy bottom when it lies below.
+
+        The ground is the reference without soil too, measuring from the canopy bottom underestimated the replications
+        needed by canopies lifted above it.
+        """
+        z = triangles[:, :, 2]
+        return z.max() - min(z.min(), 0.)
+
     def n_replications(self, canopy_height, lower_plane_zenith, scene_range):
         projected_length = canopy_height / np.tan(lower_plane_zenith)
-        return int(np.ceil(projected_length / scene_range))
\ No newline at end of file
+        return int(np.ceil(projected_length / scene_range))
+
+
+class pyRTVPLScene:
+    """Triangle scene built once on the Julia side and traced repeatedly.
+
+    The vertices, the per-triangle materials and the accelerated structure (BVH and periodisation) are kept alive
+    between calls, each trace only resets the materials' absorbed power and regenerates the light sources. Scenes
+    trace a single band, multi-band optics are only supported by 'pyRTVPL.__call__'.
+
+    Geometry can be edited with 'append', 'remove' and 'set_vertices'. Triangles are addressed by stable ids
+    (0 to N-1 at construction, new ids for appended triangles) while results follow the current storage order
+    given by 'triangle_ids', removed slots being filled by the last triangles. Updates only edit the changed
+    vertices and materials, the accelerated structure is rebuilt once at the next trace whatever the number of
+    updates in between, which also drops the cached diffuse response. That rebuild is a full one, the BVH is not
+    refitted : its cost scales with the whole scene, not with the number of changed triangles, so that updates are
+    best batched between traces. Updates only save the transfer of the unchanged triangles, see
+    benchmarks/scene_updates.py.
+
+    With cache_diffuse, the diffuse dome is traced once with a unit intensity and the per-triangle response is
+    rescaled by diffuse_PAR in later calls, so that only direct light is traced again. The Monte Carlo noise of the
+    diffuse part is then frozen for the scene lifetime. The cached response is traced again if the dome
+    discretisation (ntheta, nphi) or nrays_dif of the tracer change.
+
+    With an acceleration_cache folder, the built structure is saved under a hash of the geometry, optics, build
+    options and Julia environment ('geometry_key'), and loaded by later scenes built from the same inputs, for example
+    reference scenes traced again in every run.
+    """
+
+    def __init__(self, tracer: pyRTVPL, triangles, tau, rho, cache_diffuse: bool = False, acceleration_cache: str = None,
+                 accelerate: bool = True):
+        check_scene_optics(tau, rho)
+        self.tracer = tracer
+        self.cache_diffuse = cache_diffuse
+        self.triangle_ids = np.arange(triangles.shape[0])
+        self._positions = np.arange(triangles.shape[0]) # position of each id in storage order, -1 once removed
+        self.canopy_height = triangles[:, :, 2].max()
+
+        periodise_numberx, periodise_numbery = tracer.periodisation(self.canopy_height)
+        build = dict(nx=periodise_numberx, ny=periodise_numbery, dx=tracer.scene_xrange, dy=tracer.scene_yrange, generate_soil=tracer.generate_soil, tau_soil=tracer.tau_soil, rho_soil=tracer.rho_soil,
+                     maxiter=tracer.maxiter, parallel=tracer.parallel, low_memory=tracer.low_memory, **tracer.acceleration_settings())
+        self.cache_file = None
+        if acceleration_cache is not None:
+            os.makedirs(acceleration_cache, exist_ok=True)
+            self.cache_file = os.path.join(acceleration_cache, geometry_key(triangles, tau, rho, build) + ".jls")
+        self.handle = tracer.julia_call("build_scene", vertex_buffer(triangles), optical_buffer(tau), optical_buffer(rho),
+                                             cache_file=self.cache_file, accelerate=accelerate, **build)
+
+    @classmethod
+    def from_chunks(cls, tracer: pyRTVPL, chunks, cache_diffuse: bool = False):
+        """Build a scene from successive blocks of triangles, so that the whole triangle array never exists in Python
+
+        Each block is copied into the Julia vertices and released before the next one is read, the accelerated
+        structure being built once after the last block. Blocks can come from a generator or from a memory mapped
+        'TriangleScene', see 'TriangleScene.chunks'. With the tracer's low_memory mode, vertices are kept as float32.
+
+        Args:
+            tracer (pyRTVPL): tracer whose settings are used
+            chunks (iterable): (triangles, tau, rho) blocks of (n, 3, 3), (n,) and (n,) arrays
+            cache_diffuse (bool, optional): see 'pyRTVPL.build_scene'. Defaults to False.
+
+        Returns:
+            pyRTVPLScene: scene whose triangle ids follow the order of the blocks
+        """
+        chunks = iter(chunks)
+        triangles, tau, rho = next(chunks)
+        scene = cls(tracer, triangles, tau, rho, cache_diffuse=cache_diffuse, accelerate=False)
+        for triangles, tau, rho in chunks:
+            scene.append(triangles, tau, rho)
+        del triangles, tau, rho
+        scene._refresh()
+        return scene
+
+    @property
+    def n_triangles(self):
+        return self.triangle_ids.shape[0]
+
+    @property
+    def areas(self):
+        with julia_lock:
+            return np.array(self.handle.areas)
+
+    def append(self, triangles, tau, rho):
+        """Append new triangles to the scene, the whole scene being rebuilt at the next trace
+
+        Args:
+            triangles (np.ndarray): (n, 3, 3) triangle arrays
+            tau (np.ndarray): (n,) transmitance
+            rho (np.ndarray): (n,) reflectance
+
+        Returns:
+            np.ndarray: (n,) ids given to the new triangles
+        """
+        check_scene_optics(tau, rho)
+        new_ids = np.arange(self._positions.shape[0], self._positions.shape[0] + triangles.shape[0])
+        self.tracer.julia_call("append_triangles_b", self.handle, vertex_buffer(triangles), optical_buffer(tau), optical_buffer(rho))
+        self._positions = np.concatenate((self._positions, self.n_triangles + np.arange(triangles.shape[0])))
+        self.triangle_ids = np.concatenate((self.triangle_ids, new_ids))
+        self.canopy_height = max(self.canopy_height, triangles[:, :, 2].max())
+        return new_ids
+
+    def remove(self, ids):
+        """Remove triangles by id, the last triangles are moved into the freed slots. The whole scene is rebuilt at the next trace"""
+        ids = np.atleast_1d(ids)
+        if (self._positions[ids] < 0).any():
+            raise KeyError("Some triangle ids were already removed")
+        positions = np.sort(self._positions[ids])[::-1]
+        self.tracer.julia_call("remove_triangles_b", self.handle, np.ascontiguousarray(positions))
+        n = self.n_triangles
+        for p in positions:
+            n -= 1
+            self._positions[self.triangle_ids[p]] = -1
+            if p != n:
+                moved_id = self.triangle_ids[n]
+                self.triangle_ids[p] = moved_id
+                self._positions[moved_id] = p
+        self.triangle_ids = self.triangle_ids[:n]
+
+    def set_vertices(self, ids, triangles):
+        """Overwrite the vertex coordinates of existing triangles, for example elongating organs
+
+        The accelerated structure is not refitted to the moved triangles, the whole scene is rebuilt at the next trace.
+        """
+        ids = np.atleast_1d(ids)
+        positions = self._positions[ids]
+        if (positions < 0).any():
+            raise KeyError("Some triangle ids were removed")
+        self.tracer.julia_call("set_vertices_b", self.handle, np.ascontiguousarray(positions), vertex_buffer(triangles))
+        self.canopy_height = max(self.canopy_height, triangles[:, :, 2].max())
+
+    def _refresh(self):
+        # Canopy height only grows, removing triangles keeps the previous periodisation
+        periodise_numberx, periodise_numbery = self.tracer.periodisation(self.canopy_height)
+        self.tracer.julia_call("refresh_scene_b", self.handle, nx=periodise_numberx, ny=periodise_numbery)
+
+    def trace(self, direct_PAR: float, diffuse_PAR: float, theta_dir: float=1.4486, phi_dir: float=3.1416, out=None, parallel: bool = None):
+        """Trace the persistent scene for a given light condition
+
+        Args:
+            direct_PAR (float): Direct PAR in µmol.m-2.s-1
+            diffuse_PAR (float): Diffuse PAR in µmol.m-2.s-1
+            theta_dir (float, optional): Zenith angle in radian. Defaults to 1.4486.
+            phi_dir (float, optional): Azimuth angle (0, 2pi). Defaults to 3.1416.
+            out (tuple, optional): (PARa, Erel) (N,) float64 buffers written in place. Defaults to None.
+            parallel (bool, optional): Multithreaded tracing for this call. Defaults to None, the tracer's setting.
+
+        Returns:
+            np.ndarray: PARa, absorbed PAR in µmol.m-2.s-1
+            np.ndarray: Erel, relative absorption (adim)
+            np.ndarray: areas, triangle areas (soil triangles last when generated)
+        """
+        self._refresh()
+        tracer = self.tracer
+        PARa, Erel = out if out is not None else (np.empty(self.n_triangles), np.empty(self.n_triangles))
+        tracer.julia_call("trace_scene_b", PARa, Erel, self.handle, direct_PAR, diffuse_PAR, theta_dir, phi_dir,
+                                 nrays_dir=tracer.nrays_dir if direct_PAR > 0 else 0, nrays_dif=tracer.nrays_dif if diffuse_PAR > 0 else 0,
+                                 ntheta=tracer.ntheta, nphi=tracer.nphi, cache_diffuse=self.cache_diffuse, parallel=parallel)
+        return PARa, Erel, self.areas
+
+    def trace_adaptive(self, direct_PAR: float, diffuse_PAR: float, theta_dir: float=1.4486, phi_dir: float=3.1416,
+                       tolerance: float = 0.05, quantile: float = 0.95, batch_fraction: float = 0.1, max_rays: int = None, max_time: float = None, organ_ids=None):
+        """Trace in successive batches until the Monte Carlo error of the absorbed power is small enough
+
+        Each batch uses batch_fraction of the tracer's nrays_dir / nrays_dif. The relative standard error of the mean
+        absorbed power is estimated from the spread between batches, per triangle or per organ, and tracing stops when
+        its quantile over the lit elements falls below tolerance, or when the ray or time budget is spent.
+
+        Args:
+            direct_PAR (float): Direct PAR in µmol.m-2.s-1
+            diffuse_PAR (float): Diffuse PAR in µmol.m-2.s-1
+            theta_dir (float, optional): Zenith angle in radian. Defaults to 1.4486.
+            phi_dir (float, optional): Azimuth angle (0, 2pi). Defaults to 3.1416.
+            tolerance (float, optional): Target relative standard error. Defaults to 0.05.
+            quantile (float, optional): Share of the lit elements that must reach the tolerance. Defaults to 0.95.
+            batch_fraction (float, optional): Rays per batch as a fraction of nrays_dir and nrays_dif. Defaults to 0.1.
+            max_rays (int, optional): Ray budget. Defaults to None, twice the tracer's nrays_dir + nrays_dif.
+            max_time (float, optional): Time budget in s. Defaults to None, no limit.
+            organ_ids (np.ndarray, optional): (N,) organ id of each triangle, in 'triangle_ids' order, to estimate errors per organ. Defaults to None.
+
+        Returns:
+            dict: 'PARa', 'Erel' and 'rel_se' (relative standard error, NaN for unlit elements) per triangle or per organ
+            ('organ_id' then gives the sorted organ ids), along with 'n_batches', 'n_rays', 'criterion' the reached
+            error quantile and 'elapsed' in s
+        """
+        self._refresh()
+        tracer = self.tracer
+        nrays_dir = max(1, int(tracer.nrays_dir * batch_fraction)) if direct_PAR > 0 else 0
+        nrays_dif = max(1, int(tracer.nrays_dif * batch_fraction)) if diffuse_PAR > 0 else 0
+        if max_rays is None:
+            max_rays = 2 * ((tracer.nrays_dir if direct_PAR > 0 else 0) + (tracer.nrays_dif if diffuse_PAR > 0 else 0))
+
+        result = {}
+        organ_index = None
+        n_units = self.n_triangles
+        if organ_ids is not None:
+            result["organ_id"], organ_index = np.unique(organ_ids, return_inverse=True)
+            organ_index = organ_index.reshape(-1).astype(np.int32)
+            n_units = result["organ_id"].shape[0]
+        result.update(PARa=np.empty(n_units), Erel=np.empty(n_units), rel_se=np.full(n_units, np.nan))
+
+        stats = tracer.julia_call("trace_scene_adaptive_b", result["PARa"], result["Erel"], result["rel_se"], self.handle, direct_PAR, diffuse_PAR, theta_dir, phi_dir,
+                                                  nrays_dir=nrays_dir, nrays_dif=nrays_dif, ntheta=tracer.ntheta, nphi=tracer.nphi,
+                                                  tolerance=tolerance, quantile=quantile, max_rays=max_rays, max_time=np.inf if max_time is None else max_time,
+                                                  organ_index=organ_index,
+                                                  convert=lambda stats: dict(n_batches=int(stats.nbatches), n_rays=int(stats.nrays),
+                                                                             criterion=float(stats.criterion), elapsed=float(stats.elapsed)))
+        result.update(stats)
+        return result
+
+    def build_direct_table(self, n_theta: int = 10, n_phi: int = 24, theta_max: float = np.deg2rad(85.)):
+        """Precompute the direct light response of the scene over a sun direction grid, see 'DirectResponseTable'"""
+        from openalea.pyRTVPL.direct_table import DirectResponseTable
+        self._refresh()
+        return DirectResponseTable.build(self, n_theta=n_theta, n_phi=n_phi, theta_max=theta_max)
+
+    def iter_series(self, direct_PAR, diffuse_PAR, theta_dir, phi_dir, chunk_size: int = 24):
+        """Trace a time series of light conditions chunk by chunk, one Julia call per chunk
+
+        Args:
+            direct_PAR (np.ndarray): (n_steps,) Direct PAR in µmol.m-2.s-1
+            diffuse_PAR (np.ndarray): (n_steps,) Diffuse PAR in µmol.m-2.s-1
+            theta_dir (np.ndarray): (n_steps,) Zenith angles in radian
+            phi_dir (np.ndarray): (n_steps,) Azimuth angles in radian
+            chunk_size (int, optional): Number of steps per chunk. Defaults to 24.
+
+        Yields:
+            slice: steps covered by the chunk
+            np.ndarray: PARa, (chunk, N) absorbed PAR in µmol.m-2.s-1
+            np.ndarray: Erel, (chunk, N) relative absorption (adim)
+        """
+        self._refresh()
+        tracer = self.tracer
+        direct_PAR, diffuse_PAR, theta_dir, phi_dir = (np.ascontiguousarray(a, dtype=np.float64)
+                                                       for a in np.broadcast_arrays(*map(np.atleast_1d, (direct_PAR, diffuse_PAR, theta_dir, phi_dir))))
+        n_steps = direct_PAR.shape[0]
+        for start in range(0, n_steps, chunk_size):
+            steps = slice(start, min(start + chunk_size, n_steps))
+            # Julia matrices are (N, chunk) column major, their transpose is a C ordered (chunk, N) view, copied before
+            # the lock is released
+            PARa, Erel = tracer.julia_call("trace_scene_series_b", self.handle, direct_PAR[steps], diffuse_PAR[steps], theta_dir[steps], phi_dir[steps],
+                                           nrays_dir=tracer.nrays_dir, nrays_dif=tracer.nrays_dif,
+                                           ntheta=tracer.ntheta, nphi=tracer.nphi, cache_diffuse=self.cache_diffuse,
+                                           convert=lambda out: (np.array(out.PARa).T, np.array(out.Erel).T))
+            yield steps, PARa, Erel
+
+    def trace_series(self, direct_PAR, diffuse_PAR, theta_dir, phi_dir, chunk_size: int = None, out=None):
+        """Trace a time series of light conditions, see 'pyRTVPL.trace_series'"""
+        # scalar inputs are a single step
+        n_steps = np.broadcast(*map(np.atleast_1d, (direct_PAR, diffuse_PAR, theta_dir, phi_dir))).shape[0]
+        if out is None:
+            out = (np.zeros((n_steps, self.n_triangles)), np.zeros((n_steps, self.n_triangles)))
+        PARa, Erel = out
+        for steps, PARa_chunk, Erel_chunk in self.iter_series(direct_PAR, diffuse_PAR, theta_dir, phi_dir, chunk_size=chunk_size or max(1, n_steps)):
+            PARa[steps] = PARa_chunk
+            Erel[steps] = Erel_chunk
+        return PARa, Erel, np.array(self.areas)
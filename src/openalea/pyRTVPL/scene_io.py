@@ -0,0 +1,110 @@
+import os
+import numpy as np
+
+
+class TriangleScene:
+    """Triangles of a scene as contiguous arrays ready to be traced, with the organ id and optics of each triangle.
+
+    Scenes are converted shape by shape with numpy rather than triangle by triangle, and can be saved as a folder of
+    plain .npy files that are memory mapped when loaded, so that big scenes open without being read.
+
+        scene = TriangleScene.from_plantgl("scene.bgeom")
+        PARa, Erel, areas = rt(scene.triangles, scene.tau, scene.rho, direct_PAR=0., diffuse_PAR=600.)
+    """
+
+    arrays = ("triangles", "organ_ids", "tau", "rho")
+
+    def __init__(self, triangles, organ_ids, tau, rho):
+        """
+        Args:
+            triangles (np.ndarray): (N, 3, 3) float64 triangles
+            organ_ids (np.ndarray): (N,) integer id of the shape / organ of each triangle
+            tau (np.ndarray): (N,) transmitance
+            rho (np.ndarray): (N,) reflectance
+        """
+        self.triangles = triangles
+        self.organ_ids = organ_ids
+        self.tau = tau
+        self.rho = rho
+
+    @property
+    def n_triangles(self):
+        return self.triangles.shape[0]
+
+    @classmethod
+    def from_arrays(cls, shapes, tau: float = 0.05, rho: float = 0.1, optics: dict = None):
+        """Concatenate per-shape triangle arrays
+
+        Args:
+            shapes (dict): {organ id: (n, 3, 3) triangles or nested lists of vertices}
+            tau (float, optional): Transmitance of shapes missing from optics. Defaults to 0.05, Caribu default.
+            rho (float, optional): Reflectance of shapes missing from optics. Defaults to 0.1, Caribu default.
+            optics (dict, optional): {organ id: (reflectance, transmitance)}, ordered as Caribu's opt['par'] values,
+                a single reflectance, alone or in a tuple, meaning an opaque shape. Defaults to None.
+
+        Returns:
+            TriangleScene: the scene arrays
+        """
+        optics = optics or {}
+        ids, blocks = [], []
+        for organ_id, triangles in shapes.items():
+            triangles = np.asarray(triangles, dtype=np.float64).reshape(-1, 3, 3)
+            if triangles.shape[0] > 0:
+                ids.append(organ_id)
+                blocks.append(triangles)
+        counts = np.array([block.shape[0] for block in blocks], dtype=np.intp)
+        shape_tau, shape_rho = np.zeros(len(ids)), np.zeros(len(ids))
+        for k, organ_id in enumerate(ids):
+            values = np.atleast_1d(optics.get(organ_id, (rho, tau)))
+            shape_rho[k], shape_tau[k] = values[0], values[1] if len(values) > 1 else 0.
+        triangles = np.concatenate(blocks) if blocks else np.empty((0, 3, 3))
+        return cls(triangles, np.repeat(np.array(ids), counts), np.repeat(shape_tau, counts), np.repeat(shape_rho, counts))
+
+    @classmethod
+    def from_cscene(cls, cscene: dict, tau: float = 0.05, rho: float = 0.1, optics: dict = None):
+        """Convert a Caribu scene, {shape id: list of triangles given as 3 (x, y, z) tuples}, see 'from_arrays'"""
+        return cls.from_arrays(cscene, tau=tau, rho=rho, optics=optics)
+
+    @classmethod
+    def from_plantgl(cls, scene, tau: float = 0.05, rho: float = 0.1, optics: dict = None):
+        """Tesselate a PlantGL scene, or a file it can be read from, shapes being identified by their id, see 'from_arrays'"""
+        from openalea.plantgl.all import Scene, Tesselator
+        if isinstance(scene, (str, os.PathLike)):
+            scene = Scene(str(scene))
+        tesselator = Tesselator()
+        shapes = {}
+        for shape in scene:
+            shape.apply(tesselator)
+            mesh = tesselator.result
+            points = np.array(mesh.pointList, dtype=np.float64).reshape(-1, 3)
+            indices = np.array(mesh.indexList, dtype=np.intp).reshape(-1, 3)
+            triangles = points[indices]
+            shapes[shape.id] = np.concatenate((shapes[shape.id], triangles)) if shape.id in shapes else triangles
+        return cls.from_arrays(shapes, tau=tau, rho=rho, optics=optics)
+
+    def save(self, path: str, vertex_dtype=None):
+        """Save the scene in a folder of .npy files, one per array, that 'load' memory maps
+
+        Args:
+            path (str): folder
+            vertex_dtype (optional): dtype the triangles are stored with, np.float32 halving the file and the memory
+                of the chunks read from it. Defaults to None, the current dtype.
+        """
+        os.makedirs(path, exist_ok=True)
+        for name in self.arrays:
+            array = getattr(self, name)
+            if name == "triangles" and vertex_dtype is not None:
+                array = array.astype(vertex_dtype, copy=False)
+            np.save(os.path.join(path, f"{name}.npy"), np.ascontiguousarray(array))
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True):
+        """Load a scene saved with 'save', memory mapped read only by default so that opening does not read the triangles"""
+        return cls(*(np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r" if mmap else None) for name in cls.arrays))
+
+    def chunks(self, chunk_size: int = 1_000_000):
+        """Iterate over (triangles, tau, rho) blocks of at most chunk_size triangles, read one at a time from memory mapped
+        scenes, for example to build a scene with 'pyRTVPLScene.from_chunks'"""
+        for start in range(0, self.n_triangles, chunk_size):
+            block = slice(start, start + chunk_size)
+            yield np.ascontiguousarray(self.triangles[block]), np.asarray(self.tau[block]), np.asarray(self.rho[block])
@@ -0,0 +1,325 @@
+"""Local tracing daemon keeping warmed Julia runtimes resident between short lived client processes.
+
+    python -m openalea.pyRTVPL.server --workers 2 --scene-xrange 0.56 --scene-yrange 0.56
+
+    from openalea.pyRTVPL.server import TraceClient
+    rt = TraceClient()                      # drop-in for a pyRTVPL tracer
+    PARa, Erel, areas = rt(triangles, tau, rho, direct_PAR=400., diffuse_PAR=200.)
+
+The server listens on a Unix domain socket, or on a localhost TCP port where Unix sockets are not available. Each
+request hands its arrays through shared memory and is traced by a pool of worker processes started and warmed once,
+see 'pool.map_scenes'.
+
+Requests are pickled, so that any process allowed to connect could run code in the server. Clients must therefore
+present a key, by default a random per-user key the server writes in a private folder, see 'runtime_dir', and the
+clients read from there. The socket is only readable and writable by its owner.
+"""
+import argparse
+import asyncio
+import getpass
+import os
+import stat
+import sys
+import tempfile
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import connection, get_context
+
+import numpy as np
+
+from openalea.pyRTVPL.julia_runtime import available_cpus
+from openalea.pyRTVPL.pool import _init_worker, _trace_shared, share, shared_keys
+
+
+def runtime_dir():
+    """Per-user folder holding the server socket and key, created if needed and only accessible by its owner"""
+    if sys.platform == "win32":
+        path = os.path.join(os.path.expanduser("~"), ".pyrtvpl")
+    else:
+        path = os.path.join(tempfile.gettempdir(), f"pyrtvpl-{getpass.getuser()}")
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    if sys.platform != "win32":
+        # the folder name is predictable, it could have been created beforehand by another user
+        info = os.stat(path)
+        if info.st_uid != os.getuid() or stat.S_IMODE(info.st_mode) & 0o077:
+            raise PermissionError(f"{path} must be owned by the current user and closed to others")
+    return path
+
+
+def default_address():
+    """Unix socket in the per-user 'runtime_dir', or a localhost port on Windows"""
+    if sys.platform == "win32":
+        return ("127.0.0.1", 47813)
+    return os.path.join(runtime_dir(), "server.sock")
+
+
+def default_authkey(create: bool = False) -> bytes:
+    """Per-user key shared by the server and its clients, stored in 'runtime_dir' in a file only readable by its owner
+
+    Args:
+        create (bool, optional): Generate a random key if none exists yet. Defaults to False.
+    """
+    path = os.path.join(runtime_dir(), "authkey")
+    if create and not os.path.exists(path):
+        try:
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        except FileExistsError:
+            pass # written meanwhile by another server
+        else:
+            with os.fdopen(fd, "wb") as file:
+                file.write(os.urandom(32))
+    try:
+        with open(path, "rb") as file:
+            return file.read()
+    except FileNotFoundError:
+        raise FileNotFoundError(f"No server key in {path}, start a server or give its authkey") from None
+
+
+def _worker_ready():
+    return os.getpid()
+
+
+class TraceServer:
+    """Serve 'pyRTVPL.__call__' requests from any local process with a pool of warmed worker processes
+
+    Every connection is handled by its own thread and waits for a worker, the number of workers bounding the number
+    of traces running at once. A crashed worker breaks the pool, which is started again for the next requests.
+    """
+
+    def __init__(self, address=None, workers: int = 1, threads_per_worker: int = None, init: dict = None, attributes: dict = None,
+                 authkey: bytes = None):
+        """
+        Args:
+            address (str or tuple, optional): Unix socket path or (host, port). Defaults to None, see 'default_address'.
+            workers (int, optional): Number of worker processes, each holding a Julia runtime. Defaults to 1.
+            threads_per_worker (int, optional): Julia threads of each worker. Defaults to None, an even share of the available CPUs.
+            init (dict, optional): 'pyRTVPL' constructor arguments, see 'pyRTVPL.options'. Defaults to None.
+            attributes (dict, optional): 'pyRTVPL' attributes to override, such as nrays_dir. Defaults to None.
+            authkey (bytes, optional): Key clients must present. Defaults to None, see 'default_authkey'.
+        """
+        self.address = address or default_address()
+        if authkey is None:
+            authkey = default_authkey(create=True)
+        if not authkey and not isinstance(self.address, str):
+            raise ValueError("A TCP address can be reached by other users, it requires an authkey")
+        self.workers = workers
+        self.options = dict(init=init or {}, attributes=attributes or {})
+        self._initargs = (threads_per_worker or max(1, available_cpus() // workers), self.options["init"], self.options["attributes"])
+        self._authkey = authkey
+        self._lock = threading.Lock()
+        self._executor = None
+        self._listener = None
+        self._closed = threading.Event()
+
+    def start(self):
+        """Start and warm the workers, then listen on the address"""
+        self._restart()
+        # one task per worker so that all of them are spawned and warmed before the first request
+        for future in [self._executor.submit(_worker_ready) for _ in range(self.workers)]:
+            future.result()
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            os.unlink(self.address) # socket left by a server that did not shut down
+        self._listener = connection.Listener(self.address, authkey=self._authkey)
+        if isinstance(self.address, str):
+            os.chmod(self.address, 0o600)
+        return self
+
+    def _restart(self, broken=None):
+        with self._lock:
+            if self._executor is not None and self._executor is not broken:
+                return self._executor # already replaced by another connection thread
+            if broken is not None:
+                broken.shutdown(wait=False)
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=get_context("spawn"),
+                                                 initializer=_init_worker, initargs=self._initargs)
+            return self._executor
+
+    def serve_forever(self):
+        """Accept connections until 'close' is called or a client sends a shutdown request"""
+        if self._listener is None:
+            self.start()
+        try:
+            while not self._closed.is_set():
+                try:
+                    conn = self._listener.accept()
+                except (OSError, EOFError, connection.AuthenticationError):
+                    continue
+                threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+        finally:
+            self.close()
+
+    def _serve(self, conn):
+        with conn:
+            while True:
+                try:
+                    request = conn.recv()
+                except (EOFError, OSError):
+                    return
+                op = request.get("op")
+                if op == "trace":
+                    self._reply(conn, self._trace(request["descriptors"], request["arguments"]))
+                elif op == "options":
+                    self._reply(conn, ("ok", self.options))
+                elif op == "ping":
+                    self._reply(conn, ("ok", os.getpid()))
+                elif op == "shutdown":
+                    self._reply(conn, ("ok", None))
+                    self._shutdown()
+                    return
+                else:
+                    self._reply(conn, ("error", ValueError(f"Unknown request {op!r}")))
+
+    @staticmethod
+    def _reply(conn, message):
+        conn.send(message)
+
+    def _trace(self, descriptors, arguments):
+        executor = self._executor
+        try:
+            return "ok", executor.submit(_trace_shared, descriptors, arguments).result()
+        except BrokenProcessPool as error:
+            self._restart(broken=executor)
+            return "error", error
+        except Exception as error:
+            return "error", error
+
+    def _shutdown(self):
+        self._closed.set()
+        # unblock 'accept' in the serving thread
+        try:
+            connection.Client(self.address, authkey=self._authkey).close()
+        except OSError:
+            pass
+
+    def close(self):
+        self._closed.set()
+        if self._listener is not None:
+            self._listener.close()
+            self._listener = None
+            if isinstance(self.address, str) and os.path.exists(self.address):
+                os.unlink(self.address)
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+class TraceClient:
+    """Drop-in replacement of a 'pyRTVPL' tracer sending its traces to a 'TraceServer'
+
+    Calls take the arguments of 'pyRTVPL.__call__' and return the same results. Input arrays are copied into shared
+    memory released once the result is received. 'submit' queues calls, at most max_concurrency of them being sent
+    to the server at once, the others waiting in the client.
+    """
+
+    def __init__(self, address=None, max_concurrency: int = 1, authkey: bytes = None):
+        """
+        Args:
+            address (str or tuple, optional): Address the server listens on. Defaults to None, see 'default_address'.
+            max_concurrency (int, optional): Requests sent to the server at once by this client. Defaults to 1.
+            authkey (bytes, optional): Key of the server. Defaults to None, see 'default_authkey'.
+        """
+        self.address = address or default_address()
+        self.max_concurrency = max_concurrency
+        self._authkey = default_authkey() if authkey is None else authkey
+        self._executor = None
+        self._local = threading.local() # one connection per thread
+        self._connections = []
+
+    def _request(self, request):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = connection.Client(self.address, authkey=self._authkey)
+            self._connections.append(conn)
+        try:
+            conn.send(request)
+            status, value = conn.recv()
+        except (EOFError, OSError):
+            self._local.conn = None
+            raise
+        if status == "error":
+            raise value
+        return value
+
+    def __call__(self, triangles, tau, rho, direct_PAR, diffuse_PAR, theta_dir: float = 1.4486, phi_dir: float = 3.1416, **kwargs):
+        """Trace on the server, see 'pyRTVPL.__call__'"""
+        scene = dict(triangles=triangles, tau=tau, rho=rho, direct_PAR=direct_PAR, diffuse_PAR=diffuse_PAR,
+                     theta_dir=theta_dir, phi_dir=phi_dir, **kwargs)
+        # caller buffers cannot cross processes, results are copied into them
+        out = scene.pop("out", None)
+        blocks, descriptors, arguments = [], {}, {}
+        try:
+            for key, value in scene.items():
+                if key in shared_keys and value is not None:
+                    block, descriptors[key] = share(value)
+                    blocks.append(block)
+                else:
+                    arguments[key] = value
+            result = self._request(dict(op="trace", descriptors=descriptors, arguments=arguments))
+        finally:
+            for block in blocks:
+                block.close()
+                block.unlink()
+        if out is not None and isinstance(result, tuple):
+            for buffer, value in zip(out, result):
+                np.copyto(buffer, value)
+            return out
+        return result
+
+    def submit(self, *args, **kwargs) -> Future:
+        """Queue a trace without blocking the calling thread, see 'pyRTVPL.submit'"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="pyRTVPL-client")
+        return self._executor.submit(self, *args, **kwargs)
+
+    async def trace_async(self, *args, **kwargs):
+        """Awaitable variant of 'submit' for asyncio event loops"""
+        return await asyncio.wrap_future(self.submit(*args, **kwargs))
+
+    def options(self):
+        """Constructor arguments and attributes of the server tracers, see 'pyRTVPL.options'"""
+        return self._request(dict(op="options"))
+
+    def ping(self):
+        """Process id of the server, raises if it cannot be reached"""
+        return self._request(dict(op="ping"))
+
+    def shutdown_server(self):
+        """Ask the server to stop once the running requests are answered"""
+        self._request(dict(op="shutdown"))
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        for conn in self._connections:
+            conn.close()
+        self._connections.clear()
+        self._local = threading.local()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve pyRTVPL traces to local processes")
+    parser.add_argument("--address", default=None, help="Unix socket path or host:port, defaults to a per-user socket")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--threads-per-worker", type=int, default=None)
+    parser.add_argument("--scene-xrange", type=float, default=1.)
+    parser.add_argument("--scene-yrange", type=float, default=1.)
+    parser.add_argument("--no-soil", action="store_true")
+    args = parser.parse_args()
+
+    address = args.address
+    if address is not None and ":" in address and os.path.sep not in address:
+        host, port = address.rsplit(":", 1)
+        address = (host, int(port))
+    server = TraceServer(address, workers=args.workers, threads_per_worker=args.threads_per_worker,
+                         init=dict(scene_xrange=args.scene_xrange, scene_yrange=args.scene_yrange, generate_soil=not args.no_soil))
+    server.start()
+    print(f"pyRTVPL server listening on {server.address}", flush=True)
+    server.serve_forever()
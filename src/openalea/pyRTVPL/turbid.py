@@ -0,0 +1,169 @@
+import numpy as np
+
+
+def triangle_geometry(triangles):
+    """Centroids, one-sided areas and unit normals of (N, 3, 3) triangles"""
+    cross = np.cross(triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0])
+    norm = np.linalg.norm(cross, axis=1)
+    normals = cross / np.where(norm > 0, norm, 1.)[:, None]
+    return triangles.mean(axis=1), 0.5 * norm, normals
+
+
+def subdivide(triangles, max_edge: float):
+    """Split triangles in 4 at their edge midpoints until no edge is longer than max_edge
+
+    Returns:
+        np.ndarray: (M, 3, 3) pieces
+        np.ndarray: (M,) index of the triangle each piece comes from
+    """
+    parent = np.arange(triangles.shape[0])
+    while True:
+        edges = np.linalg.norm(triangles - np.roll(triangles, 1, axis=1), axis=2).max(axis=1)
+        large = edges > max_edge
+        if not large.any():
+            return triangles, parent
+        a, b, c = (triangles[large, k] for k in range(3))
+        ab, bc, ca = (a + b) / 2, (b + c) / 2, (c + a) / 2
+        pieces = [np.stack(corners, axis=1) for corners in ((a, ab, ca), (ab, b, bc), (ca, bc, c), (ab, bc, ca))]
+        triangles = np.concatenate([triangles[~large]] + pieces)
+        parent = np.concatenate((parent[~large], np.tile(parent[large], 4)))
+
+
+def sky_sectors(ntheta: int, nphi: int):
+    """Sectors of equal solid angle of a standard overcast sky, as the StandardSky dome of the ray tracer
+
+    Returns:
+        np.ndarray: (ntheta * nphi,) zenith angles of the sector centres in radian
+        np.ndarray: (ntheta * nphi,) azimuth angles in radian
+        np.ndarray: (ntheta * nphi,) share of the horizontal diffuse irradiance coming from each sector, summing to 1
+    """
+    theta = np.arccos(1. - (np.arange(ntheta) + 0.5) / ntheta)
+    phi = (np.arange(nphi) + 0.5) * 2 * np.pi / nphi
+    theta, phi = (a.ravel() for a in np.meshgrid(theta, phi, indexing="ij"))
+    weights = (1. + 2. * np.cos(theta)) / 3. * np.cos(theta) # radiance times cosine, sectors having the same solid angle
+    return theta, phi, weights / weights.sum()
+
+
+def shift(flux, cells: float, axis: int, fill: float, periodic: bool):
+    """Move a horizontal flux map by a fractional number of cells, splitting each cell between its two destinations.
+    Periodic scenes wrap around, otherwise the cells entering the map receive the unattenuated flux"""
+    whole = int(np.floor(cells))
+    fraction = cells - whole
+    moved = []
+    for n in (whole, whole + 1):
+        rolled = np.roll(flux, n, axis=axis)
+        if not periodic and n != 0:
+            index = [slice(None)] * flux.ndim
+            size = flux.shape[axis]
+            index[axis] = slice(0, min(n, size)) if n > 0 else slice(max(n, -size), None)
+            rolled[tuple(index)] = fill
+        moved.append(rolled)
+    return (1. - fraction) * moved[0] + fraction * moved[1]
+
+
+class TurbidMedium:
+    """Canopy seen as a turbid medium : triangles are voxelised into leaf area density per cell and light is attenuated
+    with Beer-Lambert's law along each light direction, much faster and coarser than ray tracing.
+
+    The projection of leaves on each direction is computed from the actual triangle normals of each voxel, so that leaf
+    orientation is accounted for without assuming a leaf angle distribution. Scattering follows Goudriaan's
+    approximation, extinction being scaled by the square root of the leaf absorptance (1 - tau - rho). The power removed
+    from the beam in a voxel is shared among its triangles in proportion to their projected area. Light crossing the
+    (dx, dy) plot boundary re-enters from the opposite side when periodic, the soil absorbs whatever reaches it.
+
+    Triangles are binned in the voxel of their centroid. Those with an edge longer than a voxel are first split into
+    pieces that fit, so that their area is spread over every voxel they cross, and the power absorbed by the pieces is
+    summed back per triangle. Centroids outside the plot are wrapped into it when periodic, and binned in the nearest
+    border voxel otherwise.
+    """
+
+    def __init__(self, triangles, dx: float, dy: float, voxel_size: float = None, periodic: bool = True):
+        """
+        Args:
+            triangles (np.ndarray): (N, 3, 3) triangle arrays
+            dx (float): plot length along x, m
+            dy (float): plot length along y, m
+            voxel_size (float, optional): voxel edge in m. Defaults to None, a twentieth of the largest plot side.
+            periodic (bool, optional): the plot is repeated infinitely along x and y. Defaults to True.
+        """
+        voxel_size = voxel_size or max(dx, dy) / 20.
+        triangles = np.asarray(triangles, dtype=np.float64)
+        _, self.areas, _ = triangle_geometry(triangles)
+        self.nx, self.ny = max(1, int(round(dx / voxel_size))), max(1, int(round(dy / voxel_size)))
+        self.sx, self.sy = dx / self.nx, dy / self.ny
+        pieces, self.parent = subdivide(triangles, min(self.sx, self.sy, voxel_size))
+        centroids, self.piece_areas, self.normals = triangle_geometry(pieces)
+        top, bottom = centroids[:, 2].max(), centroids[:, 2].min()
+        self.nz = max(1, int(np.ceil((top - bottom) / voxel_size)))
+        self.sz = max(top - bottom, voxel_size) / self.nz
+        self.periodic = periodic
+
+        x, y = centroids[:, 0], centroids[:, 1]
+        if periodic:
+            x, y = np.mod(x, dx), np.mod(y, dy)
+        ix = np.clip(np.floor(x / self.sx), 0, self.nx - 1).astype(int)
+        iy = np.clip(np.floor(y / self.sy), 0, self.ny - 1).astype(int)
+        iz = np.clip(((top - centroids[:, 2]) / self.sz).astype(int), 0, self.nz - 1) # layer 0 at the top
+        self.voxel = np.ravel_multi_index((iz, ix, iy), (self.nz, self.nx, self.ny))
+
+    def effective_area(self, tau, rho):
+        """Areas of the triangle pieces scaled by the square root of their absorptance, Goudriaan's correction for scattering"""
+        absorptance = np.clip(1. - np.asarray(tau) - np.asarray(rho), 0., 1.)
+        return self.piece_areas * np.sqrt(np.broadcast_to(absorptance, self.areas.shape)[self.parent])
+
+    def absorbed(self, effective_area, flux: float, theta: float, phi: float):
+        """Absorbed power per triangle for one light direction
+
+        Args:
+            effective_area (np.ndarray): (N,) see 'effective_area'
+            flux (float): irradiance on a horizontal plane above the canopy, µmol.m-2.s-1
+            theta (float): zenith angle the light comes from, radian
+            phi (float): azimuth angle the light comes from, radian
+
+        Returns:
+            np.ndarray: (N,) absorbed power per triangle in µmol.s-1
+        """
+        propagation = -np.array((np.sin(theta) * np.cos(phi), np.sin(theta) * np.sin(phi), np.cos(theta)))
+        cos_zenith = max(np.cos(theta), 1e-3)
+        weights = effective_area * np.abs(self.normals @ propagation)
+        n_voxels = self.nz * self.nx * self.ny
+        projected = np.bincount(self.voxel, weights=weights, minlength=n_voxels)
+        optical_depth = (projected / (self.sx * self.sy * self.sz)).reshape(self.nz, self.nx, self.ny) * self.sz / cos_zenith
+        # horizontal move of the beam while crossing one layer, in cells
+        step = self.sz / cos_zenith
+        shift_x, shift_y = step * propagation[0] / self.sx, step * propagation[1] / self.sy
+
+        beam = np.full((self.nx, self.ny), float(flux))
+        removed = np.empty((self.nz, self.nx, self.ny))
+        for k in range(self.nz):
+            transmitted = beam * np.exp(-optical_depth[k])
+            removed[k] = (beam - transmitted) * self.sx * self.sy
+            beam = shift(shift(transmitted, shift_x, 0, flux, self.periodic), shift_y, 1, flux, self.periodic)
+
+        share = np.divide(removed.ravel(), projected, out=np.zeros(n_voxels), where=projected > 0)
+        return np.bincount(self.parent, weights=share[self.voxel] * weights, minlength=self.areas.shape[0])
+
+    def trace(self, tau, rho, direct_PAR: float, diffuse_PAR: float, theta_dir: float, phi_dir: float, ntheta: int = 8, nphi: int = 6):
+        """Absorbed power per triangle for direct light from (theta_dir, phi_dir) and a standard overcast diffuse sky
+
+        Args:
+            tau (np.ndarray): (N,) transmitance
+            rho (np.ndarray): (N,) reflectance
+            direct_PAR (float): direct irradiance on a horizontal plane, µmol.m-2.s-1
+            diffuse_PAR (float): diffuse irradiance on a horizontal plane, µmol.m-2.s-1
+            theta_dir (float): sun zenith angle, radian
+            phi_dir (float): sun azimuth angle, radian
+            ntheta (int, optional): sky zenith divisions. Defaults to 8.
+            nphi (int, optional): sky azimuth divisions. Defaults to 6.
+
+        Returns:
+            np.ndarray: (N,) absorbed power in µmol.s-1
+        """
+        effective_area = self.effective_area(tau, rho)
+        absorbed = np.zeros(self.areas.shape[0])
+        if direct_PAR > 0:
+            absorbed += self.absorbed(effective_area, direct_PAR, theta_dir, phi_dir)
+        if diffuse_PAR > 0:
+            for theta, phi, weight in zip(*sky_sectors(ntheta, nphi)):
+                absorbed += self.absorbed(effective_area, diffuse_PAR * weight, theta, phi)
+        return absorbed
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+
+# Right triangles of a unit plot : its lower left half at z = 1 and z = 0, its upper right half at z = 1
+upper = [[0.,0.,1.],[1.,0.,1.],[0.,1.,1.]]
+lower = [[0.,0.,0.],[1.,0.,0.],[0.,1.,0.]]
+upper_right = [[1.,1.,1.],[0.,1.,1.],[1.,0.,1.]]
+
+
+def triangles(*layers, tau: float = 0.05, rho: float = 0.1):
+    """(N, 3, 3) triangles with the same optics, Caribu defaults
+
+    Returns:
+        tuple: (N, 3, 3) triangles, (N,) tau and (N,) rho
+    """
+    tris = np.array(layers, dtype=float)
+    return tris, np.full(tris.shape[0], tau), np.full(tris.shape[0], rho)
+
+
+def stacked_triangles():
+    """One triangle shading the same triangle 1 m below"""
+    return triangles(upper, lower)
+
+
+def covering_triangles():
+    """Two triangles covering the whole plot at z = 1"""
+    return triangles(upper, upper_right)
+
+
+@pytest.fixture
+def stacked():
+    return stacked_triangles()
+
+
+@pytest.fixture
+def covering():
+    return covering_triangles()
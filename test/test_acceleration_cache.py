@@ -0,0 +1,28 @@
+from openalea.pyRTVPL import pyRTVPL
+import numpy as np
+import os
+import tempfile
+
+from conftest import stacked_triangles
+
+
+def test_acceleration_cache(stacked, cache_folder=None):
+    cache_folder = cache_folder or tempfile.mkdtemp()
+    tris, tau, rho = stacked
+
+    rt = pyRTVPL(scene_xrange=1., scene_yrange=1., generate_soil=False)
+    rt.acceleration_rule = "AvgSplit"
+    built = rt.build_scene(tris, tau, rho, acceleration_cache=cache_folder)
+    assert os.path.isfile(built.cache_file)
+    # Same inputs load the saved structure, other inputs get their own file
+    loaded = rt.build_scene(tris, tau, rho, acceleration_cache=cache_folder)
+    assert loaded.cache_file == built.cache_file
+    assert rt.build_scene(tris, tau, 2 * rho, acceleration_cache=cache_folder).cache_file != built.cache_file
+
+    PARa, Erel, areas = loaded.trace(direct_PAR=600., diffuse_PAR=0., theta_dir=0.)
+    np.testing.assert_allclose(np.array(areas), np.array(built.areas))
+    assert (np.array(PARa) * np.array(areas)).sum() <= 600. * 1.01
+
+
+if __name__ == "__main__":
+    test_acceleration_cache(stacked_triangles())
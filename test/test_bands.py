@@ -0,0 +1,40 @@
+from openalea.pyRTVPL import pyRTVPL
+import numpy as np
+
+from conftest import stacked_triangles
+
+
+def test_bands(stacked):
+    tris, _, _ = stacked
+    # band 0 and band 1 identical, band 2 with its own optics and light
+    tau = np.array([[0.05, 0.05, 0.4], [0.05, 0.05, 0.4]])
+    rho = np.array([[0.1, 0.1, 0.45], [0.1, 0.1, 0.45]])
+    direct = np.array([400., 400., 300.])
+    diffuse = np.array([100., 100., 0.])
+
+    rt = pyRTVPL(scene_xrange=1., scene_yrange=1.)
+    PARa, Erel, areas = rt(tris, tau, rho, direct_PAR=direct, diffuse_PAR=diffuse)
+    assert PARa.shape == (2, 3) and Erel.shape == (2, 3)
+    # all bands follow the same rays
+    np.testing.assert_allclose(PARa[:, 0], PARa[:, 1])
+    assert (PARa[:, 2] != PARa[:, 0]).any()
+
+    organs = rt(tris, tau, rho, direct_PAR=direct, diffuse_PAR=diffuse, organ_ids=np.array([1, 1]))
+    assert organs["PARa"].shape == (1, 3)
+
+    # a single band given as arrays is traced as a single band
+    PARa, Erel, areas = rt(tris, tau[:, :1], rho[:, :1], direct_PAR=np.array([600.]), diffuse_PAR=np.array([200.]))
+    assert PARa.shape == (2,) and Erel.shape == (2,)
+    PARa, Erel, areas = rt(tris, tau[:, 0], rho[:, 0], direct_PAR=np.array([600.]), diffuse_PAR=200.)
+    assert PARa.shape == (2,)
+
+    # persistent scenes trace a single band
+    try:
+        rt.build_scene(tris, tau, rho)
+        raise AssertionError("per-band optics should be refused by scenes")
+    except ValueError:
+        pass
+
+
+if __name__ == "__main__":
+    test_bands(stacked_triangles())
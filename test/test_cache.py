@@ -0,0 +1,39 @@
+from openalea.pyRTVPL import pyRTVPL, TraceCache
+from openalea.pyRTVPL.cache import trace_key
+import numpy as np
+import tempfile
+
+from conftest import covering_triangles
+
+
+def test_trace_cache(covering):
+    tris, tau, rho = covering
+    folder = tempfile.mkdtemp()
+    cache = TraceCache(folder=folder)
+    rt = pyRTVPL(scene_xrange=1., scene_yrange=1., cache=cache, seed=1)
+
+    PARa, Erel, areas = rt(tris, tau, rho, direct_PAR=400., diffuse_PAR=200., engine="turbid")
+    PARa[:] = -1. # results are copies, the cached ones are untouched
+    PARa_cached, _, _ = rt(tris, tau, rho, direct_PAR=400., diffuse_PAR=200., engine="turbid")
+    assert (PARa_cached > 0).all()
+    rt(tris, tau, rho, direct_PAR=400., diffuse_PAR=100., engine="turbid")
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
+
+    # any trace parameter changes the key
+    key = rt.cache_key(tris, tau, rho, 400., 200., 1.4486, 3.1416, engine="turbid")
+    rt.maxiter = 2
+    assert rt.cache_key(tris, tau, rho, 400., 200., 1.4486, 3.1416, engine="turbid") != key
+
+    # least recently used results are evicted beyond max_bytes, and read back from disk
+    result = (np.zeros(10), np.zeros(10), np.zeros(12))
+    small = TraceCache(max_bytes=2 * 256, folder=folder)
+    keys = [trace_key(dict(triangles=np.full(3, k)), dict(step=k)) for k in range(3)]
+    for key in keys:
+        small.put(key, result)
+    assert small.stats()["entries"] == 2 and small.nbytes <= small.max_bytes
+    assert small.get(keys[0]) is not None
+    assert small.stats()["disk_hits"] == 1 and small.stats()["hits"] == 0
+
+
+if __name__ == "__main__":
+    test_trace_cache(covering_triangles())
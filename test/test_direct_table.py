@@ -0,0 +1,25 @@
+from openalea.pyRTVPL import DirectResponseTable
+import numpy as np
+
+
+def test_direct_table_interpolation():
+    theta_grid = np.linspace(0., 1.2, 4)
+    phi_grid = np.arange(4) * np.pi / 2
+    # Synthetic response, linear in theta and constant in phi for triangle 0, constant for triangle 1
+    table = np.zeros((4, 4, 2), dtype=np.float32)
+    table[:, :, 0] = theta_grid[:, None]
+    table[:, :, 1] = 0.5
+    lut = DirectResponseTable(theta_grid, phi_grid, table, areas=np.ones(2))
+
+    PARa = lut.query(600., 0.5, 0.3)
+    assert PARa.shape == (2,)
+    np.testing.assert_allclose(PARa, [600. * 0.5, 300.], rtol=1e-5)
+
+    # Azimuth interpolation wraps around 2pi, zenith is clamped to the grid
+    PARa = lut.query(np.array([100., 100.]), np.array([2.0, 0.4]), np.array([2 * np.pi - 0.1, 7.]))
+    assert PARa.shape == (2, 2)
+    np.testing.assert_allclose(PARa[:, 0], [120., 40.], rtol=1e-5)
+
+
+if __name__ == "__main__":
+    test_direct_table_interpolation()
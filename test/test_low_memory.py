@@ -0,0 +1,31 @@
+from openalea.pyRTVPL import pyRTVPL, TriangleScene
+import numpy as np
+import tempfile
+
+from conftest import triangles, upper, upper_right
+
+
+def test_low_memory_chunks():
+    tris, tau, rho = triangles(upper, upper_right, [[0.,0.,0.5],[1.,0.,0.5],[0.,1.,0.5]])
+    rt = pyRTVPL(scene_xrange=1., scene_yrange=1., generate_soil=False, low_memory=True)
+
+    # float32 triangles are traced without being widened
+    PARa, Erel, areas = rt(tris.astype(np.float32), tau, rho, direct_PAR=600., diffuse_PAR=0., theta_dir=0.)
+    np.testing.assert_allclose(areas, [0.5, 0.5, 0.5], rtol=1e-6)
+
+    # a scene saved as float32 and read back block by block
+    folder = tempfile.mkdtemp()
+    TriangleScene(tris, np.arange(3), tau, rho).save(folder, vertex_dtype=np.float32)
+    stored = TriangleScene.load(folder)
+    assert stored.triangles.dtype == np.float32
+    assert [block[0].shape[0] for block in stored.chunks(2)] == [2, 1]
+    scene = rt.build_scene_from_chunks(stored.chunks(2))
+    assert scene.n_triangles == 3
+    PARa_chunks, _, _ = scene.trace(direct_PAR=600., diffuse_PAR=0., theta_dir=0.)
+    # the top layer covers the plot, the lower triangle is shaded
+    assert PARa_chunks[2] < PARa_chunks[:2].min()
+    assert rt.peak_rss() > 0
+
+
+if __name__ == "__main__":
+    test_low_memory_chunks()
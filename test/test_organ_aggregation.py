@@ -0,0 +1,30 @@
+from openalea.pyRTVPL import pyRTVPL
+from openalea.pyRTVPL.pyRTVPL_api import organ_results
+import numpy as np
+
+from conftest import lower, triangles, upper, upper_right
+
+
+def test_organ_aggregation():
+    tris, tau, rho = triangles(upper, lower, upper_right)
+    organ_ids = np.array([7, 3, 7])
+
+    rt = pyRTVPL(scene_xrange=1., scene_yrange=1., generate_soil=False)
+    organs = rt(tris, tau, rho, direct_PAR=600., diffuse_PAR=0., organ_ids=organ_ids)
+    np.testing.assert_array_equal(organs["organ_id"], [3, 7])
+    np.testing.assert_allclose(organs["area"], [0.5, 1.])
+    np.testing.assert_allclose(organs["PARa"] * organs["area"], organs["absorbed"])
+
+    # organ results have no per-triangle buffers
+    try:
+        rt(tris, tau, rho, direct_PAR=600., diffuse_PAR=0., organ_ids=organ_ids, out=rt.allocate_outputs(3))
+        raise AssertionError("out with organ_ids should fail")
+    except ValueError:
+        pass
+    # without light the relative absorption is zero, as in Julia
+    dark = organ_results(np.zeros(3), np.full(3, 0.5), organ_ids, 0.)
+    np.testing.assert_array_equal(dark["Erel"], [0., 0.])
+
+
+if __name__ == "__main__":
+    test_organ_aggregation()
@@ -0,0 +1,33 @@
+from openalea.pyRTVPL import pyRTVPL
+import numpy as np
+
+
+def test_light_periodisation():
+    sky = pyRTVPL(scene_xrange=0.15, scene_yrange=0.15)
+    light = pyRTVPL(scene_xrange=0.15, scene_yrange=0.15, periodisation_mode="light")
+
+    # with diffuse light both modes cover the lowest sky elevation
+    assert light.periodisation(0.6, theta_dir=0.3, phi_dir=0., diffuse=True) == sky.periodisation(0.6)
+    # a sun at the zenith needs no replication, a sun along x only replicates along x
+    assert light.periodisation(0.6, theta_dir=0., phi_dir=0., diffuse=False) == (0, 0)
+    nx, ny = light.periodisation(0.6, theta_dir=np.deg2rad(45.), phi_dir=0., diffuse=False)
+    assert (nx, ny) == (4, 0)
+    # never further than the lowest sky elevation
+    nx, ny = light.periodisation(0.6, theta_dir=np.deg2rad(89.), phi_dir=np.pi / 4, diffuse=False)
+    assert max(nx, ny) <= max(sky.periodisation(0.6))
+
+
+def test_canopy_depth():
+    # a canopy lifted 1 m above the ground is measured from the ground, with or without soil
+    triangles = np.array([[[0., 0., 1.], [0.1, 0., 1.], [0., 0.1, 1.2]]])
+    for generate_soil in (True, False):
+        for mode in ("sky", "light"):
+            tracer = pyRTVPL(generate_soil=generate_soil, periodisation_mode=mode)
+            assert np.isclose(tracer.canopy_depth(triangles), 1.2)
+    # down to the canopy bottom when it lies below the ground
+    assert np.isclose(pyRTVPL().canopy_depth(triangles - 1.1), 0.2)
+
+
+if __name__ == "__main__":
+    test_light_periodisation()
+    test_canopy_depth()
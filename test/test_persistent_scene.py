@@ -0,0 +1,87 @@
+from openalea.pyRTVPL import pyRTVPL
+import numpy as np
+
+from conftest import lower, stacked_triangles, triangles, upper
+
+
+def test_persistent_scene(stacked):
+    tris, tau, rho = stacked
+
+    rt = pyRTVPL(scene_xrange=1., scene_yrange=1., generate_soil=False)
+    scene = rt.build_scene(tris, tau, rho)
+    for theta_dir in (0.2, 0.6, 1.0):
+        PARa, Erel, areas = scene.trace(direct_PAR=600., diffuse_PAR=0., theta_dir=theta_dir)
+        PARa = np.array(PARa)
+        # Absorbed power must not accumulate from one trace to the next
+        assert (PARa * np.array(areas)).sum() <= 600. * 1.01
+
+
+
+def test_cached_diffuse_rescaling(stacked):
+    tris, tau, rho = stacked
+
+    rt = pyRTVPL(scene_xrange=1., scene_yrange=1., generate_soil=False)
+    scene = rt.build_scene(tris, tau, rho, cache_diffuse=True)
+    PARa_100, Erel_100, _ = scene.trace(direct_PAR=0., diffuse_PAR=100.)
+    PARa_300, Erel_300, _ = scene.trace(direct_PAR=0., diffuse_PAR=300.)
+    # Diffuse results are a linear rescaling of the same cached unit response
+    np.testing.assert_allclose(3 * np.array(PARa_100), np.array(PARa_300))
+    np.testing.assert_allclose(np.array(Erel_100), np.array(Erel_300))
+
+
+
+def test_trace_series_chunks(stacked):
+    tris, tau, rho = stacked
+    direct_PAR = np.array([0., 300., 600., 0., 0.])
+    diffuse_PAR = np.array([0., 100., 200., 100., 0.])
+    theta = np.array([1.6, 1.2, 0.8, 1.2, 1.6])
+    phi = np.full(5, 3.1416)
+
+    rt = pyRTVPL(scene_xrange=1., scene_yrange=1., generate_soil=False)
+    PARa, Erel, _ = rt.trace_series(tris, tau, rho, direct_PAR, diffuse_PAR, theta, phi, chunk_size=2)
+    assert PARa.shape == (5, 2) and Erel.shape == (5, 2)
+    # Night steps are not traced
+    assert not PARa[0].any() and not PARa[-1].any()
+    # Scalar light is a single step
+    PARa, Erel, _ = rt.trace_series(tris, tau, rho, 600., 0., 0.8, 3.1416)
+    assert PARa.shape == (1, 2)
+
+
+
+def test_scene_updates():
+    tris, tau, rho = triangles(upper, lower, [[0.,0.,.5],[.5,0.,.5],[0.,.5,.5]])
+
+    rt = pyRTVPL(scene_xrange=1., scene_yrange=1., generate_soil=False)
+    scene = rt.build_scene(tris, tau, rho)
+    scene.trace(direct_PAR=600., diffuse_PAR=0.)
+
+    new_ids = scene.append(tris[:1] + [0., 0., 1.], tau[:1], rho[:1])
+    assert list(new_ids) == [3]
+    scene.remove([0])
+    # The last triangle fills the removed slot
+    assert list(scene.triangle_ids) == [3, 1, 2]
+    scene.set_vertices([2], tris[2:] * 1.5)
+
+    PARa, Erel, areas = scene.trace(direct_PAR=600., diffuse_PAR=0.)
+    assert np.array(PARa).shape == (3,)
+    np.testing.assert_allclose(np.array(areas)[2], 0.125 * 1.5 ** 2)
+
+
+
+def test_adaptive_ray_budget(stacked):
+    tris, tau, rho = stacked
+
+    rt = pyRTVPL(scene_xrange=1., scene_yrange=1., generate_soil=False)
+    rt.nrays_dir = 10_000
+    result = rt.trace_adaptive(tris, tau, rho, direct_PAR=600., diffuse_PAR=0., tolerance=0.01, max_rays=50_000)
+    assert result["PARa"].shape == result["rel_se"].shape == (2,)
+    # The ray budget bounds the number of batches when the tolerance is not reached
+    assert result["n_rays"] <= 50_000 or result["criterion"] <= 0.01
+
+
+if __name__ == "__main__":
+    test_persistent_scene(stacked_triangles())
+    test_cached_diffuse_rescaling(stacked_triangles())
+    test_trace_series_chunks(stacked_triangles())
+    test_scene_updates()
+    test_adaptive_ray_budget(stacked_triangles())
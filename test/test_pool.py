@@ -0,0 +1,48 @@
+from openalea.pyRTVPL.pool import map_scenes
+from concurrent.futures.process import BrokenProcessPool
+import glob
+import os
+import numpy as np
+
+from conftest import stacked_triangles
+
+
+def test_map_scenes(stacked):
+    tris, tau, rho = stacked
+    scenes = [dict(triangles=tris * (1 + k / 10), tau=tau, rho=rho, direct_PAR=600., diffuse_PAR=0.) for k in range(4)]
+    # A scene with mismatched optical properties fails alone
+    scenes.append(dict(triangles=tris, tau=np.full(3, 0.05), rho=rho, direct_PAR=600., diffuse_PAR=0.))
+
+    results = dict(map_scenes(scenes, workers=2, init=dict(generate_soil=False), attributes=dict(nrays_dir=1_000)))
+    assert sorted(results) == list(range(5))
+    assert isinstance(results[4], Exception)
+    for k in range(4):
+        PARa, Erel, areas = results[k]
+        assert PARa.shape == (2,)
+
+
+class Crash:
+    """Argument killing the worker process that unpickles it"""
+    def __reduce__(self):
+        return os._exit, (1,)
+
+
+def test_worker_crashes(stacked):
+    tris, tau, rho = stacked
+    blocks_before = set(glob.glob("/dev/shm/psm_*"))
+    scenes = [dict(triangles=tris, tau=tau, rho=rho, direct_PAR=600., diffuse_PAR=0.) for _ in range(4)]
+    scenes[1]["theta_dir"] = Crash() # breaks every pool it is sent to
+
+    # Once the restarts are spent, the scenes left yield the error instead of stopping the iteration
+    results = dict(map_scenes(scenes, workers=1, max_restarts=1, init=dict(generate_soil=False), attributes=dict(nrays_dir=1_000)))
+    assert sorted(results) == list(range(4))
+    assert isinstance(results[1], BrokenProcessPool)
+    for k in (0, 2, 3):
+        assert isinstance(results[k], (tuple, BrokenProcessPool))
+    # every shared memory block was released
+    assert set(glob.glob("/dev/shm/psm_*")) <= blocks_before
+
+
+if __name__ == "__main__":
+    test_map_scenes(stacked_triangles())
+    test_worker_crashes(stacked_triangles())
@@ -0,0 +1,27 @@
+from openalea.pyRTVPL import pyRTVPL
+import numpy as np
+
+from conftest import stacked_triangles
+
+
+def test_profile(stacked):
+    tris, tau, rho = stacked
+
+    rt = pyRTVPL(scene_xrange=1., scene_yrange=1.)
+    logged = []
+    rt.profile_hooks.append(logged.append)
+
+    (PARa, Erel, areas), record = rt(tris, tau, rho, direct_PAR=600., diffuse_PAR=200., profile=True)
+    assert list(record["stages"]) == ["python", "mesh", "accelerate", "sources", "trace", "outputs"]
+    assert record["rays"]["emitted"] > 0
+    assert 0. <= record["rays"]["absorbed_fraction"] <= 1.
+    assert list(record["acceleration"]) == ["type"]
+    assert logged == [record]
+
+    # hooks alone profile the call without changing its results
+    PARa, Erel, areas = rt(tris, tau, rho, direct_PAR=600., diffuse_PAR=200.)
+    assert len(logged) == 2
+
+
+if __name__ == "__main__":
+    test_profile(stacked_triangles())
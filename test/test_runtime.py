@@ -0,0 +1,39 @@
+import os
+
+from openalea.pyRTVPL import pyRTVPL, start_background
+from openalea.pyRTVPL.julia_runtime import configure_threads, runtime
+
+
+def test_shared_runtime():
+    rt_small = pyRTVPL(scene_xrange=0.15, scene_yrange=0.15)
+    rt_big = pyRTVPL(scene_xrange=0.56, scene_yrange=0.56)
+
+    thread = start_background() # None when another test already started the runtime
+    if thread is not None:
+        thread.join()
+    assert runtime.started
+    # Every tracer uses the same VPLBridge module
+    assert rt_small.VPL is rt_big.VPL
+
+
+def test_configure_threads():
+    saved = os.environ.get("JULIA_NUM_THREADS")
+    try:
+        # values Julia accepts but that are not integers are kept as set by the user
+        for value in ("auto", "4,1", "3"):
+            os.environ["JULIA_NUM_THREADS"] = value
+            assert configure_threads() == value
+            assert os.environ["JULIA_NUM_THREADS"] == value
+        if not runtime.started:
+            del os.environ["JULIA_NUM_THREADS"]
+            assert int(configure_threads()) >= 1
+            assert configure_threads(2) == "2"
+    finally:
+        if saved is None:
+            os.environ.pop("JULIA_NUM_THREADS", None)
+        else:
+            os.environ["JULIA_NUM_THREADS"] = saved
+
+if __name__ == "__main__":
+    test_configure_threads()
+    test_shared_runtime()
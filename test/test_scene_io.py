@@ -0,0 +1,29 @@
+from openalea.pyRTVPL import TriangleScene
+import numpy as np
+import tempfile
+
+
+def test_cscene_store():
+    cscene = {
+        4: [[(0., 0., 1.), (1., 0., 1.), (0., 1., 1.)], [(0., 0., 0.), (1., 0., 0.), (0., 1., 0.)]],
+        9: [[(1., 1., 1.), (0., 1., 1.), (1., 0., 1.)]],
+    }
+    scene = TriangleScene.from_cscene(cscene, optics={9: (0.2,)})
+    assert scene.triangles.shape == (3, 3, 3) and scene.triangles.flags.c_contiguous
+    np.testing.assert_array_equal(scene.organ_ids, [4, 4, 9])
+    np.testing.assert_allclose(scene.rho, [0.1, 0.1, 0.2])
+    np.testing.assert_allclose(scene.tau, [0.05, 0.05, 0.]) # single reflectance : opaque shape
+    bare = TriangleScene.from_cscene(cscene, optics={9: 0.2})
+    np.testing.assert_allclose(bare.rho, scene.rho)
+    np.testing.assert_allclose(bare.tau, scene.tau)
+
+    folder = tempfile.mkdtemp()
+    scene.save(folder)
+    loaded = TriangleScene.load(folder)
+    assert isinstance(loaded.triangles, np.memmap)
+    for name in TriangleScene.arrays:
+        np.testing.assert_array_equal(getattr(loaded, name), getattr(scene, name))
+
+
+if __name__ == "__main__":
+    test_cscene_store()
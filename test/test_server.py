@@ -0,0 +1,53 @@
+from openalea.pyRTVPL.server import TraceClient, TraceServer
+from multiprocessing import connection
+import numpy as np
+import os
+import tempfile
+import threading
+
+from conftest import stacked_triangles
+
+
+def test_trace_server(stacked):
+    tris, tau, rho = stacked
+
+    address = os.path.join(tempfile.mkdtemp(), "pyrtvpl.sock") if os.name != "nt" else ("127.0.0.1", 47814)
+    server = TraceServer(address, workers=1, init=dict(generate_soil=False), attributes=dict(nrays_dir=1_000)).start()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    # the per-user key is required to send anything
+    if os.name != "nt":
+        assert os.stat(address).st_mode & 0o077 == 0
+    try:
+        TraceClient(address, authkey=b"wrong").ping()
+        raise AssertionError("a wrong key should be refused")
+    except connection.AuthenticationError:
+        pass
+
+    with TraceClient(address, max_concurrency=2) as rt:
+        assert rt.options()["init"]["generate_soil"] is False
+        PARa, Erel, areas = rt(tris, tau, rho, direct_PAR=600., diffuse_PAR=0.)
+        assert PARa.shape == (2,)
+        # queued requests beyond the concurrency cap are all served
+        futures = [rt.submit(tris * (1 + k / 10), tau, rho, direct_PAR=600., diffuse_PAR=0.) for k in range(4)]
+        assert all(future.result()[0].shape == (2,) for future in futures)
+        # errors are raised in the client
+        try:
+            rt(tris, np.full(3, 0.05), rho, direct_PAR=600., diffuse_PAR=0.)
+            raise AssertionError("mismatched optics should fail")
+        except Exception as error:
+            assert not isinstance(error, AssertionError)
+        rt.shutdown_server()
+    thread.join(timeout=60)
+    assert not thread.is_alive()
+
+    try:
+        TraceServer(("127.0.0.1", 47815), authkey=b"")
+        raise AssertionError("a TCP address without key should be refused")
+    except ValueError:
+        pass
+
+
+if __name__ == "__main__":
+    test_trace_server(stacked_triangles())
@@ -0,0 +1,41 @@
+from openalea.pyRTVPL import pyRTVPL
+import numpy as np
+
+from conftest import triangles, upper
+
+
+def test_importance_sampling():
+    tris, tau, rho = triangles(upper, [[0.,0.,0.5],[1.,0.,0.5],[0.,1.,0.5]])
+    tris *= 0.5 # half of the plot is bare, its rays are not emitted
+
+    # the canopy also away from the plot origin, the light is emitted above it wherever it stands
+    for offset in (0., -0.25):
+        absorbed = {}
+        for sampling in ("uniform", "importance"):
+            rt = pyRTVPL(scene_xrange=1., scene_yrange=1., generate_soil=False, seed=1)
+            rt.sky_sampling = sampling
+            rt.nrays_dif = 200_000
+            PARa, Erel, areas = rt(tris + [offset, offset, 0.], tau, rho, direct_PAR=0., diffuse_PAR=600.)
+            absorbed[sampling] = (PARa * areas).sum()
+        # both sampling modes estimate the same absorbed power
+        np.testing.assert_allclose(absorbed["importance"], absorbed["uniform"], rtol=0.05)
+
+
+def test_low_sun():
+    # suns close to the horizon are emitted above the whole plot rather than above a footprint of capped slope
+    tris, tau, rho = triangles(upper, [[0.,0.,0.5],[1.,0.,0.5],[0.,1.,0.5]])
+    tris *= 0.5
+    for zenith in (80., 89.5):
+        absorbed = {}
+        for sampling in ("uniform", "importance"):
+            rt = pyRTVPL(scene_xrange=1., scene_yrange=1., generate_soil=False, seed=1)
+            rt.sky_sampling = sampling
+            rt.nrays_dir = 200_000
+            PARa, Erel, areas = rt(tris, tau, rho, direct_PAR=600., diffuse_PAR=0., theta_dir=np.deg2rad(zenith), phi_dir=0.5)
+            absorbed[sampling] = (PARa * areas).sum()
+        np.testing.assert_allclose(absorbed["importance"], absorbed["uniform"], rtol=0.05)
+
+
+if __name__ == "__main__":
+    test_importance_sampling()
+    test_low_sun()
@@ -0,0 +1,51 @@
+from openalea.pyRTVPL import pyRTVPL
+import asyncio
+import threading
+import time
+
+from conftest import stacked_triangles
+
+
+def test_submit(stacked):
+    tris, tau, rho = stacked
+
+    rt = pyRTVPL(scene_xrange=1., scene_yrange=1., generate_soil=False)
+    rt(tris, tau, rho, direct_PAR=600., diffuse_PAR=200.) # runtime started and entries compiled before timing
+
+    futures = [rt.submit(tris, tau, rho, direct_PAR=600., diffuse_PAR=200.) for _ in range(3)]
+    for future in futures:
+        PARa, Erel, areas = future.result()
+        assert PARa.shape == (2,)
+
+    # A Python thread keeps running while a long submission is traced, Julia holding the GIL would stall it until the end
+    slow = pyRTVPL(scene_xrange=1., scene_yrange=1., generate_soil=False)
+    slow.nrays_dir = slow.nrays_dif = 2_000_000
+    slow(tris, tau, rho, direct_PAR=600., diffuse_PAR=200.)
+    started, progressed = threading.Event(), threading.Event()
+    slow.submit(tris, tau, rho, direct_PAR=600., diffuse_PAR=0.).add_done_callback(lambda _: started.set())
+    future = slow.submit(tris, tau, rho, direct_PAR=600., diffuse_PAR=200.)
+
+    def run():
+        started.wait()
+        t0 = time.perf_counter()
+        while not future.done():
+            if time.perf_counter() - t0 > 0.05:
+                progressed.set()
+                return
+            time.sleep(0.001)
+
+    runner = threading.Thread(target=run)
+    runner.start()
+    assert progressed.wait(timeout=60)
+    assert not future.done()
+    future.result()
+    runner.join()
+    slow.close()
+
+    PARa, Erel, areas = asyncio.run(rt.trace_async(tris, tau, rho, direct_PAR=600., diffuse_PAR=0.))
+    assert PARa.shape == (2,)
+    rt.close()
+
+
+if __name__ == "__main__":
+    test_submit(stacked_triangles())
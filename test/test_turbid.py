@@ -0,0 +1,51 @@
+from openalea.pyRTVPL import pyRTVPL
+from openalea.pyRTVPL.turbid import TurbidMedium
+import numpy as np
+
+from conftest import covering_triangles
+
+
+def test_turbid_engine(covering):
+    # one horizontal black layer covering the plot, seen as a single voxel of leaf area index 1
+    tris, _, _ = covering
+    tau, rho = np.zeros(2), np.zeros(2)
+    rt = pyRTVPL(scene_xrange=1., scene_yrange=1.)
+    rt.turbid_voxel_size = 1.
+
+    # the projected leaf area and the path length change alike with the direction, Beer-Lambert gives 1 - exp(-1) for any light
+    PARa, Erel, areas = rt(tris, tau, rho, direct_PAR=400., diffuse_PAR=200., theta_dir=0.5, phi_dir=1., engine="turbid")
+    assert areas.shape == (4,)
+    np.testing.assert_allclose(areas, [0.5, 0.5, 0.5, 0.5])
+    np.testing.assert_allclose((PARa * areas[:2]).sum(), 600. * (1. - np.exp(-1.)))
+    np.testing.assert_allclose(Erel, PARa / 600.)
+
+    organs = rt(tris, tau, rho, direct_PAR=400., diffuse_PAR=200., organ_ids=np.array([3, 1]), engine="turbid")
+    np.testing.assert_array_equal(organs["organ_id"], [1, 3])
+    np.testing.assert_allclose(organs["absorbed"].sum(), 600. * (1. - np.exp(-1.)))
+
+
+def test_large_triangles(covering):
+    # the two triangles cross 16 voxels each, their area is spread over the whole plot rather than binned in two voxels
+    tris, _, _ = covering
+    tau, rho = np.zeros(2), np.zeros(2)
+    rt = pyRTVPL(scene_xrange=1., scene_yrange=1.)
+    rt.turbid_voxel_size = 0.25
+
+    PARa, Erel, areas = rt(tris, tau, rho, direct_PAR=600., diffuse_PAR=0., theta_dir=0., engine="turbid")
+    np.testing.assert_allclose(areas[:2], [0.5, 0.5])
+    np.testing.assert_allclose(PARa[:2], 600. * (1. - np.exp(-1.)))
+
+
+def test_outside_plot():
+    # a leaf past the x = 1 border lands in the first column when periodic, in the last one otherwise
+    tris = np.array([[[1.1, 0.1, 0.5], [1.15, 0.1, 0.5], [1.1, 0.15, 0.5]]])
+    periodic = TurbidMedium(tris, 1., 1., voxel_size=0.25, periodic=True)
+    bounded = TurbidMedium(tris, 1., 1., voxel_size=0.25, periodic=False)
+    assert np.unravel_index(periodic.voxel, (1, 4, 4))[1].tolist() == [0]
+    assert np.unravel_index(bounded.voxel, (1, 4, 4))[1].tolist() == [3]
+
+
+if __name__ == "__main__":
+    test_turbid_engine(covering_triangles())
+    test_large_triangles(covering_triangles())
+    test_outside_plot()
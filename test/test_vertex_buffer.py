@@ -0,0 +1,32 @@
+from openalea.pyRTVPL import pyRTVPL
+import numpy as np
+
+from conftest import stacked_triangles
+
+
+def test_out_buffers(stacked):
+    tris, tau, rho = stacked
+    # same random rays for every call
+    rt = pyRTVPL(scene_xrange=1., scene_yrange=1., generate_soil=True, parallel=False, seed=1)
+    expected = rt(tris, tau, rho, direct_PAR=600., diffuse_PAR=200.)
+
+    # float32 triangles and caller buffers give the same results, written in place
+    tris32 = tris.astype(np.float32)
+    out = rt.allocate_outputs(tris.shape[0])
+    result = rt(tris32, tau, rho, direct_PAR=600., diffuse_PAR=200., out=out)
+    assert all(r is o for r, o in zip(result, out))
+    assert out[2].shape == (4,) # soil triangles last
+    for r, e in zip(result, expected):
+        np.testing.assert_allclose(r, e)
+    np.testing.assert_array_equal(tris32, tris)
+
+    # float64 triangles are read in place by Julia, adding the soil must leave them untouched
+    before = tris.copy()
+    rt(tris, tau, rho, direct_PAR=600., diffuse_PAR=200., out=out)
+    np.testing.assert_array_equal(tris, before)
+    for r, e in zip(out, expected):
+        np.testing.assert_allclose(r, e)
+
+
+if __name__ == "__main__":
+    test_out_buffers(stacked_triangles())